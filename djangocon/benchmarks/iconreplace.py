@@ -0,0 +1,66 @@
+"""
+Benchmark the ``iconreplace`` filter against the four-pass filters it
+replaced, on generated talk titles::
+
+    python -m djangocon.benchmarks.iconreplace --titles 200 --repeat 50
+
+"Cold" runs with an empty memo for every title, "warm" with the titles
+already memoized, as on a busy page.
+"""
+
+import optparse
+import os
+import random
+import time
+
+WORDS = ["Django", "and", "the", "The", "for", "web", "testing", "of",
+         "in", "deploying", "apps", "Python", "with", "scale", "data"]
+
+
+def make_titles(count, seed=0):
+    rng = random.Random(seed)
+    return [u" ".join(rng.choice(WORDS) for i in range(rng.randint(3, 12)))
+            for j in range(count)]
+
+
+def timed(func, titles, repeat):
+    start = time.time()
+    for i in range(repeat):
+        for title in titles:
+            func(title)
+    return time.time() - start
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("--titles", type="int", default=200)
+    parser.add_option("--repeat", type="int", default=50)
+    options, args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "djangocon.settings.local")
+    from djangocon.proposals.templatetags import djangocon_extras
+    from djangocon.tests.test_iconreplace import legacy_iconreplace
+
+    titles = make_titles(options.titles)
+    calls = options.titles * options.repeat
+
+    def cold(title):
+        replacer.cache.clear()
+        return djangocon_extras.iconreplace(title, autoescape=True)
+
+    replacer = djangocon_extras._replacers["all"]
+    results = [
+        ("four passes (before)", timed(legacy_iconreplace, titles, options.repeat)),
+        ("single pass, cold", timed(cold, titles, options.repeat)),
+    ]
+    replacer.cache.clear()
+    warm = lambda title: djangocon_extras.iconreplace(title, autoescape=True)
+    results.append(("single pass, warm", timed(warm, titles, options.repeat)))
+
+    print "%d titles x %d" % (options.titles, options.repeat)
+    for label, seconds in results:
+        print "%-24s %8.3fs  %6.1f us/call" % (label, seconds, seconds / calls * 1e6)
+
+
+if __name__ == "__main__":
+    main()
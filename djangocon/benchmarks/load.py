@@ -0,0 +1,345 @@
+"""
+Replay a conference-morning traffic mix against the full WSGI stack.
+
+Requests are drawn from a weighted mix of the pages attendees hit (see
+`MIX`) and sent by `--concurrency` clients, either straight into
+``djangocon.wsgi.application`` (WhiteNoise, GZip and all the middleware,
+in this process) or to a running server with ``--url``::
+
+    python -m djangocon.benchmarks.load --requests 2000 --concurrency 100
+    python -m djangocon.benchmarks.load --url http://127.0.0.1:8000
+    python -m djangocon.benchmarks.load --host 2015.djangocon.us \\
+        --compare djangocon.settings.local,djangocon.settings.gondor
+
+``--gevent`` runs the clients as greenlets, like the gevent gunicorn
+worker configured in ``gondor.yml``; otherwise they are threads. The
+report gives throughput, latency percentiles per page and, in-process,
+the SQL queries per request. ``--compare`` runs the same mix once per
+settings module, each in its own process, and prints them side by side.
+
+``--user`` makes the clients log in as that user (a session is created
+in the database), so the dashboard is rendered rather than redirected.
+
+In-process requests are sent for the current `Site`'s domain, or for
+``--host``, which has to be in the settings' ``ALLOWED_HOSTS``. Any
+response other than a 2xx or 3xx counts as an error.
+"""
+
+import json
+import math
+import optparse
+import os
+import random
+import subprocess
+import sys
+import time
+
+# name, weight
+MIX = [
+    ("homepage", 15),
+    ("schedule_grid", 25),
+    ("schedule_json", 15),
+    ("presentation", 25),
+    ("sponsor_list", 5),
+    ("login", 5),
+    ("dashboard", 10),
+]
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def page_paths():
+    """Return ``{page: [path, ...]}`` for the pages in `MIX`."""
+    from django.core.urlresolvers import reverse
+    from symposion.schedule.models import Presentation, Schedule
+
+    schedules = Schedule.objects.filter(published=True, hidden=False)
+    presentations = Presentation.objects.filter(cancelled=False)
+    paths = {
+        "homepage": [reverse("home")],
+        "schedule_grid": [
+            reverse("schedule_detail", args=[slug])
+            for slug in schedules.values_list("section__slug", flat=True)
+        ] or [reverse("schedule_conference")],
+        "schedule_json": [reverse("schedule_json")],
+        "presentation": [
+            reverse("schedule_presentation_detail", args=[pk])
+            for pk in presentations.values_list("pk", flat=True)[:500]
+        ],
+        "sponsor_list": [reverse("sponsor_list")],
+        "login": [reverse("account_login")],
+        "dashboard": [reverse("dashboard")],
+    }
+    return dict((page, urls) for page, urls in paths.items() if urls)
+
+
+def plan(paths, requests, seed=None):
+    """Return a list of ``(page, path)`` drawn from `MIX`."""
+    rng = random.Random(seed)
+    pages = [(page, weight) for page, weight in MIX if page in paths]
+    total = sum(weight for page, weight in pages)
+    result = []
+    for i in range(requests):
+        pick = rng.uniform(0, total)
+        for page, weight in pages:
+            pick -= weight
+            if pick <= 0:
+                break
+        result.append((page, rng.choice(paths[page])))
+    return result
+
+
+def session_cookie(username):
+    """Create a logged-in session for `username`; returns the cookie header."""
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY
+    from django.contrib.auth.models import User
+    from django.utils.importlib import import_module
+
+    user = User.objects.get(username=username)
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = user.pk
+    session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+    session.save()
+    return "%s=%s" % (settings.SESSION_COOKIE_NAME, session.session_key)
+
+
+class InProcessClient(object):
+    """Calls the WSGI application directly and counts queries."""
+
+    def __init__(self, host, cookie=None):
+        from djangocon.wsgi import application
+        self.application = application
+        self.host = host
+        self.cookie = cookie
+
+    def get(self, path):
+        from wsgiref.util import setup_testing_defaults
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        environ = {
+            "PATH_INFO": path,
+            "HTTP_ACCEPT_ENCODING": "gzip",
+            "HTTP_HOST": self.host,
+        }
+        if self.cookie:
+            environ["HTTP_COOKIE"] = self.cookie
+        setup_testing_defaults(environ)
+        status = []
+
+        def start_response(code, headers, exc_info=None):
+            status.append(int(code.split()[0]))
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self.application(environ, start_response)
+            try:
+                size = sum(len(chunk) for chunk in result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        return status[0], size, len(queries)
+
+
+class HTTPClient(object):
+    """Requests pages from a running server; queries aren't counted."""
+
+    def __init__(self, base, cookie=None):
+        self.base = base.rstrip("/")
+        self.cookie = cookie
+
+    def get(self, path):
+        import urllib2
+
+        request = urllib2.Request(self.base + path, headers={"Accept-Encoding": "gzip"})
+        if self.cookie:
+            request.add_header("Cookie", self.cookie)
+        try:
+            response = urllib2.urlopen(request)
+        except urllib2.HTTPError as e:
+            response = e
+        return response.getcode(), len(response.read()), None
+
+
+def percentile(values, p):
+    """The `p`th percentile of the sorted list `values` (nearest rank)."""
+    if not values:
+        return None
+    rank = int(math.ceil(p / 100.0 * len(values))) - 1
+    return values[max(0, rank)]
+
+
+def summarize(timings):
+    latencies = sorted(timing["seconds"] for timing in timings)
+    queries = [timing["queries"] for timing in timings if timing["queries"] is not None]
+    summary = {
+        "requests": len(timings),
+        "errors": len([timing for timing in timings
+                       if not 200 <= timing["status"] < 400]),
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+        "max": latencies[-1] if latencies else None,
+        "queries": float(sum(queries)) / len(queries) if queries else None,
+    }
+    for p in PERCENTILES:
+        summary["p%d" % p] = percentile(latencies, p)
+    return summary
+
+
+def run(client, requests, concurrency, green=False):
+    """
+    Send `requests` with `concurrency` clients; returns the overall
+    summary and one per page.
+    """
+    queue = list(reversed(requests))
+    timings = []
+
+    def worker():
+        while queue:
+            try:
+                page, path = queue.pop()
+            except IndexError:
+                break
+            start = time.time()
+            try:
+                status, size, queries = client.get(path)
+            except Exception:
+                # Count a failed connection or a crash as a server error.
+                status, size, queries = 599, 0, None
+            timings.append({
+                "page": page,
+                "status": status,
+                "seconds": time.time() - start,
+                "bytes": size,
+                "queries": queries,
+            })
+
+    start = time.time()
+    if green:
+        import gevent
+        gevent.joinall([gevent.spawn(worker) for i in range(concurrency)])
+    else:
+        import threading
+        threads = [threading.Thread(target=worker) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.time() - start
+
+    overall = summarize(timings)
+    overall["seconds"] = elapsed
+    overall["throughput"] = len(timings) / elapsed if elapsed else None
+    pages = {}
+    for page, weight in MIX:
+        page_timings = [timing for timing in timings if timing["page"] == page]
+        if page_timings:
+            pages[page] = summarize(page_timings)
+    return {"overall": overall, "pages": pages}
+
+
+def format_ms(seconds):
+    return "-" if seconds is None else "%.1f" % (seconds * 1000)
+
+
+def format_queries(queries):
+    return "-" if queries is None else "%.1f" % queries
+
+
+def print_report(label, result):
+    overall = result["overall"]
+    print "%s: %d requests in %.2fs, %.1f req/s, %d errors" % (
+        label, overall["requests"], overall["seconds"], overall["throughput"] or 0,
+        overall["errors"])
+    print "%-16s %6s %8s %8s %8s %8s %8s %8s" % (
+        "page (ms)", "n", "p50", "p90", "p95", "p99", "max", "queries")
+    for name, summary in sorted(result["pages"].items()) + [("all", overall)]:
+        print "%-16s %6d %8s %8s %8s %8s %8s %8s" % (
+            name, summary["requests"],
+            format_ms(summary["p50"]), format_ms(summary["p90"]),
+            format_ms(summary["p95"]), format_ms(summary["p99"]),
+            format_ms(summary["max"]), format_queries(summary["queries"]))
+
+
+def print_comparison(results):
+    labels = [label for label, result in results]
+    print "%-24s" % "" + "".join("%26s" % label[-26:] for label in labels)
+    rows = [("req/s", lambda r: "%.1f" % (r["overall"]["throughput"] or 0)),
+            ("errors", lambda r: "%d" % r["overall"]["errors"])]
+    for p in PERCENTILES:
+        rows.append(("p%d ms" % p, lambda r, p=p: format_ms(r["overall"]["p%d" % p])))
+    rows.append(("queries/request", lambda r: format_queries(r["overall"]["queries"])))
+    for page, weight in MIX:
+        rows.append(("%s p95 ms" % page, lambda r, page=page: format_ms(
+            r["pages"].get(page, {}).get("p95"))))
+    for name, value in rows:
+        print "%-24s" % name + "".join("%26s" % value(result) for label, result in results)
+
+
+def compare(settings_modules, argv):
+    """Run this script once per settings module and compare the results."""
+    results = []
+    for module in settings_modules:
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=module)
+        output = subprocess.check_output(
+            [sys.executable, "-m", "djangocon.benchmarks.load", "--json"] + argv, env=env)
+        results.append((module, json.loads(output)))
+    print_comparison(results)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("--requests", type="int", default=1000)
+    parser.add_option("--concurrency", type="int", default=50)
+    parser.add_option("--warmup", type="int", default=50,
+                      help="requests sent before measuring (default: %default)")
+    parser.add_option("--url", default=None,
+                      help="base URL of a running server (default: in-process)")
+    parser.add_option("--gevent", action="store_true", default=False,
+                      help="run the clients as greenlets")
+    parser.add_option("--host", default=None,
+                      help="Host header for in-process requests "
+                           "(default: the current site's domain)")
+    parser.add_option("--user", default=None,
+                      help="log the clients in as this user")
+    parser.add_option("--seed", type="int", default=None)
+    parser.add_option("--compare", default=None,
+                      help="comma separated settings modules to compare")
+    parser.add_option("--json", action="store_true", default=False,
+                      help="print the results as JSON")
+    options, args = parser.parse_args()
+
+    if options.compare:
+        argv = []
+        skip = False
+        for arg in sys.argv[1:]:
+            if not skip and not arg.startswith("--compare"):
+                argv.append(arg)
+            skip = arg == "--compare"
+        compare([module.strip() for module in options.compare.split(",")], argv)
+        return
+
+    if options.gevent:
+        from gevent import monkey
+        monkey.patch_all()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "djangocon.settings.local")
+    paths = page_paths()
+    cookie = session_cookie(options.user) if options.user else None
+    if options.url:
+        client = HTTPClient(options.url, cookie)
+    else:
+        from django.contrib.sites.models import Site
+        client = InProcessClient(options.host or Site.objects.get_current().domain, cookie)
+
+    run(client, plan(paths, options.warmup, options.seed), options.concurrency,
+        options.gevent)
+    result = run(client, plan(paths, options.requests, options.seed),
+                 options.concurrency, options.gevent)
+    if options.json:
+        print json.dumps(result)
+    else:
+        print_report(os.environ["DJANGO_SETTINGS_MODULE"], result)
+
+
+if __name__ == "__main__":
+    main()
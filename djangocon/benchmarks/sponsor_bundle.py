@@ -0,0 +1,82 @@
+"""
+Benchmark rebuilding the sponsor asset bundle.
+
+Creates fake web and print logos for a number of sponsors, builds the
+bundle from scratch, changes one logo, and times an incremental rebuild
+against a full one::
+
+    python -m djangocon.benchmarks.sponsor_bundle --sponsors 100
+"""
+
+import json
+import optparse
+import os
+import shutil
+import tempfile
+import time
+
+from zipfile import ZIP_DEFLATED
+
+from djangocon.core.bundle import Member, build_bundle
+
+
+def make_logos(directory, sponsors, size):
+    paths = []
+    for i in range(sponsors):
+        for kind in ("weblogo", "printlogo"):
+            path = os.path.join(directory, "sponsor%d_%s.png" % (i, kind))
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+            paths.append(path)
+    return paths
+
+
+def members_for(paths):
+    members = [Member(os.path.basename(path), path=path) for path in paths]
+    data = json.dumps([{"name": os.path.basename(path)} for path in paths], indent=4)
+    members.append(Member("sponsor_data.txt", data=data, compress_type=ZIP_DEFLATED))
+    return members
+
+
+def timed(path, paths):
+    start = time.time()
+    reused, written = build_bundle(path, members_for(paths))
+    return time.time() - start, reused, written
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("--sponsors", type="int", default=100)
+    parser.add_option("--logo-size", type="int", default=256 * 1024,
+                      help="bytes per logo")
+    options, args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        paths = make_logos(directory, options.sponsors, options.logo_size)
+        path = os.path.join(directory, "sponsor_file.zip")
+
+        cold = timed(path, paths)
+
+        # Touch one logo: new content, new size and mtime.
+        with open(paths[0], "wb") as f:
+            f.write(os.urandom(options.logo_size + 1))
+        incremental = timed(path, paths)
+
+        os.remove(path)
+        full = timed(path, paths)
+
+        print "%d sponsors, %d members, %d byte logos" % (
+            options.sponsors, len(paths) + 1, options.logo_size)
+        for label, (seconds, reused, written) in [
+                ("cold build", cold),
+                ("one logo changed, incremental", incremental),
+                ("one logo changed, full rebuild", full)]:
+            print "%-32s %8.3fs  reused %4d  written %4d" % (
+                label, seconds, reused, written)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
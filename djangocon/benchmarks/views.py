@@ -0,0 +1,218 @@
+"""
+Benchmark the project's heavy views against seeded data of several sizes.
+
+Creates a throwaway test database, seeds it with the test factories and,
+for each size, requests every view as a superuser, once with an empty
+cache and once warm. The heavy exports are built by background jobs (see
+`djangocon.core.exports`), so their builders are run directly instead,
+writing to a temporary file. Wall time, growth of the process's peak RSS
+and the number of SQL queries are written to a JSON file so runs can be
+compared across commits::
+
+    python manage.py benchmark_views --sizes=100,1000 --output=bench.json
+
+A view that answers with anything but a 2xx response, an export that
+raises, or either running more queries than its budget in `VIEWS` or
+`EXPORTS`, fails the run; the budgets don't depend on the size, so they
+catch per-row queries.
+"""
+
+import json
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from datetime import time as clock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.utils.module_loading import import_by_path
+from django.test.client import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment,
+    teardown_test_environment)
+
+# name, url name, query budget
+VIEWS = [
+    ("schedule_json", "schedule_json", 15),
+    ("schedule_now", "schedule_now", 15),
+    ("schedule_ical", "schedule_ical", 15),
+    ("guidebook_speakers", "guidebook_speakers", 10),
+    ("guidebook_sponsors", "guidebook_sponsors", 10),
+    ("guidebook_news_feed", "guidebook_news_feed", 5),
+]
+
+# name, export builder, query budget
+EXPORTS = [
+    ("proposal_export", "djangocon.views.write_proposal_export", 10),
+    ("schedule_guidebook", "djangocon.guidebook.write_schedule_export", 15),
+    ("export_sponsors", "djangocon.lost_levels.views.write_sponsor_zip", 15),
+]
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+ROOMS = 4
+
+
+def seed(size):
+    """
+    Create `size` talk proposals, half of them scheduled in `ROOMS` rooms,
+    and a sponsor for every ten proposals.
+    """
+    from djangocon.tests import factories
+
+    kind = factories.ProposalKindFactory()
+    day = factories.DayFactory(schedule__section=kind.section)
+    slot_kind = factories.SlotKindFactory(schedule=day.schedule)
+    rooms = [factories.RoomFactory(schedule=day.schedule) for i in range(ROOMS)]
+    level = factories.SponsorLevelFactory(conference=kind.section.conference)
+
+    for i in range(size):
+        proposal = factories.TalkProposalFactory(kind=kind)
+        if i % 2:
+            continue
+        # Five minute slots from 9:00, wrapping around before midnight.
+        start = (9 * 60 + (i // 2 // ROOMS) * 5) % (24 * 60 - 5)
+        slot = factories.SlotFactory(
+            day=day, kind=slot_kind,
+            start=clock(*divmod(start, 60)), end=clock(*divmod(start + 5, 60)))
+        slot.slotroom_set.create(room=rooms[(i // 2) % ROOMS])
+        factories.PresentationFactory(slot=slot, proposal_base=proposal)
+
+    for i in range(max(1, size // 10)):
+        factories.SponsorFactory(level=level)
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"]).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss():
+    """The process's peak resident set size, in kilobytes (Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(client, url):
+    peak = peak_rss()
+    start = time.time()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+        if getattr(response, "streaming", False):
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+    return {
+        "status": response.status_code,
+        "seconds": round(time.time() - start, 4),
+        "queries": len(queries),
+        "peak_rss_growth_kb": peak_rss() - peak,
+        "bytes": size,
+    }
+
+
+def measure_export(builder):
+    peak = peak_rss()
+    start = time.time()
+    with tempfile.TemporaryFile() as f:
+        with CaptureQueriesContext(connection) as queries:
+            builder(f)
+        size = f.tell()
+    return {
+        "status": None,
+        "seconds": round(time.time() - start, 4),
+        "queries": len(queries),
+        "peak_rss_growth_kb": peak_rss() - peak,
+        "bytes": size,
+    }
+
+
+def run(sizes=DEFAULT_SIZES, log=None):
+    """
+    Benchmark every view at each size, in a fresh test database per size.
+    Returns ``(results, failures)``.
+    """
+    from django.test.runner import DiscoverRunner
+
+    results = []
+    failures = []
+    # As in the tests: any host is allowed and mail isn't sent.
+    setup_test_environment()
+    # Seeding mustn't start schedule publishers, and the exports mustn't
+    # write into the real media directories.
+    scratch = tempfile.mkdtemp()
+    isolated = override_settings(
+        SCHEDULE_PUBLISH_DELAY=None, MEDIA_ROOT=scratch, EXPORT_CACHE_ROOT=scratch)
+    isolated.enable()
+    try:
+        for size in sizes:
+            results.extend(run_size(DiscoverRunner(verbosity=0), size, failures, log))
+    finally:
+        isolated.disable()
+        teardown_test_environment()
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results, failures
+
+
+def record(result, failures, log):
+    if "error" in result or result["queries"] > result["budget"]:
+        failures.append(result)
+    if log is not None:
+        log(result)
+
+
+def run_size(runner, size, failures, log=None):
+    results = []
+    old_config = runner.setup_databases()
+    try:
+        seed(size)
+        user = User.objects.create_superuser("bench", "bench@example.com", "bench")
+        client = Client()
+        client.login(username="bench", password="bench")
+
+        for name, url_name, budget in VIEWS:
+            url = reverse(url_name)
+            cache.clear()
+            for state in ("cold", "warm"):
+                try:
+                    result = measure(client, url)
+                except Exception as e:
+                    result = {"error": "%s: %s" % (e.__class__.__name__, e)}
+                else:
+                    if not 200 <= result["status"] < 300:
+                        result["error"] = "HTTP %d" % result["status"]
+                result.update(view=name, size=size, cache=state, budget=budget)
+                results.append(result)
+                record(result, failures, log)
+
+        for name, path, budget in EXPORTS:
+            builder = import_by_path(path)
+            cache.clear()
+            for state in ("cold", "warm"):
+                try:
+                    result = measure_export(builder)
+                except Exception as e:
+                    result = {"error": "%s: %s" % (e.__class__.__name__, e)}
+                result.update(view=name, size=size, cache=state, budget=budget)
+                results.append(result)
+                record(result, failures, log)
+        user.delete()
+    finally:
+        runner.teardown_databases(old_config)
+    return results
+
+
+def write_results(path, sizes, results):
+    with open(path, "wb") as f:
+        json.dump({
+            "commit": current_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sizes": sizes,
+            "results": results,
+        }, f, indent=2)
@@ -0,0 +1,179 @@
+"""
+Incrementally rebuilt zip archives.
+
+`build_bundle` writes a zip from a list of members and records a
+signature for each one in a manifest beside the archive. On the next
+build, members whose signature hasn't changed are copied byte-for-byte
+out of the previous archive -- already compressed, with their CRC
+already computed -- and only new or changed members are read and
+compressed again.
+
+Builds of the same archive take turns on a lock file beside it, so
+concurrent builds don't race on the archive and its manifest.
+
+This module doesn't depend on Django so it can be benchmarked on its own.
+"""
+
+import contextlib
+import copy
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+from zipfile import ZipFile, ZIP_STORED, sizeFileHeader
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class Member(object):
+    """
+    One file in a bundle, read either from a path on disk or from `data`
+    held in memory.
+    """
+
+    def __init__(self, arcname, path=None, data=None, compress_type=ZIP_STORED):
+        self.arcname = arcname
+        self.path = path
+        self.data = data
+        self.compress_type = compress_type
+
+    def signature(self):
+        if self.path is not None:
+            stat = os.stat(self.path)
+            value = "%s:%d:%r" % (self.path, stat.st_size, stat.st_mtime)
+        else:
+            value = self.data
+        return "%d:%s" % (self.compress_type, hashlib.sha1(value).hexdigest())
+
+    def write(self, z):
+        if self.path is not None:
+            z.write(self.path, self.arcname, self.compress_type)
+        else:
+            z.writestr(self.arcname, self.data, self.compress_type)
+
+
+def manifest_path(path):
+    return path + ".manifest.json"
+
+
+@contextlib.contextmanager
+def _locked(path):
+    """Hold an exclusive lock for building the archive at `path`."""
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _archive_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime]
+
+
+def _read_manifest(path):
+    """
+    Return the member signatures recorded for the archive at `path`, or an
+    empty dict if the manifest is missing or belongs to another archive.
+    """
+    try:
+        with open(manifest_path(path), "rb") as f:
+            manifest = json.load(f)
+        if manifest["archive"] != _archive_stamp(path):
+            return {}
+        return manifest["members"]
+    except (IOError, OSError, KeyError, ValueError):
+        return {}
+
+
+def _copy_raw(source, info, dest):
+    """Copy a member from `source` into `dest` without recompressing it."""
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(sizeFileHeader)
+    filename_length, extra_length = struct.unpack("<HH", header[26:30])
+    source.fp.seek(info.header_offset + sizeFileHeader + filename_length + extra_length)
+
+    info = copy.copy(info)
+    info.header_offset = dest.fp.tell()
+    dest.fp.write(info.FileHeader())
+
+    remaining = info.compress_size
+    while remaining:
+        chunk = source.fp.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise IOError("Truncated member %r" % info.filename)
+        dest.fp.write(chunk)
+        remaining -= len(chunk)
+
+    dest.filelist.append(info)
+    dest.NameToInfo[info.filename] = info
+
+
+def build_bundle(path, members):
+    """
+    Write `members` to the zip archive at `path`, reusing unchanged members
+    from the archive already there. Returns ``(reused, written)`` counts.
+
+    The new archive is written next to the old one and renamed into place,
+    so readers always see a complete file.
+    """
+    with _locked(path):
+        return _build(path, members)
+
+
+def _build(path, members):
+    old_manifest = _read_manifest(path)
+    previous = None
+    if old_manifest:
+        try:
+            previous = ZipFile(path, "r")
+        except IOError:
+            previous = None
+
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    manifest = {}
+    reused = written = 0
+    try:
+        with os.fdopen(fd, "w+b") as f:
+            z = ZipFile(f, "w", ZIP_STORED)
+            for member in members:
+                signature = member.signature()
+                manifest[member.arcname] = signature
+                if (previous is not None and
+                        old_manifest.get(member.arcname) == signature and
+                        member.arcname in previous.NameToInfo):
+                    _copy_raw(previous, previous.NameToInfo[member.arcname], z)
+                    reused += 1
+                else:
+                    member.write(z)
+                    written += 1
+            z.close()
+    except Exception:
+        os.remove(temp_path)
+        raise
+    finally:
+        if previous is not None:
+            previous.close()
+
+    # Stamp the manifest with the archive it was built with; renaming
+    # keeps the size and modification time.
+    stamp = _archive_stamp(temp_path)
+    fd, manifest_temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        json.dump({"archive": stamp, "members": manifest}, f)
+    os.rename(temp_path, path)
+    os.rename(manifest_temp_path, manifest_path(path))
+    return reused, written
+
+
+def copy_bundle(path, fileobj):
+    """Copy the archive at `path` to `fileobj`."""
+    with open(path, "rb") as f:
+        shutil.copyfileobj(f, fileobj, COPY_CHUNK_SIZE)
+
@@ -0,0 +1,54 @@
+"""
+A cache for text derived from other text, such as transliterated
+biographies in the Guidebook exports.
+
+Entries are keyed by a hash of the source text, so they never need
+invalidating: once the source changes, its old entry is simply never
+looked up again and expires.
+"""
+
+import hashlib
+import itertools
+
+from django.core.cache import cache
+
+DERIVED_TEXT_TIMEOUT = 60 * 60 * 24 * 30
+
+DERIVE_CHUNK_SIZE = 500
+
+
+def _key(name, text):
+    return "derived:%s:%s" % (name, hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+def derive_many(name, func, texts, chunk_size=DERIVE_CHUNK_SIZE):
+    """
+    Yield ``func(text)`` for each of `texts`, computing each result only
+    if it isn't cached yet. `texts` is read `chunk_size` at a time, with
+    one cache lookup per chunk.
+
+    `name` identifies `func`; change it whenever `func`'s output changes.
+    """
+    texts = iter(texts)
+    while True:
+        chunk = [text or u"" for text in itertools.islice(texts, chunk_size)]
+        if not chunk:
+            return
+        keys = [_key(name, text) for text in chunk]
+        cached = cache.get_many(set(keys))
+
+        computed = {}
+        results = []
+        for key, text in zip(keys, chunk):
+            if key in cached:
+                value = cached[key]
+            elif key in computed:
+                value = computed[key]
+            else:
+                value = computed[key] = func(text)
+            results.append(value)
+
+        if computed:
+            cache.set_many(computed, DERIVED_TEXT_TIMEOUT)
+        for value in results:
+            yield value
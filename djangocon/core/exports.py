@@ -0,0 +1,244 @@
+"""
+Background jobs for the heavy admin exports.
+
+Requesting an export enqueues a job and returns straight away; a separate
+``manage.py run_export`` process builds the file into MEDIA_ROOT, where it
+is served like any other media file. Job state lives in a small JSON file
+next to the artifacts so every web worker and the export process see the
+same thing.
+
+A job's id is derived from the export name and the versions of the data
+it reads, so asking for the same export again while nothing has changed
+returns the job (and file) that already exists.
+
+The worker rewrites the job's status at least every `HEARTBEAT_INTERVAL`
+seconds. A queued or running job that hasn't been updated for
+`STALE_AFTER` seconds has lost its worker; it's reported as failed, and
+asking for the export again starts a new worker.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from django.utils.module_loading import import_by_path
+
+from .versions import PROPOSALS, SCHEDULE, SPONSORS, get_version
+
+logger = logging.getLogger(__name__)
+
+EXPORTS_DIR = "exports"
+
+# Don't rewrite the job file for every row; once a second is plenty.
+PROGRESS_INTERVAL = 1.0
+
+HEARTBEAT_INTERVAL = 30
+STALE_AFTER = 60 * 5
+
+EXPORTS = {
+    "proposals": {
+        "builder": "djangocon.views.write_proposal_export",
+        "filename": "proposal_export.csv",
+        "versions": [PROPOSALS],
+        "superuser": True,
+    },
+    "guidebook_schedule": {
+        "builder": "djangocon.guidebook.write_schedule_export",
+        "filename": "guidebook_schedule.xlsx",
+        "versions": [SCHEDULE],
+        "superuser": False,
+    },
+    "sponsors": {
+        "builder": "djangocon.lost_levels.views.write_sponsor_zip",
+        "filename": "sponsor_file.zip",
+        "versions": [SPONSORS],
+        "superuser": False,
+    },
+}
+
+
+class ExportJobError(Exception):
+    pass
+
+
+def exports_root():
+    return os.path.join(settings.MEDIA_ROOT, EXPORTS_DIR)
+
+
+def job_id_for(name):
+    """
+    Return the id of the job exporting the current data for `name`.
+
+    The id is an HMAC so the artifact URLs can't be guessed.
+    """
+    versions = [get_version(namespace) for namespace in EXPORTS[name]["versions"]]
+    value = ":".join([name] + versions)
+    return salted_hmac("djangocon.core.exports", value).hexdigest()
+
+
+def _status_path(job_id):
+    return os.path.join(exports_root(), "%s.json" % job_id)
+
+
+def _artifact_name(job):
+    return "%s-%s" % (job["job_id"], EXPORTS[job["export"]]["filename"])
+
+
+def _write_status(job):
+    job["updated"] = time.time()
+    # Write to a temporary file and rename, so readers never see a
+    # half-written status.
+    fd, path = tempfile.mkstemp(dir=exports_root(), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        json.dump(job, f)
+    os.rename(path, _status_path(job["job_id"]))
+
+
+def is_stale(job):
+    """Whether `job` is unfinished but its worker has stopped updating it."""
+    return (job["status"] in ("queued", "running") and
+            time.time() - job.get("updated", 0) > STALE_AFTER)
+
+
+def get_job(job_id):
+    """
+    Return the job with `job_id`, or None if there isn't one. A stale job
+    is returned as failed.
+    """
+    try:
+        with open(_status_path(job_id), "rb") as f:
+            job = json.load(f)
+    except (IOError, ValueError):
+        return None
+    if is_stale(job):
+        job.update(status="failed", error="The export worker stopped responding.")
+    return job
+
+
+def enqueue(name):
+    """
+    Return the job exporting the current data for `name`, starting a
+    worker for it unless one is already queued, running or done.
+    """
+    if name not in EXPORTS:
+        raise ExportJobError("Unknown export %r" % name)
+
+    if not os.path.isdir(exports_root()):
+        os.makedirs(exports_root())
+
+    job_id = job_id_for(name)
+    job = {
+        "job_id": job_id,
+        "export": name,
+        "status": "queued",
+        "progress": 0.0,
+        "url": None,
+        "error": None,
+        "updated": time.time(),
+    }
+
+    # O_EXCL makes creating the status file the lock: only one request
+    # starts a worker for a given job.
+    try:
+        fd = os.open(_status_path(job_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except OSError:
+        existing = get_job(job_id)
+        if existing is None or existing["status"] != "failed":
+            return existing or job
+        # Only one request restarts a failed job.
+        if not cache.add("exports:restart:%s" % job_id, True, HEARTBEAT_INTERVAL):
+            return existing
+        _write_status(job)
+    else:
+        with os.fdopen(fd, "wb") as f:
+            json.dump(job, f)
+
+    manage = os.path.join(settings.PROJECT_ROOT, "manage.py")
+    subprocess.Popen([sys.executable, manage, "run_export", job_id],
+                     close_fds=True)
+    return job
+
+
+def run(job_id):
+    """Build the artifact for `job_id`. Called by the worker process."""
+    job = get_job(job_id)
+    if job is None:
+        raise ExportJobError("Unknown job %r" % job_id)
+
+    lock = threading.Lock()
+    finished = threading.Event()
+
+    def write_status():
+        with lock:
+            _write_status(job)
+
+    def heartbeat():
+        while not finished.wait(HEARTBEAT_INTERVAL):
+            write_status()
+
+    job["status"] = "running"
+    write_status()
+    thread = threading.Thread(target=heartbeat)
+    thread.daemon = True
+    thread.start()
+
+    last_update = [0]
+
+    def progress(done, total):
+        now = time.time()
+        if total and now - last_update[0] >= PROGRESS_INTERVAL:
+            last_update[0] = now
+            job["progress"] = round(float(done) / total, 2)
+            write_status()
+
+    builder = import_by_path(EXPORTS[job["export"]]["builder"])
+    artifact = _artifact_name(job)
+    fd, path = tempfile.mkstemp(dir=exports_root(), suffix=".tmp")
+    try:
+        try:
+            with os.fdopen(fd, "w+b") as f:
+                builder(f, progress=progress)
+            os.rename(path, os.path.join(exports_root(), artifact))
+        finally:
+            finished.set()
+            thread.join()
+    except Exception as e:
+        logger.exception("Export job %s failed", job_id)
+        if os.path.exists(path):
+            os.remove(path)
+        job.update(status="failed", error=unicode(e))
+        _write_status(job)
+        raise
+
+    job.update(
+        status="done",
+        progress=1.0,
+        url=settings.MEDIA_URL + EXPORTS_DIR + "/" + artifact,
+    )
+    _write_status(job)
+    _remove_stale_jobs(job)
+    return job
+
+
+def _remove_stale_jobs(job):
+    """Delete the finished jobs and files this job has superseded."""
+    for filename in os.listdir(exports_root()):
+        if not filename.endswith(".json"):
+            continue
+        old = get_job(filename[:-len(".json")])
+        if old is None or old["job_id"] == job["job_id"]:
+            continue
+        if old["export"] != job["export"] or old["status"] not in ("done", "failed"):
+            continue
+        artifact = os.path.join(exports_root(), _artifact_name(old))
+        if os.path.exists(artifact):
+            os.remove(artifact)
+        os.remove(_status_path(old["job_id"]))
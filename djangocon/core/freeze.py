@@ -0,0 +1,297 @@
+"""
+Freeze the public site into a tree of static files, for the archive.
+
+Pages are rendered through the test client as an anonymous visitor by a
+pool of worker processes. Every same-site link found in a rendered page
+is crawled in turn, starting from the home page and from the pages of
+every CMS page, blog post, speaker, presentation and schedule.
+
+Each page is written as ``<path>/index.html`` (or under its own name if
+the URL doesn't end in a slash), with links to the site's own domain
+made root-relative so the tree can be served by any web server. Static
+files can't vary by query string, so same-site links lose theirs and
+point at the page without it.
+
+A manifest next to the tree records each page's fingerprint: a hash of
+the rows and data versions the page is built from. A later freeze only
+re-renders pages whose fingerprint changed, and reuses the links it
+recorded for the rest.
+"""
+
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import urlparse
+
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.client import Client
+
+from .exports import EXPORTS_DIR
+from .publish import PUBLISH_DIR
+from .versions import PROPOSALS, SCHEDULE, SPONSORS, get_version
+
+MANIFEST_NAME = ".freeze-manifest.json"
+
+LINK_RE = re.compile(r"""(?P<attr>\b(?:href|src)=)(?P<quote>["'])(?P<url>[^"'#]*)(?P=quote)""", re.I)
+
+# URL prefixes that are served from files anyway, or aren't pages.
+SKIP_PREFIXES = ["/admin/", "/account/", "/dashboard/", "/site_media/", "/markitup/"]
+
+# MEDIA_ROOT subdirectories that hold staff-only exports and the schedule
+# publisher's working copies, which must not end up in the public archive.
+PRIVATE_MEDIA_DIRS = [EXPORTS_DIR, PUBLISH_DIR]
+
+
+def seed_pages():
+    """
+    Return ``{path: fingerprint}`` for the pages backed by model objects.
+
+    A fingerprint hashes the object's row along with the data versions
+    the page also shows, so it changes when anything on the page does.
+    """
+    from biblion.models import Post
+    from symposion.cms.models import Page
+    from symposion.schedule.models import Presentation, Schedule
+    from symposion.speakers.models import Speaker
+
+    schedule = get_version(SCHEDULE)
+    seeds = {}
+
+    def add(path, obj, *versions):
+        row = obj.__class__.objects.filter(pk=obj.pk).values()[0]
+        seeds[path] = fingerprint(sorted(row.items()), *versions)
+
+    for page in Page.objects.filter(status=2):
+        add(page.get_absolute_url(), page)
+    for post in Post.objects.published():
+        add(post.get_absolute_url(), post)
+    for speaker in Speaker.objects.filter(presentations__isnull=False).distinct():
+        add(reverse("speaker_profile", kwargs={"pk": speaker.pk}), speaker, schedule)
+    for presentation in Presentation.objects.filter(cancelled=False):
+        add(reverse("schedule_presentation_detail", args=[presentation.pk]),
+            presentation, schedule)
+    for sched in Schedule.objects.filter(published=True, hidden=False).select_related("section"):
+        add(reverse("schedule_detail", args=[sched.section.slug]), sched, schedule)
+    return seeds
+
+
+def fingerprint(*parts):
+    return hashlib.sha1(repr(parts)).hexdigest()
+
+
+def crawled_fingerprint():
+    """The fingerprint of pages only found by crawling: any change counts."""
+    return fingerprint(*[get_version(ns) for ns in (PROPOSALS, SCHEDULE, SPONSORS)])
+
+
+def output_name(path):
+    """Return the file, relative to the tree, that `path` is frozen to."""
+    name = path.lstrip("/")
+    if not name or name.endswith("/"):
+        name += "index.html"
+    return name
+
+
+def normalize_link(url, page, domains):
+    """
+    Return the site path `url` (found on `page`) points to, or None if it
+    leads off the site or can't be frozen.
+    """
+    parts = urlparse.urlsplit(url)
+    if parts.scheme not in ("", "http", "https"):
+        return None
+    if parts.netloc and parts.netloc not in domains:
+        return None
+    path = urlparse.urljoin(page, parts.path) if parts.path else None
+    if not path or not path.startswith("/"):
+        return None
+    path = posixpath.normpath(path) + ("/" if path.endswith("/") and path != "/" else "")
+    if any(path.startswith(prefix) for prefix in SKIP_PREFIXES):
+        return None
+    return path
+
+
+def rewrite_links(html, domains):
+    """
+    Make links to the site's own domains root-relative, and drop the
+    query string from same-site links.
+    """
+    def replace(match):
+        url = match.group("url")
+        parts = urlparse.urlsplit(url)
+        if parts.netloc in domains:
+            url = urlparse.urlunsplit(("", "", parts.path or "/", "", parts.fragment))
+        elif not parts.netloc and parts.scheme in ("", "http", "https") and parts.query:
+            url = urlparse.urlunsplit(("", "", parts.path, "", parts.fragment))
+        return match.group("attr") + match.group("quote") + url + match.group("quote")
+    return LINK_RE.sub(replace, html)
+
+
+_client = None
+
+
+def _init_worker(host):
+    global _client
+    # Each worker needs its own database connection, not the parent's.
+    connection.close()
+    # The test client's default host isn't in ALLOWED_HOSTS.
+    _client = Client(HTTP_HOST=host)
+
+
+def render_page(path):
+    """Render `path`; returns ``(path, status, content_type, body)``."""
+    response = _client.get(path)
+    body = ""
+    if response.status_code == 200:
+        if getattr(response, "streaming", False):
+            body = "".join(response.streaming_content)
+        else:
+            body = response.content
+    return path, response.status_code, response.get("Content-Type", ""), body
+
+
+class Freezer(object):
+
+    def __init__(self, root, workers=4, full=False, stdout=None):
+        self.root = root
+        self.workers = workers
+        self.full = full
+        self.stdout = stdout
+        site = Site.objects.get_current()
+        self.host = site.domain
+        self.domains = set([site.domain, "www." + site.domain])
+        cdn = urlparse.urlsplit(getattr(settings, "CDN_URL", "")).netloc
+        if cdn:
+            # Static and media files are copied into the tree.
+            self.domains.add(cdn)
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.old = self._read_manifest()
+        self.pages = {}
+        self.rendered = 0
+        self.failed_seeds = []
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "rb") as f:
+                return json.load(f)["pages"]
+        except (IOError, ValueError, KeyError):
+            return {}
+
+    def _log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def links(self, html, page):
+        found = set()
+        for match in LINK_RE.finditer(html):
+            path = normalize_link(match.group("url"), page, self.domains)
+            if path is not None:
+                found.add(path)
+        return found
+
+    def write(self, path, body):
+        target = os.path.join(self.root, output_name(path))
+        directory = os.path.dirname(target)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.rename(tmp, target)
+
+    def freeze(self):
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+
+        seeds = seed_pages()
+        crawled = crawled_fingerprint()
+        queue = set(["/"]) | set(seeds)
+        seen = set()
+
+        connection.close()
+        pool = Pool(self.workers, _init_worker, (self.host,))
+        try:
+            while queue:
+                batch = sorted(queue - seen)
+                queue = set()
+                seen.update(batch)
+
+                to_render = []
+                for path in batch:
+                    fp = seeds.get(path, crawled)
+                    old = self.old.get(path)
+                    if old and not self.full and old["fingerprint"] == fp and \
+                            os.path.exists(os.path.join(self.root, output_name(path))):
+                        self.pages[path] = old
+                        queue.update(old["links"])
+                    else:
+                        to_render.append(path)
+
+                for path, status, content_type, body in pool.imap_unordered(
+                        render_page, to_render):
+                    if status != 200:
+                        if path == "/" or path in seeds:
+                            self.failed_seeds.append((path, status))
+                        self._log("Skipped %s (%d)" % (path, status))
+                        continue
+                    links = []
+                    if content_type.startswith("text/html"):
+                        links = sorted(self.links(body, path))
+                        body = rewrite_links(body, self.domains)
+                    self.write(path, body)
+                    self.pages[path] = {
+                        "fingerprint": seeds.get(path, crawled),
+                        "links": links,
+                    }
+                    queue.update(links)
+                    self.rendered += 1
+                    self._log("Rendered %s" % path)
+        finally:
+            pool.close()
+            pool.join()
+
+        self._remove_stale()
+        self._copy_media()
+        with open(self.manifest_path, "wb") as f:
+            json.dump({"pages": self.pages}, f)
+        return self.rendered, len(self.pages)
+
+    def _remove_stale(self):
+        """Delete files of pages that are no longer reachable."""
+        for path in set(self.old) - set(self.pages):
+            target = os.path.join(self.root, output_name(path))
+            if os.path.exists(target):
+                os.remove(target)
+
+    def _copy_media(self):
+        """Copy static and public media files that are new or changed."""
+        for source, url, private in [(settings.STATIC_ROOT, settings.STATIC_URL, []),
+                                     (settings.MEDIA_ROOT, settings.MEDIA_URL, PRIVATE_MEDIA_DIRS)]:
+            prefix = urlparse.urlsplit(url).path.strip("/")
+            for directory, dirnames, filenames in os.walk(source):
+                relative = os.path.relpath(directory, source)
+                if relative == os.curdir:
+                    dirnames[:] = [name for name in dirnames if name not in private]
+                target_dir = os.path.normpath(os.path.join(self.root, prefix, relative))
+                if not os.path.isdir(target_dir):
+                    os.makedirs(target_dir)
+                for filename in filenames:
+                    src = os.path.join(directory, filename)
+                    dst = os.path.join(target_dir, filename)
+                    src_stat = os.stat(src)
+                    try:
+                        dst_stat = os.stat(dst)
+                    except OSError:
+                        dst_stat = None
+                    if dst_stat is None or dst_stat.st_size != src_stat.st_size \
+                            or dst_stat.st_mtime < src_stat.st_mtime:
+                        shutil.copy2(src, dst)
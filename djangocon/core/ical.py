@@ -0,0 +1,156 @@
+"""
+The schedule as an iCalendar (RFC 5545) feed.
+
+`calendar_chunks` streams one VEVENT per slot. Each filtered variant is
+cached for the current schedule version once it has been rendered, so
+calendar apps polling the feed are mostly served from the cache.
+"""
+
+import hashlib
+
+from datetime import datetime
+
+import pytz
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db.models import Q
+from symposion.schedule.models import Slot
+
+from .schedule import load_slot_chunks
+from .versions import SCHEDULE, get_version, version_timestamp
+
+ICAL_TIMEOUT = 60 * 60 * 24
+
+PRODID = "-//DjangoCon US//Schedule//EN"
+
+
+def escape_text(value):
+    """Escape a TEXT value (RFC 5545, section 3.3.11)."""
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n").replace("\r", ""))
+
+
+def fold(line):
+    """Fold a content line to 75 octets, as CRLF-terminated UTF-8."""
+    line = line.encode("utf-8")
+    parts = []
+    while len(line) > 75:
+        cut = 75 if not parts else 74
+        # Don't split a multi-byte character.
+        while cut and (ord(line[cut]) & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(line[:cut])
+        line = line[cut:]
+    parts.append(line)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_utc(value):
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def slot_utc(date, time):
+    local = pytz.timezone(settings.TIME_ZONE).localize(datetime.combine(date, time))
+    return local.astimezone(pytz.utc)
+
+
+def slot_event(slot, domain, stamp):
+    """Return the VEVENT for a slot loaded with `load_slots`."""
+    presentation = slot.presentation
+    if slot.content_override:
+        summary = slot.content_override.raw
+    elif presentation is not None:
+        summary = presentation.title
+    else:
+        summary = slot.kind.label.title()
+
+    lines = [
+        u"BEGIN:VEVENT",
+        u"UID:slot-%s@%s" % (slot.pk, domain),
+        u"DTSTAMP:%s" % stamp,
+        u"DTSTART:%s" % format_utc(slot_utc(slot.day.date, slot.start)),
+        u"DTEND:%s" % format_utc(slot_utc(slot.day.date, slot.end)),
+        u"SUMMARY:%s" % escape_text(summary),
+    ]
+    if slot.room_list:
+        lines.append(u"LOCATION:%s" % escape_text(
+            u", ".join(room.name for room in slot.room_list)))
+    if presentation is not None:
+        speakers = u", ".join(speaker.name for speaker in slot.speaker_list)
+        description = u"%s\n\n%s" % (speakers, presentation.abstract.raw)
+        lines.append(u"DESCRIPTION:%s" % escape_text(description.strip()))
+        lines.append(u"URL:https://%s%s" % (
+            domain, reverse("schedule_presentation_detail", args=[presentation.pk])))
+    lines.append(u"END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+def filtered_slots(room=None, speaker=None, level=None):
+    """
+    Return the slots to put in the calendar, optionally only those in the
+    room named `room`, those given by the speaker with pk `speaker` or
+    those at the audience level `level`.
+    """
+    slots = Slot.objects.order_by("start")
+    if room:
+        slots = slots.filter(slotroom__room__name=room)
+    if speaker:
+        slots = slots.filter(
+            Q(content_ptr__speaker=speaker) |
+            Q(content_ptr__additional_speakers=speaker)).distinct()
+
+    for chunk in load_slot_chunks(slots):
+        for slot in chunk:
+            if slot.presentation is None and not slot.content_override:
+                continue
+            if (speaker or level) and slot.presentation is None:
+                continue
+            if level and getattr(slot.proposal, "audience_level", None) != level:
+                continue
+            yield slot
+
+
+def calendar_chunks(room=None, speaker=None, level=None):
+    """Yield the calendar, one component at a time."""
+    site = Site.objects.get_current()
+    domain = site.domain
+    stamp = format_utc(datetime.utcfromtimestamp(
+        version_timestamp(get_version(SCHEDULE))))
+
+    yield "".join(fold(line) for line in [
+        u"BEGIN:VCALENDAR",
+        u"VERSION:2.0",
+        u"PRODID:%s" % PRODID,
+        u"CALSCALE:GREGORIAN",
+        u"METHOD:PUBLISH",
+        u"X-WR-CALNAME:%s" % escape_text(site.name),
+    ])
+    for slot in filtered_slots(room, speaker, level):
+        yield slot_event(slot, domain, stamp)
+    yield fold(u"END:VCALENDAR")
+
+
+def calendar_key(room=None, speaker=None, level=None):
+    variant = hashlib.md5(repr((room, speaker, level))).hexdigest()
+    return "schedule_ical:%s:%s" % (variant, get_version(SCHEDULE))
+
+
+def cached_calendar(room=None, speaker=None, level=None):
+    """
+    Yield the calendar from the cache, or render and stream it, caching
+    it once it's complete.
+    """
+    key = calendar_key(room, speaker, level)
+    content = cache.get(key)
+    if content is not None:
+        yield content
+        return
+
+    chunks = []
+    for chunk in calendar_chunks(room, speaker, level):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(key, "".join(chunks), ICAL_TIMEOUT)
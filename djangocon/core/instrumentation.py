@@ -0,0 +1,324 @@
+"""
+In-process request instrumentation.
+
+`InstrumentationMiddleware` times every request and, per URL name,
+aggregates the wall time, number and time of SQL queries, time spent
+rendering templates, cache hits and misses, and any counters the code
+bumps with `count` (such as the markdown cache's). Times and query
+counts go into fixed-bucket histograms, so the memory used doesn't grow
+with traffic and recording a request is a handful of additions under a
+lock.
+
+The aggregates are per process. Staff can read them from the
+``instrumentation`` view, and every ``INSTRUMENTATION_LOG_INTERVAL``
+seconds a process logs them, one JSON line per view.
+
+SQL, template and cache timings come from wrappers installed once per
+process around Django's cursor, `Template.render` and the default cache;
+outside of an instrumented request they only check a thread local.
+"""
+
+import json
+import logging
+import threading
+import time
+
+from bisect import bisect_left
+from functools import wraps
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets; the last bucket is unbounded.
+TIME_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERY_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500]
+
+_local = threading.local()
+
+
+class Histogram(object):
+
+    __slots__ = ["bounds", "counts", "total"]
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def percentile(self, p):
+        """The upper bound of the bucket holding the `p`th percentile."""
+        count = sum(self.counts)
+        if not count:
+            return None
+        rank = p / 100.0 * count
+        seen = 0
+        for bound, bucket in zip(self.bounds + [None], self.counts):
+            seen += bucket
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        return {
+            "buckets": zip([str(bound) for bound in self.bounds] + ["inf"], self.counts),
+            "total": self.total,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class ViewStats(object):
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.time = Histogram(TIME_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.counters = {}
+
+    def add(self, request_stats, elapsed, status):
+        self.requests += 1
+        if status >= 500:
+            self.errors += 1
+        self.time.add(elapsed)
+        self.queries.add(request_stats.queries)
+        self.sql_time += request_stats.sql_time
+        self.template_time += request_stats.template_time
+        self.cache_hits += request_stats.cache_hits
+        self.cache_misses += request_stats.cache_misses
+        for name, value in request_stats.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "time": self.time.as_dict(),
+            "queries": self.queries.as_dict(),
+            "sql_time": self.sql_time,
+            "template_time": self.template_time,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "counters": dict(self.counters),
+        }
+
+
+class RequestStats(object):
+    """What the current request has done so far."""
+
+    __slots__ = ["queries", "sql_time", "template_time", "template_depth",
+                 "cache_hits", "cache_misses", "counters"]
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.counters = {}
+
+
+_views = {}
+_lock = threading.Lock()
+_started = time.time()
+_last_log = [time.time()]
+
+
+def record(view, request_stats, elapsed, status):
+    with _lock:
+        stats = _views.get(view)
+        if stats is None:
+            stats = _views[view] = ViewStats()
+        stats.add(request_stats, elapsed, status)
+
+
+def snapshot():
+    """Return the aggregates for every view, as plain data."""
+    with _lock:
+        views = dict((view, stats.as_dict()) for view, stats in _views.items())
+    return {"since": _started, "views": views}
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+def current():
+    """The stats of the request this thread is serving, or None."""
+    return getattr(_local, "stats", None)
+
+
+def record_cache(hit):
+    stats = current()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def count(name, value=1):
+    """Add `value` to the current request's counter `name`."""
+    stats = current()
+    if stats is not None:
+        stats.counters[name] = stats.counters.get(name, 0) + value
+
+
+def maybe_log():
+    interval = getattr(settings, "INSTRUMENTATION_LOG_INTERVAL", None)
+    if not interval:
+        return
+    now = time.time()
+    with _lock:
+        if now - _last_log[0] < interval:
+            return
+        _last_log[0] = now
+    data = snapshot()
+    # One line per view keeps each record small and easy to grep.
+    for view, stats in sorted(data["views"].items()):
+        logger.info(json.dumps({
+            "event": "view_stats",
+            "view": view,
+            "requests": stats["requests"],
+            "errors": stats["errors"],
+            "time_total": round(stats["time"]["total"], 3),
+            "time_p50": stats["time"]["p50"],
+            "time_p95": stats["time"]["p95"],
+            "time_p99": stats["time"]["p99"],
+            "queries_total": stats["queries"]["total"],
+            "queries_p95": stats["queries"]["p95"],
+            "sql_time": round(stats["sql_time"], 3),
+            "template_time": round(stats["template_time"], 3),
+            "cache_hits": stats["cache_hits"],
+            "cache_misses": stats["cache_misses"],
+            "counters": stats["counters"],
+        }, sort_keys=True))
+
+
+def _timed_execute(execute):
+    @wraps(execute)
+    def wrapper(self, *args, **kwargs):
+        stats = current()
+        if stats is None:
+            return execute(self, *args, **kwargs)
+        start = time.time()
+        try:
+            return execute(self, *args, **kwargs)
+        finally:
+            stats.queries += 1
+            stats.sql_time += time.time() - start
+    return wrapper
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        stats = current()
+        if stats is None:
+            return render(self, context)
+        # Only the outermost template counts; includes are inside it.
+        stats.template_depth += 1
+        start = time.time()
+        try:
+            return render(self, context)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.time() - start
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(key, default=None, *args, **kwargs):
+        value = get(key, default, *args, **kwargs)
+        record_cache(value is not default)
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(keys, *args, **kwargs):
+        stats = current()
+        if stats is None:
+            return get_many(keys, *args, **kwargs)
+        keys = list(keys)
+        # Some backends implement get_many with get; count each key once.
+        _local.stats = None
+        try:
+            values = get_many(keys, *args, **kwargs)
+        finally:
+            _local.stats = stats
+        stats.cache_hits += len(values)
+        stats.cache_misses += len(keys) - len(values)
+        return values
+    return wrapper
+
+
+_installed = []
+
+
+def install():
+    """Install the SQL, template and cache wrappers, once per process."""
+    with _lock:
+        if _installed:
+            return
+        _installed.append(True)
+
+    from django.core.cache import cache
+    from django.db.backends.util import CursorWrapper
+    from django.template.base import Template
+
+    # The debug cursor calls these too, so queries are counted once
+    # whichever cursor Django hands out.
+    CursorWrapper.execute = _timed_execute(CursorWrapper.execute)
+    CursorWrapper.executemany = _timed_execute(CursorWrapper.executemany)
+    Template.render = _timed_render(Template.render)
+    cache.get = _counted_get(cache.get)
+    cache.get_many = _counted_get_many(cache.get_many)
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    if match.url_name:
+        return match.url_name
+    return "%s.%s" % (match.func.__module__, getattr(match.func, "__name__", "view"))
+
+
+class InstrumentationMiddleware(object):
+    """
+    Record each request's timings against its URL name. Put it first in
+    ``MIDDLEWARE_CLASSES`` so the other middleware is timed too.
+    """
+
+    def __init__(self):
+        install()
+
+    def process_request(self, request):
+        _local.stats = RequestStats()
+        request._instrumentation_start = time.time()
+
+    def process_response(self, request, response):
+        stats = current()
+        start = getattr(request, "_instrumentation_start", None)
+        _local.stats = None
+        if stats is not None and start is not None:
+            # Streamed bodies are produced after this, and aren't timed.
+            record(view_name(request), stats, time.time() - start, response.status_code)
+            maybe_log()
+        return response
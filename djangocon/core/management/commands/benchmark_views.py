@@ -0,0 +1,45 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djangocon.benchmarks import views as benchmark
+
+
+class Command(BaseCommand):
+    help = ("Time the heavy views and count their queries against seeded "
+            "test databases of several sizes.")
+
+    option_list = BaseCommand.option_list + (
+        make_option("--sizes", default=",".join(map(str, benchmark.DEFAULT_SIZES)),
+                    help="Comma separated numbers of proposals to seed "
+                         "(default: %default)."),
+        make_option("--output", default=None,
+                    help="Write the results as JSON to this file."),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be comma separated numbers.")
+
+        def log(result):
+            if "error" in result:
+                self.stdout.write("%(view)s size=%(size)d %(cache)s: %(error)s" % result)
+            else:
+                status = "" if result["status"] is None else "%d " % result["status"]
+                self.stdout.write(
+                    "%(view)s size=%(size)d %(cache)s: " % result + status +
+                    "%(seconds).3fs %(queries)d queries (budget %(budget)d) "
+                    "+%(peak_rss_growth_kb)dKB peak" % result)
+
+        results, failures = benchmark.run(sizes, log)
+        if options["output"]:
+            benchmark.write_results(options["output"], sizes, results)
+            self.stdout.write("Wrote %s" % options["output"])
+
+        if failures:
+            errors = [result for result in failures if "error" in result]
+            raise CommandError("%d failed, %d over their query budget: %s" % (
+                len(errors), len(failures) - len(errors), ", ".join(sorted(set(
+                    "%(view)s@%(size)d" % result for result in failures)))))
@@ -0,0 +1,23 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djangocon.core import precompile
+
+
+class Command(BaseCommand):
+    help = "Compile every template and report the ones that fail."
+
+    option_list = BaseCommand.option_list + (
+        make_option("--all", action="store_true", default=False,
+                    help="Also check the installed apps' templates."),
+    )
+
+    def handle(self, *args, **options):
+        names = precompile.template_names(apps=options["all"])
+        compiled, failures = precompile.precompile(names)
+        for name, e in failures:
+            self.stderr.write("%s: %s: %s" % (name, e.__class__.__name__, e))
+        self.stdout.write("Compiled %d templates, %d failed" % (compiled, len(failures)))
+        if failures:
+            raise CommandError("%d templates failed to compile" % len(failures))
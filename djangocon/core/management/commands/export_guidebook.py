@@ -0,0 +1,51 @@
+import os
+
+from optparse import make_option
+
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+
+from djangocon import guidebook
+
+
+class Command(BaseCommand):
+    args = "<directory>"
+    help = "Write every Guidebook export file into a directory for upload."
+
+    option_list = BaseCommand.option_list + (
+        make_option("--formats", default="",
+                    help="Comma separated formats to write for each export "
+                         "(default: each export's usual format)."),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: manage.py export_guidebook <directory>")
+        directory = args[0]
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        formats = [f.strip() for f in options["formats"].split(",") if f.strip()]
+        unknown = set(formats) - set(guidebook.WRITERS)
+        if unknown:
+            raise CommandError("Unknown formats: %s" % ", ".join(sorted(unknown)))
+
+        domain = Site.objects.get_current().domain
+        for name, (source, default_format) in sorted(guidebook.EXPORTS.items()):
+            files = []
+            writers = []
+            for format in formats or [default_format]:
+                path = os.path.join(directory, guidebook.export_filename(name, format))
+                f = open(path, "wb")
+                files.append((path, f))
+                writers.append(guidebook.WRITERS[format](f))
+
+            # One pass over the rows feeds every format.
+            try:
+                guidebook.write_rows(source(domain), *writers)
+            finally:
+                for path, f in files:
+                    f.close()
+
+            for path, f in files:
+                self.stdout.write("Wrote %s" % path)
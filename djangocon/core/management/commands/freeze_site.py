@@ -0,0 +1,33 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djangocon.core.freeze import Freezer
+
+
+class Command(BaseCommand):
+    args = "<directory>"
+    help = "Freeze the public site into static files, for the archive."
+
+    option_list = BaseCommand.option_list + (
+        make_option("--workers", type="int", default=4,
+                    help="Number of processes rendering pages."),
+        make_option("--full", action="store_true", default=False,
+                    help="Re-render every page, not just those that changed."),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: manage.py freeze_site <directory>")
+
+        freezer = Freezer(
+            args[0],
+            workers=options["workers"],
+            full=options["full"],
+            stdout=self.stdout if int(options["verbosity"]) > 1 else None,
+        )
+        rendered, total = freezer.freeze()
+        self.stdout.write("Rendered %d of %d pages into %s" % (rendered, total, args[0]))
+        if freezer.failed_seeds:
+            raise CommandError("These pages didn't render: %s" % ", ".join(
+                "%s (%d)" % failure for failure in sorted(freezer.failed_seeds)))
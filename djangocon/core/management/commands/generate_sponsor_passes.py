@@ -0,0 +1,72 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djangocon.lost_levels.gateway import EventbriteError, get_gateway
+from djangocon.lost_levels.passes import MAX_WORKERS, PassResult, generate_passes
+from symposion.sponsorship.models import Sponsor
+
+
+class Command(BaseCommand):
+    args = '["Sponsor Name=passes" ...]'
+    help = "Create Eventbrite discount codes for sponsors and email them."
+
+    option_list = BaseCommand.option_list + (
+        make_option("--tickets", default="",
+                    help="Comma separated ticket names the codes apply to "
+                         "(default: every ticket that isn't a donation)."),
+        make_option("--all", type="int", dest="all_passes", default=0,
+                    help="Give every active sponsor this many passes."),
+        make_option("--percent-off", type="int", dest="percent_off"),
+        make_option("--amount-off", type="float", dest="amount_off"),
+        make_option("--workers", type="int", default=MAX_WORKERS),
+    )
+
+    def handle(self, *args, **options):
+        percent_off = options.get("percent_off")
+        amount_off = options.get("amount_off")
+        if (percent_off is None) == (amount_off is None):
+            raise CommandError("Give exactly one of --percent-off or --amount-off.")
+        if percent_off is not None:
+            discount = {"percent_off": percent_off}
+        else:
+            discount = {"amount_off": amount_off}
+
+        passes = {}
+        for arg in args:
+            name, sep, count = arg.rpartition("=")
+            if not sep or not count.isdigit():
+                raise CommandError("Expected \"Sponsor Name=passes\", got %r" % arg)
+            passes[name] = int(count)
+
+        allocations = []
+        for sponsor in Sponsor.objects.filter(active=True).order_by("name"):
+            count = passes.pop(sponsor.name, options["all_passes"])
+            if count:
+                allocations.append((sponsor, count))
+        if passes:
+            raise CommandError("No active sponsor named %s" % ", ".join(sorted(passes)))
+        if not allocations:
+            raise CommandError("No sponsors were given any passes.")
+
+        try:
+            choices, ticket_ids = get_gateway().tickets()
+            if options["tickets"]:
+                ticket_names = [name.strip() for name in options["tickets"].split(",")]
+                unknown = set(ticket_names) - set(ticket_ids)
+                if unknown:
+                    raise CommandError("Unknown tickets: %s" % ", ".join(sorted(unknown)))
+            else:
+                ticket_names = sorted(ticket_ids)
+
+            results = generate_passes(
+                allocations, ticket_names, max_workers=options["workers"], **discount)
+        except EventbriteError as e:
+            raise CommandError(e)
+
+        for result in results:
+            self.stdout.write(unicode(result))
+
+        failed = [result for result in results if result.status == PassResult.FAILED]
+        if failed:
+            raise CommandError("%d of %d discount codes failed" % (len(failed), len(results)))
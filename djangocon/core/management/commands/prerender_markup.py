@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from djangocon.core import markup
+
+
+class Command(BaseCommand):
+    help = "Render the texts the markdown filter is used on into its cache."
+
+    def handle(self, *args, **options):
+        for label, texts in markup.markup_texts():
+            rendered = markup.prerender(texts)
+            self.stdout.write("%s: rendered %d" % (label, rendered))
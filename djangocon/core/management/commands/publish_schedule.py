@@ -0,0 +1,26 @@
+import time
+
+from optparse import make_option
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from djangocon.core import publish
+
+
+class Command(BaseCommand):
+    help = "Render the static schedule artifacts and make them current."
+
+    option_list = BaseCommand.option_list + (
+        make_option("--delay", type="int", default=0,
+                    help="Wait this many seconds for the schedule to settle first."),
+    )
+
+    def handle(self, *args, **options):
+        if options["delay"]:
+            time.sleep(options["delay"])
+            cache.delete(publish.PENDING_KEY)
+
+        pointer = publish.publish()
+        self.stdout.write("Published schedule version %s to %s" % (
+            pointer["version"], pointer["path"]))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from djangocon.core import exports
+
+
+class Command(BaseCommand):
+    args = "<job_id>"
+    help = "Build the artifact for a queued export job."
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: manage.py run_export <job_id>")
+
+        try:
+            job = exports.run(args[0])
+        except exports.ExportJobError as e:
+            raise CommandError(e)
+
+        self.stdout.write("Export %s written to %s" % (job["export"], job["url"]))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from symposion.schedule.models import Day
+
+from djangocon.core import publish
+
+
+class Command(BaseCommand):
+    help = "Render each day of the schedule grid into the cache."
+
+    def handle(self, *args, **options):
+        days = Day.objects.filter(schedule__published=True).order_by("date")
+        for day in days:
+            publish.cached_grid(day)
+            self.stdout.write("Cached the grid for %s" % day.date)
@@ -0,0 +1,102 @@
+"""
+A render cache for the ``markdown`` template filter.
+
+Rendering goes through two levels: a per-process LRU, then the shared
+cache backend. Entries are keyed by a hash of the text and of the
+``MARKITUP_FILTER`` setting, so editing the text or changing the parser
+settings simply looks up a new key; nothing needs invalidating.
+
+Hits and misses at each level are counted in the request's
+instrumentation (see `djangocon.core.instrumentation`).
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.encoding import force_bytes
+from symposion.markdown_parser import parse
+
+from . import instrumentation
+from .utils import LRUCache
+
+MARKDOWN_TIMEOUT = 60 * 60 * 24 * 30
+
+LOCAL_CACHE_SIZE = 2048
+
+_local = LRUCache(LOCAL_CACHE_SIZE)
+
+
+def parser_version():
+    """A hash of the parser settings, to key rendered markup on."""
+    return hashlib.sha1(repr(getattr(settings, "MARKITUP_FILTER", None))).hexdigest()[:12]
+
+
+def markdown_key(text, version=None):
+    return "markdown:%s:%s" % (
+        version or parser_version(), hashlib.sha1(force_bytes(text)).hexdigest())
+
+
+def render_markdown(text):
+    """Return `text` rendered by the markdown parser, from a cache if possible."""
+    if not isinstance(text, basestring):
+        return parse(text)
+
+    key = markdown_key(text)
+    html = _local.get(key)
+    if html is not None:
+        instrumentation.count("markdown_local_hits")
+        return html
+
+    html = cache.get(key)
+    if html is None:
+        instrumentation.count("markdown_misses")
+        html = parse(text)
+        cache.set(key, html, MARKDOWN_TIMEOUT)
+    else:
+        instrumentation.count("markdown_shared_hits")
+    _local.set(key, html)
+    return html
+
+
+def markup_texts():
+    """
+    Yield ``(label, texts)`` for the texts the ``markdown`` filter renders:
+    the sponsor benefit texts, including each sponsor's listing text.
+
+    Markup fields aren't included; markitup renders those into their
+    ``_rendered`` columns when they're saved.
+    """
+    from symposion.sponsorship.models import SponsorBenefit
+
+    yield "sponsorship.SponsorBenefit.text", SponsorBenefit.objects.exclude(
+        text="").values_list("text", flat=True).iterator()
+
+
+def prerender(texts, chunk_size=200):
+    """
+    Render and cache whichever of `texts` aren't cached yet. Returns the
+    number rendered.
+    """
+    version = parser_version()
+    rendered = 0
+    chunk = {}
+
+    def flush():
+        cached = cache.get_many(chunk.keys())
+        missing = dict(
+            (key, parse(text)) for key, text in chunk.items() if key not in cached)
+        if missing:
+            cache.set_many(missing, MARKDOWN_TIMEOUT)
+        chunk.clear()
+        return len(missing)
+
+    for text in texts:
+        if not text:
+            continue
+        chunk[markdown_key(text, version)] = text
+        if len(chunk) >= chunk_size:
+            rendered += flush()
+    if chunk:
+        rendered += flush()
+    return rendered
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'ScheduleChange'
+        db.create_table(u'core_schedulechange', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('slot_id', self.gf('django.db.models.fields.IntegerField')()),
+            ('changed', self.gf('django.db.models.fields.DateTimeField')(default=datetime.datetime.now)),
+        ))
+        db.send_create_signal(u'core', ['ScheduleChange'])
+
+
+    def backwards(self, orm):
+        # Deleting model 'ScheduleChange'
+        db.delete_table(u'core_schedulechange')
+
+
+    models = {
+        u'core.schedulechange': {
+            'Meta': {'object_name': 'ScheduleChange'},
+            'changed': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'slot_id': ('django.db.models.fields.IntegerField', [], {})
+        }
+    }
+
+    complete_apps = ['core']
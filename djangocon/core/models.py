@@ -0,0 +1,195 @@
+import datetime
+
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from symposion.boxes.models import Box
+from symposion.reviews.models import ProposalResult
+from symposion.schedule.models import Day, Presentation, Room, Slot, SlotRoom
+from symposion.speakers.models import Speaker
+from symposion.sponsorship.models import Sponsor, SponsorBenefit, SponsorLevel
+
+from djangocon.proposals.models import (
+    OpenSpaceProposal, TalkProposal, TutorialProposal)
+
+from .versions import PROPOSALS, SCHEDULE, SPONSORS, bump_version
+
+
+class ScheduleChange(models.Model):
+    """
+    A change to a slot in the schedule feed. The id is the sequence
+    number clients pass back as ``since``.
+    """
+
+    slot_id = models.IntegerField()
+    changed = models.DateTimeField(default=datetime.datetime.now)
+
+
+PROPOSAL_MODELS = [
+    OpenSpaceProposal,
+    ProposalResult,
+    Speaker,
+    TalkProposal,
+    TutorialProposal,
+]
+
+SCHEDULE_MODELS = [
+    Day,
+    Presentation,
+    Room,
+    Slot,
+    SlotRoom,
+    Speaker,
+    TalkProposal,
+    TutorialProposal,
+]
+
+SPONSOR_MODELS = [
+    Sponsor,
+    SponsorBenefit,
+    SponsorLevel,
+]
+
+
+def unless_publishing(handler):
+    """
+    Skip `handler` for saves the schedule publisher makes while it renders,
+    which would otherwise make it publish again.
+    """
+    @wraps(handler)
+    def wrapper(*args, **kwargs):
+        from .publish import publishing
+        if not publishing():
+            return handler(*args, **kwargs)
+    return wrapper
+
+
+@unless_publishing
+def proposals_changed(sender, **kwargs):
+    bump_version(PROPOSALS)
+
+
+for model in PROPOSAL_MODELS:
+    post_save.connect(proposals_changed, sender=model,
+                      dispatch_uid="proposals_changed_save_%s" % model.__name__)
+    post_delete.connect(proposals_changed, sender=model,
+                        dispatch_uid="proposals_changed_delete_%s" % model.__name__)
+
+
+def changed_slot_ids(sender, instance):
+    """Return the ids of the slots whose feed entries `instance` is part of."""
+    if sender is Slot:
+        return [instance.pk]
+    if sender is SlotRoom:
+        return [instance.slot_id]
+    if sender is Presentation:
+        return [instance.slot_id, getattr(instance, "_initial_slot_id", None)]
+    if sender is Day:
+        slots = Slot.objects.filter(day=instance)
+    elif sender is Room:
+        slots = Slot.objects.filter(slotroom__room=instance)
+    elif sender is Speaker:
+        slots = Slot.objects.filter(
+            Q(content_ptr__speaker=instance) |
+            Q(content_ptr__additional_speakers=instance))
+    else:
+        slots = Slot.objects.filter(content_ptr__proposal_base=instance.pk)
+    return slots.values_list("pk", flat=True)
+
+
+def record_schedule_change(slot_ids):
+    slot_ids = set(slot_ids)
+    slot_ids.discard(None)
+    ScheduleChange.objects.bulk_create([
+        ScheduleChange(slot_id=slot_id) for slot_id in sorted(slot_ids)
+    ])
+
+
+@unless_publishing
+def schedule_changed(sender, instance, **kwargs):
+    record_schedule_change(changed_slot_ids(sender, instance))
+    bump_version(SCHEDULE)
+    publish_schedule()
+
+
+def publish_schedule():
+    # Imported here: the publisher renders through modules that import
+    # these models.
+    from .publish import schedule_publish
+    schedule_publish()
+
+
+@unless_publishing
+def speakers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        # `instance` is a speaker and `pk_set` holds presentations.
+        slot_ids = Presentation.objects.filter(
+            pk__in=pk_set or []).values_list("slot_id", flat=True)
+    else:
+        slot_ids = [instance.slot_id]
+    record_schedule_change(slot_ids)
+    bump_version(SCHEDULE)
+    publish_schedule()
+
+
+def store_initial_slot(sender, instance, **kwargs):
+    # Remember where a presentation was, so moving it updates both slots.
+    instance._initial_slot_id = instance.slot_id
+
+
+for model in SCHEDULE_MODELS:
+    post_save.connect(schedule_changed, sender=model,
+                      dispatch_uid="schedule_changed_save_%s" % model.__name__)
+    post_delete.connect(schedule_changed, sender=model,
+                        dispatch_uid="schedule_changed_delete_%s" % model.__name__)
+
+m2m_changed.connect(speakers_changed,
+                    sender=Presentation.additional_speakers.through,
+                    dispatch_uid="schedule_changed_additional_speakers")
+
+post_init.connect(store_initial_slot, sender=Presentation,
+                  dispatch_uid="store_initial_slot_Presentation")
+
+
+@unless_publishing
+def box_changed(sender, instance, **kwargs):
+    # Each day of the schedule grid includes its "schedule_day_N" box.
+    if instance.label.startswith("schedule_day_"):
+        bump_version(SCHEDULE)
+        publish_schedule()
+
+
+post_save.connect(box_changed, sender=Box, dispatch_uid="schedule_changed_save_Box")
+post_delete.connect(box_changed, sender=Box, dispatch_uid="schedule_changed_delete_Box")
+
+
+@unless_publishing
+def sponsors_changed(sender, **kwargs):
+    bump_version(SPONSORS)
+    publish_schedule()
+
+
+for model in SPONSOR_MODELS:
+    post_save.connect(sponsors_changed, sender=model,
+                      dispatch_uid="sponsors_changed_save_%s" % model.__name__)
+    post_delete.connect(sponsors_changed, sender=model,
+                        dispatch_uid="sponsors_changed_delete_%s" % model.__name__)
+
+
+@unless_publishing
+def applicant_changed(sender, instance, update_fields=None, **kwargs):
+    # Sponsor contacts include the applicant's email; saves that can't
+    # have changed it, like the last_login update, are skipped.
+    if update_fields is not None and "email" not in update_fields:
+        return
+    if instance.sponsorships.exists():
+        bump_version(SPONSORS)
+
+
+post_save.connect(applicant_changed, sender=User,
+                  dispatch_uid="sponsors_changed_save_User")
@@ -0,0 +1,90 @@
+"""
+Compile the whole template tree up front.
+
+With ``django.template.loaders.cached.Loader`` in ``TEMPLATE_LOADERS``
+each process keeps the templates it has compiled. `warm_templates`,
+called from ``djangocon/wsgi.py``, fills that cache when a worker boots,
+so the first requests don't pay for parsing ``site_base.html`` and its
+includes, and reports any template that fails to compile.
+"""
+
+import logging
+import os
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.template.loaders.app_directories import app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = (".html", ".txt", ".xml", ".csv")
+
+CACHED_LOADER = "django.template.loaders.cached.Loader"
+
+
+def template_dirs(apps=True):
+    """The template directories, in the order the loaders search them."""
+    dirs = list(settings.TEMPLATE_DIRS)
+    if apps:
+        dirs.extend(app_template_dirs)
+    return dirs
+
+
+def template_names(apps=True):
+    """
+    Return the name of every template in the template directories (and
+    the installed apps' unless `apps` is False), each only once.
+    """
+    names = []
+    seen = set()
+    for directory in template_dirs(apps):
+        for root, dirnames, filenames in os.walk(directory):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith("."))
+            for filename in sorted(filenames):
+                if filename.startswith(".") or not filename.endswith(TEMPLATE_EXTENSIONS):
+                    continue
+                name = os.path.relpath(os.path.join(root, filename), directory)
+                name = name.replace(os.sep, "/")
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+    return names
+
+
+def precompile(names):
+    """
+    Load and compile each of `names`. Returns ``(compiled, failures)``,
+    with failures as a list of ``(name, exception)``.
+    """
+    compiled = 0
+    failures = []
+    for name in names:
+        try:
+            get_template(name)
+        except Exception as e:
+            failures.append((name, e))
+        else:
+            compiled += 1
+    return compiled, failures
+
+
+def cached_loader_enabled():
+    for loader in settings.TEMPLATE_LOADERS:
+        if isinstance(loader, (list, tuple)):
+            loader = loader[0]
+        if loader == CACHED_LOADER:
+            return True
+    return False
+
+
+def warm_templates():
+    """
+    Compile every template into the cached loader. Does nothing when the
+    cached loader isn't used, as in development.
+    """
+    if not cached_loader_enabled():
+        return
+    compiled, failures = precompile(template_names())
+    for name, e in failures:
+        logger.warning("Template %s failed to compile: %s: %s", name, e.__class__.__name__, e)
+    logger.info("Precompiled %d templates, %d failed", compiled, len(failures))
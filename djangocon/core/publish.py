@@ -0,0 +1,268 @@
+"""
+Static, pre-rendered schedule artifacts.
+
+After the schedule changes (and has been quiet for
+``SCHEDULE_PUBLISH_DELAY`` seconds) a ``manage.py publish_schedule``
+process renders the public schedule JSON, each day's grid and the
+Guidebook files into a new directory under
+``MEDIA_ROOT/schedule/<version>/``, next to a gzipped copy of each, and
+then atomically replaces the ``current.json`` pointer. Views redirect to
+or include the current files, so reads don't touch the database.
+
+Publishing is off unless ``SCHEDULE_PUBLISH_DELAY`` is set (it isn't in
+development). Saves made while rendering, such as a sponsor logo's
+cached dimensions, don't trigger the change signals, so the publisher
+doesn't start itself again.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test.client import RequestFactory
+from symposion.schedule.models import Day
+from symposion.schedule.timetable import TimeTable
+
+from djangocon import guidebook
+
+from .schedule import schedule_feed
+from .versions import SCHEDULE, SPONSORS, get_version
+
+PUBLISH_DIR = "schedule"
+
+POINTER_NAME = "current.json"
+
+# Keep the previous version too, for clients halfway through fetching it.
+KEEP_VERSIONS = 2
+
+PENDING_KEY = "schedule_publish:pending"
+
+GRID_TIMEOUT = 60 * 60 * 24
+
+_local = threading.local()
+
+
+def publish_root():
+    return os.path.join(settings.MEDIA_ROOT, PUBLISH_DIR)
+
+
+def grid_filename(day):
+    return "grid-%s.html" % day.date.isoformat()
+
+
+def current_versions():
+    """The data versions the artifacts are rendered from."""
+    return {
+        SCHEDULE: get_version(SCHEDULE),
+        SPONSORS: get_version(SPONSORS),
+    }
+
+
+def publishing():
+    """Whether this thread is rendering the artifacts right now."""
+    return getattr(_local, "publishing", False)
+
+
+@contextmanager
+def _publishing():
+    _local.publishing = True
+    try:
+        yield
+    finally:
+        _local.publishing = False
+
+
+def schedule_publish():
+    """
+    Publish the schedule once it has been quiet for a while. Called for
+    every schedule change; only the first change in a quiet period starts
+    a publisher.
+    """
+    delay = getattr(settings, "SCHEDULE_PUBLISH_DELAY", None)
+    if delay is None or publishing():
+        return
+    # The publisher clears the key before it renders, so changes made
+    # while it runs start another one.
+    if cache.add(PENDING_KEY, True, delay + 60 * 5):
+        manage = os.path.join(settings.PROJECT_ROOT, "manage.py")
+        subprocess.Popen(
+            [sys.executable, manage, "publish_schedule", "--delay=%d" % delay],
+            close_fds=True)
+
+
+def render_grid(day):
+    # Render as an anonymous visitor, so the grid has no edit links.
+    request = RequestFactory().get("/schedule/")
+    request.user = AnonymousUser()
+    return render_to_string("schedule/_grid.html", {
+        "timetable": TimeTable(day),
+        "request": request,
+    })
+
+
+def grid_key(day):
+    return "schedule_grid:%s:%s" % (day.pk, get_version(SCHEDULE))
+
+
+def cached_grid(day):
+    """
+    Return the rendered grid for `day` from the cache, rendering it on a
+    miss. Entries are keyed on the schedule version, which the Slot,
+    Presentation, Room and "schedule_day_N" Box signals bump.
+    """
+    key = grid_key(day)
+    html = cache.get(key)
+    if html is None:
+        html = render_grid(day)
+        cache.set(key, html, GRID_TIMEOUT)
+    return html
+
+
+def _write(directory, filename, content):
+    path = os.path.join(directory, filename)
+    with open(path, "wb") as f:
+        f.write(content)
+    _gzip(path)
+
+
+def _gzip(path):
+    with open(path, "rb") as source:
+        with gzip.open(path + ".gz", "wb", 9) as target:
+            shutil.copyfileobj(source, target)
+
+
+def _write_pointer(pointer):
+    fd, path = tempfile.mkstemp(dir=publish_root(), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        json.dump(pointer, f)
+    os.rename(path, os.path.join(publish_root(), POINTER_NAME))
+
+
+def publish():
+    """
+    Render the artifacts for the current schedule version, if they don't
+    exist yet, and make them current. Returns the new pointer.
+    """
+    with _publishing():
+        return _publish()
+
+
+def _publish():
+    versions = current_versions()
+    current = get_current()
+    if current is not None and current["versions"] == versions:
+        return current
+    version = versions[SCHEDULE]
+
+    if not os.path.isdir(publish_root()):
+        os.makedirs(publish_root())
+
+    name = "%s-%s" % (version.replace(".", "-"), versions[SPONSORS].replace(".", "-"))
+    staging = tempfile.mkdtemp(dir=publish_root(), prefix=".")
+    try:
+        cursor, content = schedule_feed()
+        _write(staging, "schedule.json", content)
+
+        grids = {}
+        for day in Day.objects.filter(schedule__published=True).order_by("date"):
+            _write(staging, grid_filename(day), cached_grid(day).encode("utf-8"))
+            grids[day.pk] = grid_filename(day)
+
+        for export in guidebook.EXPORTS:
+            filename = guidebook.export_filename(export)
+            with open(os.path.join(staging, filename), "wb") as f:
+                guidebook.write_export(export, f)
+            _gzip(os.path.join(staging, filename))
+
+        os.chmod(staging, 0755)
+        target = os.path.join(publish_root(), name)
+        if os.path.isdir(target):
+            # Already rendered, only the pointer was lost.
+            shutil.rmtree(staging)
+        else:
+            os.rename(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    pointer = {
+        "version": version,
+        "versions": versions,
+        "cursor": cursor,
+        "path": "%s/%s/" % (PUBLISH_DIR, name),
+        "grids": grids,
+    }
+    _write_pointer(pointer)
+    _remove_old_versions(name)
+    return pointer
+
+
+def _remove_old_versions(keep):
+    versions = sorted(
+        entry for entry in os.listdir(publish_root())
+        if os.path.isdir(os.path.join(publish_root(), entry))
+        and not entry.startswith("."))
+    for entry in versions[:-KEEP_VERSIONS]:
+        if entry != keep:
+            shutil.rmtree(os.path.join(publish_root(), entry), ignore_errors=True)
+
+
+_current = {"stat": None, "pointer": None}
+_current_lock = threading.Lock()
+
+
+def get_current():
+    """
+    Return the current pointer, or None if nothing has been published.
+    The pointer is re-read only when the file changes.
+    """
+    path = os.path.join(publish_root(), POINTER_NAME)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    # The pointer is replaced by a rename, so a new inode means a new file.
+    key = (stat.st_ino, stat.st_mtime)
+    with _current_lock:
+        if _current["stat"] != key:
+            try:
+                with open(path, "rb") as f:
+                    _current["pointer"] = json.load(f)
+            except (IOError, ValueError):
+                return None
+            _current["stat"] = key
+        return _current["pointer"]
+
+
+def get_published(*namespaces):
+    """
+    Return the current pointer if it was rendered from the current
+    versions of `namespaces`, else None: until the publisher catches up
+    the artifacts are stale and views should render the data themselves.
+    """
+    current = get_current()
+    if current is None:
+        return None
+    for namespace in namespaces:
+        if current["versions"].get(namespace) != get_version(namespace):
+            return None
+    return current
+
+
+def artifact_url(pointer, filename):
+    return settings.MEDIA_URL + pointer["path"] + filename
+
+
+def artifact_path(pointer, filename):
+    return os.path.join(settings.MEDIA_ROOT, pointer["path"], filename)
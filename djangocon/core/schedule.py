@@ -0,0 +1,302 @@
+"""
+Bulk, query-bounded access to the conference schedule.
+
+`load_slots` fetches every slot together with its presentation, proposal,
+rooms and speakers in a fixed number of queries, so anything walking the
+whole schedule (the JSON feed, exports, the grid) doesn't lazily load
+relations one slot at a time. `load_slot_chunks` does the same a chunk
+at a time, for streamed output that shouldn't hold the whole schedule.
+"""
+
+import itertools
+import json
+
+from datetime import date, datetime, timedelta
+from operator import attrgetter
+
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db.models import Max, Q
+from symposion.proposals.models import ProposalBase
+from symposion.schedule.models import Slot
+
+from .models import ScheduleChange
+from .versions import SCHEDULE, get_version
+
+SCHEDULE_JSON_TIMEOUT = 60 * 60 * 24
+
+# Change ids are assigned on insert, not on commit, so a transaction that
+# commits late can add a change below a cursor clients already have.
+# Changes this recent are sent again whatever the cursor; this has to be
+# longer than any transaction that edits the schedule.
+CHANGES_OVERLAP = timedelta(minutes=5)
+
+SLOT_CHUNK_SIZE = 200
+
+PRESENTATION_SLOT_KINDS = ["talk", "tutorial", "plenary"]
+PRESENTATION_PROPOSAL_KINDS = ["talk", "tutorial"]
+
+
+def load_slots(queryset=None):
+    """
+    Return a list of slots with their related data attached.
+
+    Each slot gets the following attributes, none of which hit the
+    database once the list has been built:
+
+    * ``presentation`` -- the `Presentation` in the slot, or None
+    * ``proposal`` -- the presentation's proposal subclass, or None
+    * ``room_list`` -- the slot's rooms, ordered by name
+    * ``speaker_list`` -- the presentation's speakers, or an empty list
+    """
+    if queryset is None:
+        queryset = Slot.objects.all()
+
+    slots = list(queryset.select_related(
+        "day",
+        "kind",
+        "content_ptr",
+        "content_ptr__speaker",
+        "content_ptr__speaker__user",
+    ).prefetch_related(
+        "slotroom_set__room",
+        "content_ptr__additional_speakers__user",
+    ))
+
+    proposal_ids = set()
+    for slot in slots:
+        slot.presentation = slot.content
+        if slot.presentation is not None:
+            proposal_ids.add(slot.presentation.proposal_base_id)
+
+    proposals = {}
+    if proposal_ids:
+        queryset = ProposalBase.objects.filter(pk__in=proposal_ids)
+        queryset = queryset.select_related("kind").select_subclasses()
+        proposals = dict((proposal.pk, proposal) for proposal in queryset)
+
+    for slot in slots:
+        slot.room_list = sorted(
+            (slot_room.room for slot_room in slot.slotroom_set.all()),
+            key=lambda room: room.name)
+        if slot.presentation is not None:
+            slot.proposal = proposals.get(slot.presentation.proposal_base_id)
+            slot.speaker_list = list(slot.presentation.speakers())
+        else:
+            slot.proposal = None
+            slot.speaker_list = []
+
+    return slots
+
+
+def load_slot_chunks(queryset, chunk_size=SLOT_CHUNK_SIZE):
+    """
+    Yield the slots of `queryset`, in its order, as lists of at most
+    `chunk_size` slots loaded with `load_slots`. Only the slot ids are
+    read up front, so one chunk of slots is in memory at a time.
+    """
+    pks = list(queryset.values_list("pk", flat=True))
+    for i in range(0, len(pks), chunk_size):
+        chunk = pks[i:i + chunk_size]
+        slots = dict((slot.pk, slot) for slot in load_slots(Slot.objects.filter(pk__in=chunk)))
+        # Slots deleted since the ids were read are skipped.
+        yield [slots[pk] for pk in chunk if pk in slots]
+
+
+class RoomColumns(object):
+    """
+    The grid column of every room used by a list of slots loaded with
+    `load_slots`, in name order, so slots can be ordered by their rooms
+    in memory.
+    """
+
+    def __init__(self, slots):
+        rooms = {}
+        for slot in slots:
+            for room in slot.room_list:
+                rooms[room.pk] = room
+        ordered = sorted(rooms.values(), key=lambda room: (room.name, room.pk))
+        self.columns = dict((room.pk, column) for column, room in enumerate(ordered))
+
+    def key(self, slot):
+        return [self.columns[room.pk] for room in slot.room_list]
+
+    def sort(self, slots):
+        return sorted(slots, key=self.key)
+
+
+def grid_rows(day):
+    """
+    Return the rows of a day's schedule grid, in start order, as dicts of
+    ``start`` and the ``slots`` starting then, ordered by room. The slots
+    are loaded with `load_slots`, so the number of queries doesn't depend
+    on the number of slots.
+    """
+    slots = load_slots(Slot.objects.filter(day=day).order_by("start", "end"))
+    columns = RoomColumns(slots)
+    return [
+        {"start": start, "slots": columns.sort(group)}
+        for start, group in itertools.groupby(slots, key=attrgetter("start"))
+    ]
+
+
+def duration(start, end):
+    """Return the number of minutes between two `datetime.time` values."""
+    delta = datetime.combine(date.min, end) - datetime.combine(date.min, start)
+    return delta.seconds // 60
+
+
+def serialize_slot(slot, domain, include_contacts=False):
+    """
+    Return the `schedule_json` representation of a slot loaded with
+    `load_slots`, or None if the slot isn't part of the public feed.
+    """
+    room = ", ".join(room.name for room in slot.room_list)
+    start = datetime.combine(slot.day.date, slot.start).isoformat()
+    end = datetime.combine(slot.day.date, slot.end).isoformat()
+
+    if slot.kind.label in PRESENTATION_SLOT_KINDS:
+        presentation, proposal = slot.presentation, slot.proposal
+        if presentation is None or proposal is None:
+            return None
+        if proposal.kind.slug not in PRESENTATION_PROPOSAL_KINDS:
+            return None
+        if not hasattr(proposal, "recording_release"):
+            return None
+
+        if include_contacts:
+            contact = [speaker.email for speaker in slot.speaker_list]
+        else:
+            contact = ["redacted"]
+
+        return {
+            "name": presentation.title,
+            "room": room,
+            "start": start,
+            "end": end,
+            "duration": duration(slot.start, slot.end),
+            "authors": [speaker.name for speaker in slot.speaker_list],
+            "released": proposal.recording_release,
+            "license": "",
+            "contact": contact,
+            "abstract": presentation.abstract.raw,
+            "description": presentation.description.raw,
+            "conf_key": slot.pk,
+            "conf_url": "https://%s%s" % (
+                domain,
+                reverse("schedule_presentation_detail", args=[presentation.pk])
+            ),
+            "kind": proposal.kind.slug,
+            "tags": "",
+        }
+
+    if slot.kind.label == "lightning":
+        return {
+            "name": slot.content_override.raw if slot.content_override else "Lightning Talks",
+            "room": room,
+            "start": start,
+            "end": end,
+            "duration": duration(slot.start, slot.end),
+            "authors": None,
+            "released": True,
+            "license": "",
+            "contact": None,
+            "abstract": "Lightning Talks",
+            "description": "Lightning Talks",
+            "conf_key": slot.pk,
+            "conf_url": None,
+            "kind": slot.kind.label,
+            "tags": "",
+        }
+
+    return None
+
+
+def build_schedule_data(include_contacts=False):
+    """Serialize the whole schedule, ordered by start time."""
+    domain = Site.objects.get_current().domain
+    data = []
+    for slot in load_slots(Slot.objects.order_by("start")):
+        slot_data = serialize_slot(slot, domain, include_contacts)
+        if slot_data is not None:
+            data.append(slot_data)
+    return data
+
+
+def current_cursor():
+    """Return the sequence number of the latest schedule change."""
+    cursor = ScheduleChange.objects.aggregate(cursor=Max("pk"))["cursor"]
+    return cursor or 0
+
+
+def schedule_feed(include_contacts=False):
+    """
+    Return ``(cursor, content)``: the schedule as a JSON string, and the
+    sequence number it is current up to, for ``?since=`` polling.
+
+    The result is cached per audience (staff see speaker contact emails)
+    and per schedule version, so any schedule edit invalidates it.
+    """
+    variant = "staff" if include_contacts else "public"
+    key = "schedule_json:%s:%s" % (variant, get_version(SCHEDULE))
+    feed = cache.get(key)
+    if feed is None:
+        # Read the cursor first: the content is then at least that new.
+        cursor = current_cursor()
+        feed = (cursor, json.dumps(build_schedule_data(include_contacts)))
+        cache.set(key, feed, SCHEDULE_JSON_TIMEOUT)
+    return feed
+
+
+def schedule_json(include_contacts=False):
+    """Return the schedule as a JSON string."""
+    return schedule_feed(include_contacts)[1]
+
+
+def schedule_changes(since, include_contacts=False):
+    """
+    Return the schedule entries changed after the sequence number `since`
+    as a JSON string of ``{"cursor": ..., "upserts": [...],
+    "tombstones": [...]}``. Raises ValueError if `since` is past the
+    latest change.
+
+    Entries changed in the last `CHANGES_OVERLAP` are included too, so
+    changes committed out of order aren't missed; clients apply upserts
+    idempotently anyway. Changed slots that are no longer in the feed are
+    returned as tombstones, by their ``conf_key``. The work done depends
+    on the number of changes, not the size of the schedule.
+    """
+    if since > current_cursor():
+        raise ValueError("Cursor %d is past the latest change" % since)
+
+    variant = "staff" if include_contacts else "public"
+    key = "schedule_changes:%s:%d:%s" % (variant, since, get_version(SCHEDULE))
+    content = cache.get(key)
+    if content is not None:
+        return content
+
+    cursor = since
+    slot_ids = set()
+    changes = ScheduleChange.objects.filter(
+        Q(pk__gt=since) | Q(changed__gte=datetime.now() - CHANGES_OVERLAP)
+    ).values_list("pk", "slot_id")
+    for pk, slot_id in changes:
+        cursor = max(cursor, pk)
+        slot_ids.add(slot_id)
+
+    upserts = []
+    if slot_ids:
+        domain = Site.objects.get_current().domain
+        for slot in load_slots(Slot.objects.filter(pk__in=slot_ids).order_by("start")):
+            slot_data = serialize_slot(slot, domain, include_contacts)
+            if slot_data is not None:
+                upserts.append(slot_data)
+
+    content = json.dumps({
+        "cursor": cursor,
+        "upserts": upserts,
+        "tombstones": sorted(slot_ids - set(data["conf_key"] for data in upserts)),
+    })
+    cache.set(key, content, SCHEDULE_JSON_TIMEOUT)
+    return content
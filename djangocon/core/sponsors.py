@@ -0,0 +1,59 @@
+"""
+An email -> sponsor index for matching users to the sponsors they are a
+contact for.
+
+`Sponsor.sponsor_contacts` is computed per sponsor, so matching a user by
+walking every sponsor costs a pass over all of their contacts. The index
+is built once per version of the sponsor data (see
+`djangocon.core.versions`) and kept in the cache, so a lookup is a dict
+lookup plus one query by primary key.
+"""
+
+from django.core.cache import cache
+from django.db.models import Q
+from symposion.sponsorship.models import Sponsor
+
+from .versions import SPONSORS, get_version
+
+SPONSOR_INDEX_TIMEOUT = 60 * 60 * 24
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+def build_contact_index():
+    """Return a dict of normalized contact email to sponsor pks."""
+    index = {}
+    for sponsor in Sponsor.objects.select_related("applicant").order_by("pk"):
+        for email in sponsor.sponsor_contacts:
+            email = normalize_email(email)
+            if email:
+                index.setdefault(email, []).append(sponsor.pk)
+    return index
+
+
+def contact_index():
+    key = "sponsor_contacts:%s" % get_version(SPONSORS)
+    index = cache.get(key)
+    if index is None:
+        index = build_contact_index()
+        cache.set(key, index, SPONSOR_INDEX_TIMEOUT)
+    return index
+
+
+def sponsors_for_email(email):
+    """Return the sponsors `email` is a contact for."""
+    pks = contact_index().get(normalize_email(email), [])
+    return Sponsor.objects.filter(pk__in=pks)
+
+
+def sponsors_for_user(user):
+    """
+    Return the sponsors `user` applied for or is a contact for, with
+    their levels.
+    """
+    pks = contact_index().get(normalize_email(user.email), [])
+    return Sponsor.objects.filter(
+        Q(applicant=user) | Q(pk__in=pks)
+    ).select_related("level").order_by("name")
@@ -1,20 +1,51 @@
 from django import template
+from django.template.loader import get_template
 from django.utils.safestring import mark_safe
 
-from symposion.markdown_parser import parse
+from djangocon.core import schedule
+from djangocon.core.markup import render_markdown
+from djangocon.core.publish import artifact_path, cached_grid, get_published
+from djangocon.core.sponsors import sponsors_for_user
+from djangocon.core.versions import SCHEDULE
 
 register = template.Library()
 
 @register.filter
 def markdown(text):
-    return mark_safe(parse(text))
+    return mark_safe(render_markdown(text))
 
 
-@register.filter
-def sort_by_m2m(iterable, m2m_key):
-    m2m, key = m2m_key.split('.')
-    for i in iterable:
-        keys = [getattr(related, key) for related in getattr(i, m2m).order_by(key)]
+@register.assignment_tag
+def grid_rows(timetable):
+    return schedule.grid_rows(timetable.day)
+
+
+@register.assignment_tag
+def user_sponsorships(user):
+    return list(sponsors_for_user(user))
+
+
+@register.simple_tag(takes_context=True)
+def schedule_grid(context, timetable):
+    """
+    Render a day of the schedule grid, from the published copy when it's
+    current or else from the cache. Staff get a freshly rendered grid,
+    with its edit links.
+    """
+    request = context.get("request")
+    if request is None or not request.user.is_staff:
+        pointer = get_published(SCHEDULE)
+        filename = pointer and pointer["grids"].get(str(timetable.day.pk))
+        if filename:
+            try:
+                with open(artifact_path(pointer, filename), "rb") as f:
+                    return mark_safe(f.read().decode("utf-8"))
+            except IOError:
+                pass
+        return mark_safe(cached_grid(timetable.day))
 
-        i._key = ':'.join(keys)
-    return sorted(iterable, key=lambda x: x._key)
+    context.update({"timetable": timetable})
+    try:
+        return get_template("schedule/_grid.html").render(context)
+    finally:
+        context.pop()
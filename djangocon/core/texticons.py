@@ -0,0 +1,95 @@
+"""
+Replace words in headings with the theme's text icons.
+
+`IconReplacer` splits HTML into tags and text once, then finds every
+icon word in the text with one precompiled alternation. A word is
+replaced when it stands between whitespace, as the per-word regexes of
+the original filters required; like them, a word's trailing whitespace
+can't also lead the next instance of the same word, so of "and and" only
+the first is replaced. (Those regexes also matched a word glued to a copy
+of itself, as in "andand"; that isn't kept.)
+
+Results are memoized per input string in a bounded LRU, since the same
+few titles are rendered over and over.
+"""
+
+import re
+
+from .utils import LRUCache
+
+# The pattern the original filters used to step over tags.
+TAG_RE = re.compile(
+    r"""</?\w+((\s+\w+(\s*=\s*(?:".*?"|'.*?'|[^'">\s]+))?)+\s*|\s*)/?>""")
+
+ICON_TEMPLATE = u'<span class="brdp-text-icon %s">%s</span>'
+
+# word, CSS class, label; in the order the original filters ran. "for"
+# has always been labelled "The", and the stylesheet expects that.
+ICONS = [
+    (u"and", u"brdp-and", u"and"),
+    (u"The", u"brdp-the", u"The"),
+    (u"for", u"brdp-for", u"The"),
+    (u"the", u"brdp-the-lower", u"the"),
+]
+
+CACHE_SIZE = 1024
+
+
+def split_tags(text):
+    """
+    Yield ``(is_text, chunk)`` for the text and tags of `text`. A "<"
+    that doesn't start a tag is neither, and is yielded as a tag.
+    """
+    pos = 0
+    length = len(text)
+    while pos < length:
+        if text[pos] == "<":
+            match = TAG_RE.match(text, pos)
+            end = match.end() if match else pos + 1
+            yield False, text[pos:end]
+        else:
+            end = text.find("<", pos)
+            if end == -1:
+                end = length
+            yield True, text[pos:end]
+        pos = end
+
+
+class IconReplacer(object):
+
+    def __init__(self, icons=ICONS, cache_size=CACHE_SIZE):
+        self.replacements = dict(
+            (word, ICON_TEMPLATE % (css_class, label))
+            for word, css_class, label in icons)
+        # No re.UNICODE: \s is ASCII whitespace, as in the original filters.
+        self.word_re = re.compile(r"(?<=\s)(%s)(?=\s)" % "|".join(
+            re.escape(word) for word, css_class, label in icons))
+        self.cache = LRUCache(cache_size)
+
+    def replace_text(self, text):
+        parts = []
+        pos = 0
+        # Where each word's last replacement consumed text up to.
+        consumed = {}
+        for match in self.word_re.finditer(text):
+            word = match.group(1)
+            if match.start() - 1 < consumed.get(word, 0):
+                continue
+            parts.append(text[pos:match.start()])
+            parts.append(self.replacements[word])
+            pos = match.end()
+            consumed[word] = pos + 1
+        if not parts:
+            return text
+        parts.append(text[pos:])
+        return u"".join(parts)
+
+    def replace(self, html):
+        """Replace the icon words in the text of `html`, leaving tags alone."""
+        result = self.cache.get(html)
+        if result is None:
+            result = u"".join(
+                self.replace_text(chunk) if is_text else chunk
+                for is_text, chunk in split_tags(html))
+            self.cache.set(html, result)
+        return result
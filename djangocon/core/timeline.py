@@ -0,0 +1,106 @@
+"""
+An in-memory index of the schedule for "what's on now and next" lookups.
+
+Venue displays poll this many times a second, so every process keeps one
+index of the slots in each room, sorted by start time, and answers with a
+bisect. The index is rebuilt when the schedule version changes (see
+`djangocon.core.versions`), which is the only per-request cost beyond the
+lookup itself.
+"""
+
+import threading
+
+from bisect import bisect_right
+from datetime import datetime
+
+from symposion.schedule.models import Slot
+
+from .schedule import load_slots
+from .versions import SCHEDULE, get_version
+
+
+class Entry(object):
+
+    __slots__ = ["start", "end", "data"]
+
+    def __init__(self, start, end, data):
+        self.start = start
+        self.end = end
+        self.data = data
+
+
+def slot_data(slot, room):
+    if slot.content_override:
+        name = slot.content_override.raw
+    elif slot.presentation is not None:
+        name = slot.presentation.title
+    else:
+        name = slot.kind.label
+    return {
+        "name": name,
+        "room": room.name,
+        "kind": slot.kind.label,
+        "start": datetime.combine(slot.day.date, slot.start).isoformat(),
+        "end": datetime.combine(slot.day.date, slot.end).isoformat(),
+        "speakers": [speaker.name for speaker in slot.speaker_list],
+        "conf_key": slot.pk,
+    }
+
+
+class ScheduleIndex(object):
+    """The slots in each room, sorted by start, with a parallel list of starts."""
+
+    def __init__(self, slots):
+        rooms = {}
+        for slot in slots:
+            start = datetime.combine(slot.day.date, slot.start)
+            end = datetime.combine(slot.day.date, slot.end)
+            for room in slot.room_list:
+                rooms.setdefault(room.name, []).append(
+                    Entry(start, end, slot_data(slot, room)))
+
+        self.rooms = {}
+        for name, entries in rooms.items():
+            entries.sort(key=lambda entry: entry.start)
+            self.rooms[name] = ([entry.start for entry in entries], entries)
+
+    def room_names(self):
+        return sorted(self.rooms)
+
+    def now_and_next(self, at, room):
+        """
+        Return ``(now, next)`` for `room` at the datetime `at`; either may
+        be None.
+        """
+        starts, entries = self.rooms.get(room, ([], []))
+        i = bisect_right(starts, at)
+        current = None
+        if i and entries[i - 1].end > at:
+            current = entries[i - 1].data
+        upcoming = entries[i].data if i < len(entries) else None
+        return current, upcoming
+
+    def lookup(self, at, rooms=None):
+        """Return now and next for each of `rooms` (default: all rooms)."""
+        result = []
+        for room in rooms or self.room_names():
+            current, upcoming = self.now_and_next(at, room)
+            result.append({"room": room, "now": current, "next": upcoming})
+        return result
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Return the index for the current schedule, rebuilding it if needed."""
+    global _index
+    version = get_version(SCHEDULE)
+    index = _index
+    if index is not None and index[0] == version:
+        return index[1]
+    with _index_lock:
+        if _index is None or _index[0] != version:
+            _index = (version, ScheduleIndex(load_slots(Slot.objects.all())))
+        return _index[1]
@@ -0,0 +1,65 @@
+import threading
+
+from collections import OrderedDict
+
+
+def queryset_chunks(queryset, chunk_size=500):
+    """
+    Yield `queryset` in primary key order as lists of at most `chunk_size`
+    model instances, so only one chunk is in memory at once.
+    """
+    last_pk = None
+    while True:
+        chunk = queryset.order_by("pk")
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def queryset_iterator(queryset, chunk_size=500):
+    """
+    Iterate over `queryset` in primary key order, `chunk_size` rows at a
+    time, so only one chunk of model instances is in memory at once.
+    """
+    for chunk in queryset_chunks(queryset, chunk_size):
+        for obj in chunk:
+            yield obj
+
+
+class LRUCache(object):
+    """
+    A thread-safe, in-process mapping that keeps the `size` most recently
+    used entries.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value = self.entries.pop(key)
+            except KeyError:
+                return default
+            self.entries[key] = value
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = value
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
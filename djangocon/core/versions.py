@@ -0,0 +1,98 @@
+"""
+Cheap "has anything changed?" markers for cached data.
+
+Each namespace (the schedule, the sponsors, ...) has a version stored in
+the cache backend. The version is the time of the last change, and is
+used as part of cache keys and ETags. Model signals bump the version;
+anything keyed on it is invalidated for free.
+
+Versions aren't used for Last-Modified: it only has whole seconds, so two
+changes in the same second would look like one and clients validating
+with If-Modified-Since would miss the second.
+
+Signals fire before the transaction they're part of commits, so a
+concurrent request could read the old rows and cache them under the new
+version. A version bumped inside a transaction is therefore bumped again
+once it's over: when the request finishes (after ``TransactionMiddleware``
+has committed), or when the code that committed calls `bump_pending`.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import connection
+
+PROPOSALS = "proposals"
+SCHEDULE = "schedule"
+SPONSORS = "sponsors"
+
+VERSION_TIMEOUT = 60 * 60 * 24 * 30
+
+_pending = threading.local()
+
+
+def _key(namespace):
+    return "version:%s" % namespace
+
+
+def get_version(namespace):
+    """
+    Return the current version of `namespace`.
+
+    If the cache has lost the value we start a new version, which simply
+    makes every dependent cache entry miss once.
+    """
+    version = cache.get(_key(namespace))
+    if version is None:
+        version = _bump(namespace)
+    return version
+
+
+def _bump(namespace):
+    version = "%.6f" % time.time()
+    cache.set(_key(namespace), version, VERSION_TIMEOUT)
+    return version
+
+
+def in_transaction():
+    return connection.in_atomic_block or not connection.get_autocommit()
+
+
+def bump_version(namespace):
+    """
+    Start a new version of `namespace`, and another once the current
+    transaction, if any, is over.
+    """
+    if in_transaction():
+        if not hasattr(_pending, "namespaces"):
+            _pending.namespaces = set()
+        _pending.namespaces.add(namespace)
+    return _bump(namespace)
+
+
+def bump_pending(**kwargs):
+    """Bump again the versions bumped inside a transaction that's now over."""
+    namespaces = getattr(_pending, "namespaces", None)
+    if namespaces:
+        _pending.namespaces = set()
+        for namespace in namespaces:
+            _bump(namespace)
+
+
+request_finished.connect(bump_pending, dispatch_uid="versions_bump_pending")
+
+
+def version_timestamp(version):
+    """Return the version as a unix timestamp, in whole seconds."""
+    return int(float(version))
+
+
+def version_etag(namespace, *variants):
+    """Return an ETag for the current version of `namespace`."""
+    parts = [namespace, get_version(namespace)]
+    parts.extend(str(variant) for variant in variants)
+    return hashlib.md5(":".join(parts)).hexdigest()
+
@@ -0,0 +1,119 @@
+"""
+A write-only, streaming XLSX writer.
+
+Rows are written straight to the worksheet XML in a temporary file as
+they arrive, and the workbook is only assembled into its zip container on
+`close`, so neither the rows nor the finished workbook are ever held in
+memory. Every cell is written as an inline string, which is all the
+Guidebook importer needs.
+"""
+
+import re
+import tempfile
+
+from xml.sax.saxutils import escape
+from zipfile import ZIP_DEFLATED, ZipFile
+
+CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="%s" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>'
+)
+
+SHEET_END = '</sheetData></worksheet>'
+
+# Characters XML 1.0 doesn't allow, even escaped.
+INVALID_XML_CHARS = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def column_name(index):
+    """Return the spreadsheet name of the zero-based column `index`."""
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+
+def cell_xml(ref, value):
+    if value is None:
+        value = u''
+    elif isinstance(value, str):
+        value = value.decode('utf-8')
+    elif not isinstance(value, unicode):
+        value = unicode(value)
+    value = escape(INVALID_XML_CHARS.sub(u'', value))
+    return u'<c r="%s" t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>' % (ref, value)
+
+
+class XLSXStreamWriter(object):
+    """
+    Write rows to a single-sheet workbook in `fileobj`, which must be
+    seekable (the zip container is written on `close`).
+    """
+
+    def __init__(self, fileobj, sheet_name='Sheet1'):
+        self.fileobj = fileobj
+        self.sheet_name = sheet_name
+        self.sheet = tempfile.NamedTemporaryFile(suffix='.xml')
+        self.sheet.write(SHEET_START)
+        self.columns = []
+        self.row_count = 0
+
+    def writerow(self, row):
+        self.row_count += 1
+        while len(self.columns) < len(row):
+            self.columns.append(column_name(len(self.columns)))
+        cells = u''.join(
+            cell_xml(u'%s%d' % (self.columns[i], self.row_count), value)
+            for i, value in enumerate(row))
+        self.sheet.write((u'<row r="%d">%s</row>' % (self.row_count, cells)).encode('utf-8'))
+
+    def close(self):
+        self.sheet.write(SHEET_END)
+        self.sheet.flush()
+        try:
+            with ZipFile(self.fileobj, 'w', ZIP_DEFLATED) as z:
+                z.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+                z.writestr('_rels/.rels', ROOT_RELS_XML)
+                z.writestr('xl/workbook.xml', WORKBOOK_XML % escape(self.sheet_name))
+                z.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS_XML)
+                # ZipFile.write copies the spooled sheet in chunks.
+                z.write(self.sheet.name, 'xl/worksheets/sheet1.xml')
+        finally:
+            self.sheet.close()
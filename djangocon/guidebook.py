@@ -0,0 +1,285 @@
+"""
+Guidebook exports.
+
+Each export is a row source -- a generator yielding a header row and then
+one row per item from a single, prefetched query -- and any of the
+writers below can consume it. Writers take rows one at a time, so one
+pass over a source can feed several files::
+
+    with open("speakers.csv", "wb") as f:
+        write_rows(speaker_rows(domain), CSVWriter(f))
+"""
+
+import json
+import tempfile
+
+from cStringIO import StringIO
+from itertools import izip
+
+import unicodecsv
+
+from django.contrib.sites.models import Site
+from symposion.schedule.models import Slot
+from symposion.speakers.models import Speaker
+from symposion.sponsorship.models import Sponsor
+from unidecode import unidecode
+
+from djangocon.core.derived import derive_many
+from djangocon.core.schedule import load_slot_chunks
+from djangocon.core.xlsx import CONTENT_TYPE as XLSX_CONTENT_TYPE, XLSXStreamWriter
+
+SCHEDULE_HEADERS = [
+    'Session Title',
+    'Date',
+    'Time Start',
+    'Time End',
+    'Room/Location',
+    'Schedule Track (Optional)',
+    'Description (Optional)',
+]
+
+LISTING_HEADERS = [
+    'Name',
+    'Sub-Title (i.e. Location, Table/Booth, or Title/Sponsorship Level)',
+    'Description (Optional)',
+    'Location/Room',
+    'Image (Optional)',
+]
+
+SPONSOR_DESCRIPTION_BENEFIT = 'Sponsor Description'
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def format_description(text):
+    """Transliterate `text` to ASCII and turn newlines into <br>s."""
+    return unidecode(text).replace('\r', '').replace('\n', '<br>')
+
+
+def schedule_rows(domain, progress=None):
+    yield SCHEDULE_HEADERS
+
+    slots = Slot.objects.order_by('start')
+    total = slots.count()
+    done = 0
+    for chunk in load_slot_chunks(slots):
+        descriptions = derive_many('guidebook_description', format_description, [
+            slot.presentation.description.raw if slot.presentation is not None else ''
+            for slot in chunk
+        ])
+        for slot, description in izip(chunk, descriptions):
+            if progress is not None:
+                progress(done, total)
+            done += 1
+            yield schedule_row(slot, description)
+
+
+def schedule_row(slot, description):
+
+    presentation, proposal = slot.presentation, slot.proposal
+    if slot.content_override:
+        name = slot.content_override.raw
+    elif presentation is not None:
+        name = presentation.title
+    else:
+        name = ''
+
+    track = ''
+    if hasattr(proposal, 'get_audience_level_display'):
+        track = proposal.get_audience_level_display()
+    if track == 'Not Applicable':
+        track = 'N/A'
+
+    return [
+        name,
+        slot.day.date.isoformat(),
+        slot.start.isoformat(),
+        slot.end.isoformat(),
+        ', '.join(room.name for room in slot.room_list),
+        track,
+        description,
+    ]
+
+
+def speaker_rows(domain, progress=None):
+    yield LISTING_HEADERS
+
+    # A speaker with several talks would otherwise be listed once per talk.
+    speakers = list(Speaker.objects.filter(
+        presentations__isnull=False,
+        presentations__cancelled=False).distinct())
+    biographies = derive_many('ascii', unidecode, (
+        speaker.biography.rendered for speaker in speakers
+    ))
+    total = len(speakers)
+    for done, (speaker, biography) in enumerate(izip(speakers, biographies)):
+        if progress is not None:
+            progress(done, total)
+
+        if hasattr(speaker.photo, 'url'):
+            photo_url = 'https://{0}{1}'.format(domain, speaker.photo.url)
+        else:
+            photo_url = ''
+
+        yield [
+            speaker.name,
+            '',
+            biography,
+            '',
+            photo_url,
+        ]
+
+
+def sponsor_rows(domain, progress=None):
+    yield LISTING_HEADERS
+
+    sponsors = list(Sponsor.objects.active().select_related(
+        'level', 'sponsor_logo').prefetch_related('sponsor_benefits__benefit'))
+    total = len(sponsors)
+    for done, sponsor in enumerate(sponsors):
+        if progress is not None:
+            progress(done, total)
+
+        # Fill in `listing_text` from the prefetched benefits so the
+        # property doesn't query for each sponsor.
+        sponsor._listing_text = None
+        for sponsor_benefit in sponsor.sponsor_benefits.all():
+            if sponsor_benefit.benefit.name == SPONSOR_DESCRIPTION_BENEFIT:
+                sponsor._listing_text = sponsor_benefit.text
+                break
+
+        try:
+            logo = sponsor.website_logo
+        except AttributeError:
+            # No web logo has been uploaded yet.
+            logo = None
+        yield [
+            sponsor.name,
+            sponsor.level.name,
+            sponsor.listing_text,
+            '',
+            'https://{0}{1}'.format(domain, logo.url) if logo else '',
+        ]
+
+
+class CSVWriter(object):
+
+    extension = 'csv'
+    content_type = 'text/csv'
+    streaming = True
+
+    def __init__(self, fileobj):
+        self.writer = unicodecsv.writer(fileobj, quoting=unicodecsv.QUOTE_ALL)
+
+    def writerow(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        pass
+
+
+class JSONWriter(object):
+    """Write a JSON list with one object per row, keyed by the headers."""
+
+    extension = 'json'
+    content_type = 'application/json'
+    streaming = True
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.headers = None
+        self.separator = '\n'
+
+    def writerow(self, row):
+        if self.headers is None:
+            self.headers = row
+            self.fileobj.write('[')
+            return
+        self.fileobj.write(self.separator)
+        self.fileobj.write(json.dumps(dict(zip(self.headers, row))))
+        self.separator = ',\n'
+
+    def close(self):
+        if self.headers is None:
+            self.fileobj.write('[')
+        self.fileobj.write('\n]\n')
+
+
+class XLSXWriter(XLSXStreamWriter):
+    """
+    Write the rows to a workbook. The zip container is only written on
+    `close`, so `fileobj` has to be seekable.
+    """
+
+    extension = 'xlsx'
+    content_type = XLSX_CONTENT_TYPE
+    streaming = False
+
+
+WRITERS = {
+    'csv': CSVWriter,
+    'json': JSONWriter,
+    'xlsx': XLSXWriter,
+}
+
+# name: (row source, default format)
+EXPORTS = {
+    'schedule': (schedule_rows, 'xlsx'),
+    'speakers': (speaker_rows, 'csv'),
+    'sponsors': (sponsor_rows, 'csv'),
+}
+
+
+def write_rows(rows, *writers):
+    """Feed every row to each of `writers`, then close them."""
+    for row in rows:
+        for writer in writers:
+            writer.writerow(row)
+    for writer in writers:
+        writer.close()
+
+
+def write_export(name, fileobj, format=None, domain=None, progress=None):
+    """Write the Guidebook export `name` to `fileobj`."""
+    source, default_format = EXPORTS[name]
+    if domain is None:
+        domain = Site.objects.get_current().domain
+    writer = WRITERS[format or default_format](fileobj)
+    write_rows(source(domain, progress), writer)
+
+
+def write_schedule_export(fileobj, progress=None):
+    """Write the schedule workbook to `fileobj`, for background exports."""
+    write_export('schedule', fileobj, progress=progress)
+
+
+def stream_export(name, format=None, domain=None):
+    """Yield the Guidebook export `name` in chunks, as it's written."""
+    source, default_format = EXPORTS[name]
+    if domain is None:
+        domain = Site.objects.get_current().domain
+    writer_class = WRITERS[format or default_format]
+
+    if not writer_class.streaming:
+        # Spool to disk and send the file once it's complete.
+        with tempfile.TemporaryFile() as f:
+            write_rows(source(domain), writer_class(f))
+            f.seek(0)
+            for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), ''):
+                yield chunk
+        return
+
+    buf = StringIO()
+    writer = writer_class(buf)
+    for row in source(domain):
+        writer.writerow(row)
+        if buf.tell() >= STREAM_CHUNK_SIZE:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    writer.close()
+    yield buf.getvalue()
+
+
+def export_filename(name, format=None):
+    return 'guidebook_{0}.{1}'.format(name, format or EXPORTS[name][1])
@@ -136,14 +136,56 @@ class SponsorPassesForm(forms.Form):
     percent_off = forms.IntegerField(max_value=100, required=False)
 
     def clean(self):
-        amount_off = self.cleaned_data['amount_off']
-        percent_off = self.cleaned_data['percent_off']
+        return clean_discount(self.cleaned_data)
 
-        if amount_off and percent_off:
-            raise forms.ValidationError(
-                'Please enter in either amount OR percent off')
-        elif amount_off is None and percent_off is None:
-            raise forms.ValidationError(
-                'Please provide either an amount OR percent off')
 
-        return self.cleaned_data
+class SponsorPassesBulkForm(forms.Form):
+    """
+    Passes for many sponsors at once: one `passes_<pk>` field per sponsor,
+    left blank or zero for sponsors who don't get any.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.tickets = kwargs.pop("tickets")
+        self.sponsors = kwargs.pop("sponsors")
+        super(SponsorPassesBulkForm, self).__init__(*args, **kwargs)
+        self.fields["ticket_names"] = forms.MultipleChoiceField(
+            choices=self.tickets)
+        for sponsor in self.sponsors:
+            self.fields["passes_%d" % sponsor.pk] = forms.IntegerField(
+                label=sponsor.name, min_value=0, required=False)
+
+    amount_off = forms.FloatField(required=False)
+    percent_off = forms.IntegerField(max_value=100, required=False)
+
+    def clean(self):
+        return clean_discount(self.cleaned_data)
+
+    def allocations(self):
+        """Return ``(sponsor, passes)`` for every sponsor given passes."""
+        allocations = []
+        for sponsor in self.sponsors:
+            passes = self.cleaned_data.get("passes_%d" % sponsor.pk)
+            if passes:
+                allocations.append((sponsor, passes))
+        return allocations
+
+    def discount(self):
+        """Return the discount as keyword arguments for Eventbrite."""
+        if self.cleaned_data["amount_off"] is not None:
+            return {"amount_off": self.cleaned_data["amount_off"]}
+        return {"percent_off": self.cleaned_data["percent_off"]}
+
+
+def clean_discount(cleaned_data):
+    amount_off = cleaned_data.get('amount_off')
+    percent_off = cleaned_data.get('percent_off')
+
+    if amount_off and percent_off:
+        raise forms.ValidationError(
+            'Please enter in either amount OR percent off')
+    elif amount_off is None and percent_off is None:
+        raise forms.ValidationError(
+            'Please provide either an amount OR percent off')
+
+    return cleaned_data
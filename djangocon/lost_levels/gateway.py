@@ -0,0 +1,235 @@
+"""
+A cached, keep-alive client for the Eventbrite JSON API.
+
+`sponsor_passes` used to create a new client and call Eventbrite on every
+page load. The gateway keeps one HTTP connection open per thread, caches
+the event and its tickets, and keeps the set of existing discount codes
+locally, refreshing both in the background once they get stale so staff
+page loads don't wait on Eventbrite.
+
+Point ``EB_API_URL`` at `djangocon.lost_levels.stub.StubEventbriteServer`
+to run without the network.
+"""
+
+import httplib
+import json
+import logging
+import threading
+import time
+import urllib
+import urlparse
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Serve cached data for this long before refreshing it in the background.
+EVENT_MAX_AGE = 60 * 15
+DISCOUNTS_MAX_AGE = 60
+
+# Keep stale data around long enough to survive an Eventbrite outage.
+CACHE_TIMEOUT = 60 * 60 * 24
+
+REQUEST_TIMEOUT = 10
+
+
+# The error Eventbrite answers ``event_list_discounts`` with when the
+# event has no discount codes yet.
+NO_DISCOUNTS = "Not Found"
+
+
+class EventbriteError(EnvironmentError):
+
+    def __init__(self, message, error_type=None):
+        super(EventbriteError, self).__init__(message)
+        self.error_type = error_type
+
+
+class Connection(object):
+    """
+    An HTTP(S) connection to the Eventbrite API that is reused between
+    calls, with one socket per thread.
+    """
+
+    def __init__(self, api_url):
+        parts = urlparse.urlsplit(api_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.path = parts.path.rstrip("/") + "/"
+        self.local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            if self.scheme == "https":
+                connection = httplib.HTTPSConnection(self.netloc, timeout=REQUEST_TIMEOUT)
+            else:
+                connection = httplib.HTTPConnection(self.netloc, timeout=REQUEST_TIMEOUT)
+            self.local.connection = connection
+        return connection
+
+    def _reset(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+        self.local.connection = None
+
+    def call(self, method, params):
+        url = self.path + method + "?" + urllib.urlencode(params)
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("GET", url, headers={"Connection": "keep-alive"})
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (httplib.HTTPException, IOError) as e:
+                # The server may have closed an idle keep-alive socket;
+                # reconnect once before giving up.
+                self._reset()
+                if attempt:
+                    raise EventbriteError("Eventbrite request failed: %s" % (e,))
+        if response.getheader("connection", "").lower() == "close":
+            self._reset()
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise EventbriteError("Invalid response from Eventbrite: %r" % body[:200])
+        if "error" in data:
+            raise EventbriteError(
+                "%(error_type)s: %(error_message)s" % data["error"],
+                data["error"].get("error_type"))
+        return data
+
+
+class Gateway(object):
+
+    def __init__(self, event_id, app_key, user_key, api_url):
+        self.event_id = event_id
+        self.auth = {"app_key": app_key, "user_key": user_key}
+        self.connection = Connection(api_url)
+
+    def call(self, method, **params):
+        params.update(self.auth)
+        return self.connection.call(method, params)
+
+    def _key(self, name):
+        return "eventbrite:%s:%s" % (self.event_id, name)
+
+    def _cached(self, name, fetch, max_age):
+        """
+        Return cached data for `name`, fetching it if there isn't any yet
+        and refreshing it in a background thread once it's older than
+        `max_age` seconds.
+        """
+        key = self._key(name)
+        entry = cache.get(key)
+        if entry is None:
+            return self._refresh(key, fetch)
+
+        fetched, value = entry
+        if time.time() - fetched > max_age:
+            # cache.add is atomic, so only one worker refreshes at a time.
+            if cache.add(key + ":refreshing", True, REQUEST_TIMEOUT * 2):
+                thread = threading.Thread(
+                    target=self._refresh_in_background, args=(key, fetch))
+                thread.daemon = True
+                thread.start()
+        return value
+
+    def _refresh(self, key, fetch):
+        # Failures propagate uncached, so the next call tries again.
+        value = fetch()
+        cache.set(key, (time.time(), value), CACHE_TIMEOUT)
+        return value
+
+    def _refresh_in_background(self, key, fetch):
+        try:
+            self._refresh(key, fetch)
+        except EventbriteError:
+            logger.exception("Refreshing %s from Eventbrite failed", key)
+        finally:
+            cache.delete(key + ":refreshing")
+
+    def _fetch_event(self):
+        return self.call("event_get", id=self.event_id)["event"]
+
+    def _fetch_discount_codes(self):
+        try:
+            response = self.call("event_list_discounts", id=self.event_id)
+        except EventbriteError as e:
+            # Eventbrite answers with an error when there are no discounts.
+            if e.error_type == NO_DISCOUNTS:
+                return []
+            raise
+        return sorted(dsct["discount"]["code"] for dsct in response["discounts"])
+
+    def event(self):
+        """Return the event, including its tickets."""
+        return self._cached("event", self._fetch_event, EVENT_MAX_AGE)
+
+    def tickets(self):
+        """
+        Return ``(choices, ids)`` for every ticket that isn't a donation:
+        form choices of name and price, and a dict of name to ticket id.
+        """
+        choices = []
+        ids = {}
+        for tkt in self.event()["tickets"]:
+            ticket = tkt["ticket"]
+            # don't include donation ('type' == 1) tickets
+            if ticket["type"] != 1:
+                ids[ticket["name"]] = ticket["id"]
+                choices.append((ticket["name"], ticket["name"] + " -- $" + ticket["price"]))
+        return choices, ids
+
+    def discount_codes(self):
+        """Return the set of discount codes that already exist."""
+        return set(self._cached(
+            "discounts", self._fetch_discount_codes, DISCOUNTS_MAX_AGE))
+
+    def refresh_discount_codes(self):
+        """Fetch the discount codes now, bypassing the cache."""
+        return set(self._refresh(self._key("discounts"), self._fetch_discount_codes))
+
+    def create_discount(self, code, tickets, quantity, **discount):
+        """
+        Create a discount code for `tickets` (a list of ticket ids).
+        `discount` is either ``amount_off`` or ``percent_off``.
+        """
+        params = {
+            "event_id": self.event_id,
+            "code": code,
+            "quantity_available": quantity,
+            "tickets": ",".join(str(ticket) for ticket in tickets),
+        }
+        params.update(discount)
+        response = self.call("discount_new", **params)
+
+        # Record the code locally so it's known before the next refresh.
+        key = self._key("discounts")
+        entry = cache.get(key)
+        if entry is not None:
+            fetched, codes = entry
+            cache.set(key, (fetched, sorted(set(codes) | set([code]))), CACHE_TIMEOUT)
+        return response
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Return the gateway for the configured event, shared per process."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = Gateway(
+                settings.EB_EVENT_ID,
+                settings.EB_APP_KEY,
+                settings.EB_USER_KEY,
+                settings.EB_API_URL,
+            )
+        return _gateway
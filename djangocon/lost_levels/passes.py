@@ -0,0 +1,154 @@
+"""
+Generate sponsor discount codes in bulk.
+
+`generate_passes` takes a mapping of sponsor to number of passes, reads
+the event and the existing discount codes once, creates the new codes
+concurrently (with a bounded pool, rate limited to stay inside
+Eventbrite's API limits), and emails each sponsor whose code was
+created. It returns one `PassResult` per sponsor; a sponsor whose code
+or email fails is reported as failed without stopping the others.
+"""
+
+import logging
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from symposion.utils.mail import send_email
+
+from .gateway import EventbriteError, get_gateway
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 4
+
+# Eventbrite calls per second across all workers.
+RATE_LIMIT = 4
+
+
+class PassResult(object):
+
+    CREATED = "created"
+    EXISTS = "exists"
+    FAILED = "failed"
+
+    def __init__(self, sponsor, passes, code, status=None, error=None):
+        self.sponsor = sponsor
+        self.passes = passes
+        self.code = code
+        self.status = status
+        self.error = error
+
+    def __unicode__(self):
+        line = u"%s: %s %s (%d passes)" % (self.sponsor, self.status, self.code, self.passes)
+        if self.error:
+            line += u" -- %s" % self.error
+        return line
+
+
+class RateLimiter(object):
+    """Space calls at least `1 / rate` seconds apart, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_call = 0
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def discount_code(sponsor_name, event_title):
+    return (sponsor_name[:6] + '_' + event_title[:6]).replace(' ', '')
+
+
+def sponsor_passes_email(event, result):
+    """Email a sponsor's contact the discount code in `result`."""
+    sponsor = result.sponsor
+    send_email([sponsor.contact_email], "sponsor_passes", context={
+        "event_name": event["title"],
+        "sponsor": sponsor.name,
+        "contact_name": sponsor.contact_name,
+        "discount_code": result.code,
+        "event_url": event["url"],
+        "event_contact_email": settings.EVENT_EMAIL,
+        "event_contact_phone": settings.EVENT_PHONE,
+    })
+
+
+def generate_passes(allocations, ticket_names, max_workers=MAX_WORKERS,
+                    rate=RATE_LIMIT, **discount):
+    """
+    Create a discount code for each ``(sponsor, passes)`` in `allocations`
+    and email it to the sponsor's contact.
+
+    `ticket_names` selects the tickets the codes apply to; `discount` is
+    either ``amount_off`` or ``percent_off``.
+    """
+    gateway = get_gateway()
+    event = gateway.event()
+    choices, ticket_ids = gateway.tickets()
+    tickets = [ticket_ids[name] for name in ticket_names if name in ticket_ids]
+
+    # One listing covers every candidate code.
+    existing = gateway.refresh_discount_codes()
+
+    results = []
+    pending = []
+    for sponsor, passes in allocations:
+        result = PassResult(sponsor, passes, discount_code(sponsor.name, event["title"]))
+        if result.code in existing:
+            result.status = PassResult.EXISTS
+        else:
+            existing.add(result.code)
+            pending.append(result)
+        results.append(result)
+
+    limiter = RateLimiter(rate)
+
+    def create(result):
+        limiter.wait()
+        try:
+            gateway.create_discount(result.code, tickets, result.passes, **discount)
+        except Exception as e:
+            # Anything raised here would abort the whole map and lose the
+            # report for codes that were already created.
+            if not isinstance(e, EventbriteError):
+                logger.exception("Creating discount code %s failed", result.code)
+            result.status = PassResult.FAILED
+            result.error = unicode(e)
+        else:
+            result.status = PassResult.CREATED
+
+    if pending:
+        pool = ThreadPool(min(max_workers, len(pending)))
+        try:
+            pool.map(create, pending)
+        finally:
+            pool.close()
+            pool.join()
+
+        # The workers updated the local index concurrently; resync it.
+        try:
+            gateway.refresh_discount_codes()
+        except EventbriteError:
+            logger.exception("Refreshing the discount codes failed")
+
+    for result in results:
+        if result.status != PassResult.CREATED:
+            continue
+        try:
+            sponsor_passes_email(event, result)
+        except Exception as e:
+            logger.exception("Emailing discount code %s failed", result.code)
+            result.status = PassResult.FAILED
+            result.error = u"Code created, but the email failed: %s" % e
+
+    return results
@@ -0,0 +1,112 @@
+"""
+A local stand-in for the Eventbrite JSON API.
+
+Implements the calls the gateway makes (``event_get``,
+``event_list_discounts`` and ``discount_new``) against in-memory data, so
+tests and benchmarks can exercise the Eventbrite code paths without the
+network::
+
+    server = StubEventbriteServer(latency=0.2)
+    server.start()
+    settings.EB_API_URL = server.url
+    ...
+    server.stop()
+"""
+
+import json
+import threading
+import time
+import urlparse
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+DEFAULT_TICKETS = [
+    {"id": 1001, "name": "Individual", "price": "300.00", "type": 0},
+    {"id": 1002, "name": "Corporate", "price": "600.00", "type": 0},
+    {"id": 1003, "name": "Donation", "price": "0.00", "type": 1},
+]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlparse.urlsplit(self.path)
+        method = parts.path.rstrip("/").rsplit("/", 1)[-1]
+        params = dict(urlparse.parse_qsl(parts.query))
+        server = self.server
+
+        time.sleep(server.latency)
+        with server.lock:
+            server.calls.append(method)
+            handler = getattr(self, "call_%s" % method, None)
+            if handler is None:
+                data = self.error("Method Error", "Unknown method %s" % method)
+            else:
+                data = handler(params)
+
+        body = json.dumps(data)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def error(self, error_type, message):
+        return {"error": {"error_type": error_type, "error_message": message}}
+
+    def call_event_get(self, params):
+        return {"event": {
+            "id": params.get("id"),
+            "title": self.server.title,
+            "url": "http://www.eventbrite.com/event/%s" % params.get("id"),
+            "tickets": [{"ticket": ticket} for ticket in self.server.tickets],
+        }}
+
+    def call_event_list_discounts(self, params):
+        if not self.server.discounts:
+            return self.error("Not Found", "No discounts found.")
+        return {"discounts": [
+            {"discount": discount} for discount in self.server.discounts.values()
+        ]}
+
+    def call_discount_new(self, params):
+        code = params.get("code", "")
+        if code in self.server.discounts:
+            return self.error("Discount error", "The code %s is already in use." % code)
+        discount_id = len(self.server.discounts) + 1
+        self.server.discounts[code] = dict(params, id=discount_id)
+        return {"process": {"id": discount_id, "status": "OK"}}
+
+
+class StubEventbriteServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0, title="DjangoCon US 2015", tickets=None):
+        HTTPServer.__init__(self, ("127.0.0.1", port), StubHandler)
+        self.latency = latency
+        self.title = title
+        self.tickets = tickets if tickets is not None else list(DEFAULT_TICKETS)
+        self.discounts = {}
+        self.calls = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d/json/" % self.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
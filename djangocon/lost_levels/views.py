@@ -8,37 +8,39 @@ ref: https://github.com/djangocon/symposion/blob/master/symposion/views.py
 
 """
 
-import eventbrite
 import json
 import os
-import StringIO
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import Http404, HttpResponse
+from django.http import Http404
 from django.shortcuts import render_to_response, redirect
 from django.template import RequestContext
+from djangocon.core.bundle import Member, build_bundle, copy_bundle
+from djangocon.core.sponsors import sponsors_for_email
+from djangocon.views import export_response
 from symposion.sponsorship.models import Sponsor
 from symposion.utils.mail import send_email
-from zipfile import ZipFile, ZIP_DEFLATED
+from zipfile import ZIP_DEFLATED
 
-from .forms import SponsorPassesForm
+from .forms import SponsorPassesBulkForm, SponsorPassesForm
+from .gateway import EventbriteError, get_gateway
+from .passes import generate_passes
 
 
 @login_required
 def eventbrite_confirm(request):
     user = request.user
-    for spsr in Sponsor.objects.filter(active=True):
-        if user.email in spsr.sponsor_contacts:
-            sponsor = spsr
-            if not request.GET['oid'] == '':
-                    sponsor.paid = True
-                    sponsor.save()
-            return redirect("sponsor_detail", pk=sponsor.pk)
-        elif user.is_staff:
-            messages.warning(request, "Remember to set paid to 'True' in admin for this sponsor.")
-            return redirect("dashboard")
+    sponsor = sponsors_for_email(user.email).filter(active=True).first()
+    if sponsor is not None:
+        if not request.GET['oid'] == '':
+            sponsor.paid = True
+            sponsor.save()
+        return redirect("sponsor_detail", pk=sponsor.pk)
+    elif user.is_staff:
+        messages.warning(request, "Remember to set paid to 'True' in admin for this sponsor.")
+        return redirect("dashboard")
 
 
 @login_required
@@ -54,36 +56,15 @@ def sponsor_passes(request):
         messages.error(request, "Eventbrite client has not been configured properly in settings. Please contact conference organizer about this issue.")
         return redirect('dashboard')
     else:
-        # grab authentication credentials
-        eb_event_id = settings.EB_EVENT_ID
-        eb_auth_tokens = {
-            'app_key': settings.EB_APP_KEY,
-            'user_key': settings.EB_USER_KEY
-        }
-
-        # Make first request for basic event and ticket info
-        eb_client = eventbrite.EventbriteClient(eb_auth_tokens)
-        response = eb_client.event_get({
-            'id': eb_event_id
-        })
-
-        # Make choices list of ticket names and prices for our form
-        TICKET_CHOICES = []
-        ticket_dict = {}
-        tickets = response['event']['tickets']
-        for tkt in tickets:
-            ticket = tkt['ticket']
-            # don't include donation ('type' == 1) tickets
-            if ticket['type'] != 1:
-                ticket_name = ticket['name']
-                ticket_id = ticket['id']
-                price = ticket['price']
-
-            # Make dict of name/id pairs for discount generation
-                ticket_dict[ticket_name] = ticket_id
+        gateway = get_gateway()
 
-            # Make our choices list for form
-                TICKET_CHOICES.append((ticket_name, ticket_name + ' -- $' + price))
+        # Event and ticket info come from the gateway's cache
+        try:
+            event = gateway.event()
+            TICKET_CHOICES, ticket_dict = gateway.tickets()
+        except EventbriteError:
+            messages.error(request, "We couldn't reach Eventbrite. Please try again in a minute.")
+            return redirect('dashboard')
 
         # Next, make a list of *active* sponsors to add to our form
         SPONSOR_CHOICES = []
@@ -91,8 +72,8 @@ def sponsor_passes(request):
             SPONSOR_CHOICES.append((sponsor, sponsor))
 
         # we also need event title and url for our email
-        event_title = response['event']['title']
-        event_url = response['event']['url']
+        event_title = event['title']
+        event_url = event['url']
 
         # If form is valid, process form and generate discount
         if request.method == "POST":
@@ -105,7 +86,7 @@ def sponsor_passes(request):
                 percent_off = form.cleaned_data["percent_off"]
 
                 # match selected ticket types to ticket ids from our dict
-                tickets_list = ','.join(str(v) for k, v in ticket_dict.iteritems() if k in ticket_names)
+                tickets_list = [v for k, v in ticket_dict.iteritems() if k in ticket_names]
 
                 # Eventbrite will only accept one of the following: amount_off or percent_off
                 # Create variables to pass into our request one or other depending on staff input
@@ -120,29 +101,26 @@ def sponsor_passes(request):
                 discount_code = (sponsor[:6] + '_' + event_title[:6]).replace(' ', '')
 
                 # Alert user if discount already exists
-                # Except case where no discounts exist to check against
                 try:
-                    response = eb_client.event_list_discounts({
-                        'id': eb_event_id
-                    })
-                    for dsct in response['discounts']:
-                        discount = dsct['discount']
-                        if discount['code'] == discount_code:
-                            messages.error(request, "Oops, looks like that discount code already exists")
-                            return redirect("sponsor_passes")
-
-                except EnvironmentError:
-                    response = ''
-                    pass
+                    existing_codes = gateway.discount_codes()
+                except EventbriteError as e:
+                    messages.error(request, "Couldn't check the existing discount codes: %s" % e)
+                    return redirect("sponsor_passes")
+                if discount_code in existing_codes:
+                    messages.error(request, "Oops, looks like that discount code already exists")
+                    return redirect("sponsor_passes")
 
                 # Send request to eventbrite to register the discount code w/params
-                response = eb_client.discount_new({
-                    'event_id': eb_event_id,
-                    'code': discount_code,
-                    discount_n: discount_v,
-                    'quantity_available': int(form.cleaned_data["number_of_passes"]),
-                    'tickets': tickets_list
-                })
+                try:
+                    gateway.create_discount(
+                        discount_code,
+                        tickets_list,
+                        int(form.cleaned_data["number_of_passes"]),
+                        **{discount_n: discount_v}
+                    )
+                except EventbriteError as e:
+                    messages.error(request, "Eventbrite couldn't create the discount code: %s" % e)
+                    return redirect("sponsor_passes")
 
                 # Auto-email to sponsor contact with discount code
                 for spsr in Sponsor.objects.filter(name=sponsor):
@@ -177,19 +155,72 @@ def sponsor_passes(request):
         }, context_instance=RequestContext(request))
 
 
-# with print logos and json reformat
 @login_required
-def export_sponsors(request):
+def sponsor_passes_bulk(request):
     if not request.user.is_staff:
         raise Http404()
 
-    # use StringIO to make zip in memory, rather than on disk
-    f = StringIO.StringIO()
-    z = ZipFile(f, 'w', ZIP_DEFLATED)
+    if not settings.EVENTBRITE:
+        messages.error(request, "We're sorry, Eventbrite isn't being used for this conference.")
+        return redirect('dashboard')
+
+    elif settings.EB_APP_KEY == '' or settings.EB_USER_KEY == '' or settings.EB_EVENT_ID == '':
+        messages.error(request, "Eventbrite client has not been configured properly in settings. Please contact conference organizer about this issue.")
+        return redirect('dashboard')
+
+    try:
+        TICKET_CHOICES = get_gateway().tickets()[0]
+    except EventbriteError:
+        messages.error(request, "We couldn't reach Eventbrite. Please try again in a minute.")
+        return redirect('dashboard')
+
+    sponsors = Sponsor.objects.filter(active=True).order_by('name')
+    results = None
+
+    if request.method == "POST":
+        form = SponsorPassesBulkForm(request.POST, tickets=TICKET_CHOICES, sponsors=sponsors)
+        if form.is_valid():
+            try:
+                results = generate_passes(
+                    form.allocations(),
+                    form.cleaned_data["ticket_names"],
+                    **form.discount()
+                )
+            except EventbriteError as e:
+                messages.error(request, "Eventbrite couldn't create the discount codes: %s" % e)
+                return redirect("sponsor_passes_bulk")
+            if not results:
+                messages.warning(request, "No sponsors were given any passes.")
+    else:
+        form = SponsorPassesBulkForm(sponsors=sponsors, tickets=TICKET_CHOICES)
+
+    return render_to_response("sponsorship/passes_bulk.html", {
+        "form": form,
+        "results": results,
+    }, context_instance=RequestContext(request))
+
+
+SPONSOR_BUNDLE_NAME = 'sponsor_file.zip'
+
+
+def sponsor_bundle_members(progress=None):
+    """
+    Return the bundle members for every sponsor's logos, plus the JSON
+    manifest of sponsor data.
+
+    Logos are already compressed images, so they are stored as-is; only
+    the JSON manifest is deflated.
+    """
+    members = []
     data = []
 
-    # collect the data and write web and print logo assets for each sponsor
-    for sponsor in Sponsor.objects.all():
+    sponsors = Sponsor.objects.select_related('level')
+    total = sponsors.count()
+
+    # collect the data and web and print logo assets for each sponsor
+    for done, sponsor in enumerate(sponsors):
+        if progress is not None:
+            progress(done, total)
         data.append({
             'name': sponsor.name,
             'website': sponsor.external_url,
@@ -200,25 +231,45 @@ def export_sponsors(request):
         })
         if sponsor.website_logo:
             path = sponsor.website_logo.path
-            z.write(path, '{0}_weblogo{1}'.format(
+            members.append(Member('{0}_weblogo{1}'.format(
                 str(sponsor.name).replace(' ', ''),
-                os.path.splitext(path)[1]))
+                os.path.splitext(path)[1]), path=path))
         if sponsor.print_logo:
             path = sponsor.print_logo.path
-            z.write(path, '{0}_printlogo{1}'.format(
+            members.append(Member('{0}_printlogo{1}'.format(
                 str(sponsor.name).replace(' ', ''),
-                os.path.splitext(path)[1]))
+                os.path.splitext(path)[1]), path=path))
+
+    members.append(Member(
+        'sponsor_data.txt',
+        data=json.dumps(data, encoding='utf-8', indent=4),
+        compress_type=ZIP_DEFLATED))
+    return members
+
 
-    # write sponsor data to text file for zip
-    with open('sponsor_data.txt', 'wb') as d:
-        json.dump(data, d, encoding='utf-8', indent=4)
-    z.write('sponsor_data.txt')
+def build_sponsor_bundle(progress=None):
+    """
+    Bring the cached sponsor bundle up to date and return its path.
 
-    z.close()
+    Only logos that changed since the last build are read from disk again;
+    everything else is copied from the previous bundle.
+    """
+    if not os.path.isdir(settings.EXPORT_CACHE_ROOT):
+        os.makedirs(settings.EXPORT_CACHE_ROOT)
+    path = os.path.join(settings.EXPORT_CACHE_ROOT, SPONSOR_BUNDLE_NAME)
+    build_bundle(path, sponsor_bundle_members(progress))
+    return path
+
+
+# with print logos and json reformat
+def write_sponsor_zip(fileobj, progress=None):
+    """Write every sponsor's data and logos as a zip archive to `fileobj`."""
+    copy_bundle(build_sponsor_bundle(progress), fileobj)
+
+
+@login_required
+def export_sponsors(request):
+    if not request.user.is_staff:
+        raise Http404()
 
-    response = HttpResponse(mimetype='application/zip')
-    response['Content-Disposition'] = 'attachment; filename=sponsor_file.zip'
-    f.seek(0)
-    response.write(f.getvalue())
-    f.close()
-    return response
+    return export_response('sponsors')
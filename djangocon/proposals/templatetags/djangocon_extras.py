@@ -1,15 +1,12 @@
-import re
-
 from django import template
 
 from django.utils.safestring import mark_safe
 from django.utils.html import conditional_escape
 
-register = template.Library()
+from djangocon.core.texticons import ICONS, IconReplacer
 
+register = template.Library()
 
-tag_pattern = '</?\w+((\s+\w+(\s*=\s*(?:".*?"|\'.*?\'|[^\'">\s]+))?)+\s*|\s*)/?>'
-intra_tag_finder = re.compile(r'(?P<prefix>(%s)?)(?P<text>([^<]*))(?P<suffix>(%s)?)' % (tag_pattern, tag_pattern))
 
 def smart_filter(fn):
     '''
@@ -28,87 +25,50 @@ def smart_filter(fn):
     return wrapper
 
 
-@smart_filter
-def and_replace(text, autoescape=None):
-    """Wraps "and" span."""
-
-    amp_finder = re.compile(r"(\s|and)(and|and|and)(\s|and)")
-
-    def _amp_process(groups):
-        prefix = groups.group('prefix') or ''
-        text = amp_finder.sub(r"""\1<span class="brdp-text-icon brdp-and">and</span>\3""", groups.group('text'))
-        suffix = groups.group('suffix') or ''
-        return prefix + text + suffix
-    return intra_tag_finder.sub(_amp_process, text)
-
-@smart_filter
-def the_replace(text, autoescape=None):
-    """Wraps "and" span."""
+def _single_icon(word):
+    return IconReplacer([icon for icon in ICONS if icon[0] == word])
 
-    amp_finder = re.compile(r"(\s|The)(The|The|The)(\s|The)")
 
-    def _amp_process(groups):
-        prefix = groups.group('prefix') or ''
-        text = amp_finder.sub(r"""\1<span class="brdp-text-icon brdp-the">The</span>\3""", groups.group('text'))
-        suffix = groups.group('suffix') or ''
-        return prefix + text + suffix
-    return intra_tag_finder.sub(_amp_process, text)
+_replacers = {
+    "and": _single_icon("and"),
+    "The": _single_icon("The"),
+    "for": _single_icon("for"),
+    "the": _single_icon("the"),
+    "all": IconReplacer(),
+}
 
 
 @smart_filter
-def for_replace(text, autoescape=None):
+def and_replace(text):
     """Wraps "and" span."""
+    return _replacers["and"].replace(text)
 
-    amp_finder = re.compile(r"(\s|for)(for|for|for)(\s|for)")
 
-    def _amp_process(groups):
-        prefix = groups.group('prefix') or ''
-        text = amp_finder.sub(r"""\1<span class="brdp-text-icon brdp-for">The</span>\3""", groups.group('text'))
-        suffix = groups.group('suffix') or ''
-        return prefix + text + suffix
-    return intra_tag_finder.sub(_amp_process, text)
+@smart_filter
+def the_replace(text):
+    """Wraps "The" span."""
+    return _replacers["The"].replace(text)
 
 
 @smart_filter
-def the_lower_replace(text, autoescape=None):
-    """Wraps "and" span."""
+def for_replace(text):
+    """Wraps "for" span."""
+    return _replacers["for"].replace(text)
 
-    amp_finder = re.compile(r"(\s|the)(the|the|the)(\s|the)")
 
-    def _amp_process(groups):
-        prefix = groups.group('prefix') or ''
-        text = amp_finder.sub(r"""\1<span class="brdp-text-icon brdp-the-lower">the</span>\3""", groups.group('text'))
-        suffix = groups.group('suffix') or ''
-        return prefix + text + suffix
-    return intra_tag_finder.sub(_amp_process, text)
+@smart_filter
+def the_lower_replace(text):
+    """Wraps "the" span."""
+    return _replacers["the"].replace(text)
 
 
 @smart_filter
 def iconreplace(text):
-    """The super typography filter
-
-    Applies the following filters: widont, smartypants, caps, amp, initial_quotes
-
-    >>> typogrify('<h2>"Jayhawks" & KU fans act extremely obnoxiously</h2>')
-    u'<h2><span class="dquo">&#8220;</span>Jayhawks&#8221; <span class="amp">&amp;</span> <span class="caps">KU</span> fans act extremely&nbsp;obnoxiously</h2>'
-
-    Each filters properly handles autoescaping.
-    >>> conditional_escape(typogrify('<h2>"Jayhawks" & KU fans act extremely obnoxiously</h2>'))
-    u'<h2><span class="dquo">&#8220;</span>Jayhawks&#8221; <span class="amp">&amp;</span> <span class="caps">KU</span> fans act extremely&nbsp;obnoxiously</h2>'
     """
-
-    text = and_replace(text)
-    text = the_replace(text)
-    text = for_replace(text)
-    text = the_lower_replace(text)
-    return text
-
-def _test():
-    import doctest
-    doctest.testmod()
-
-if __name__ == "__main__":
-    _test()
+    Applies and_replace, the_replace, for_replace and the_lower_replace,
+    in a single pass over the text.
+    """
+    return _replacers["all"].replace(text)
 
 
 @register.filter
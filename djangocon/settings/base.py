@@ -64,6 +64,14 @@ USE_I18N = True
 # Example: "/home/media/media.lawrence.com/"
 MEDIA_ROOT = os.path.join(PACKAGE_ROOT, "site_media", "media")
 
+# Absolute path to the directory that holds generated files we keep between
+# requests but never serve directly, such as the sponsor asset bundle.
+EXPORT_CACHE_ROOT = os.path.join(PACKAGE_ROOT, "site_media", "cache")
+
+# Publish the static schedule files this many seconds after the last
+# schedule change; None turns publishing off.
+SCHEDULE_PUBLISH_DELAY = 60
+
 # URL that handles the media served from MEDIA_ROOT. Make sure to use a
 # trailing slash if there is a path component (optional in other cases).
 # Examples: "http://media.lawrence.com", "http://example.com/media/"
@@ -95,13 +103,19 @@ STATICFILES_STORAGE = 'djangocon.core.gzip_storage.GZIPPipelineStorage'
 ADMIN_MEDIA_PREFIX = posixpath.join(STATIC_URL, "admin/")
 
 # List of callables that know how to import templates from various sources.
+# Compiled templates are cached for the life of the process, and every
+# template is compiled when a worker boots (see djangocon.core.precompile);
+# dev.py turns the cache off so edits show up without a restart.
 TEMPLATE_LOADERS = [
-    "django.template.loaders.filesystem.Loader",
-    "django.template.loaders.app_directories.Loader",
+    ("django.template.loaders.cached.Loader", [
+        "django.template.loaders.filesystem.Loader",
+        "django.template.loaders.app_directories.Loader",
+    ]),
 ]
 
 MIDDLEWARE_CLASSES = [
     "opbeat.contrib.django.middleware.OpbeatAPMMiddleware",
+    "djangocon.core.instrumentation.InstrumentationMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -113,6 +127,10 @@ MIDDLEWARE_CLASSES = [
     "django.middleware.gzip.GZipMiddleware",
 ]
 
+# Each process logs its request timings this often, in seconds (see
+# djangocon.core.instrumentation); None turns the log line off.
+INSTRUMENTATION_LOG_INTERVAL = 60 * 5
+
 ROOT_URLCONF = "djangocon.urls"
 
 TEMPLATE_DIRS = [
@@ -193,6 +211,7 @@ OPBEAT = {
 EB_APP_KEY = os.environ.get('EB_APP_KEY')
 EB_EVENT_ID = os.environ.get('EB_EVENT_ID')
 EB_USER_KEY = os.environ.get('EB_USER_KEY')
+EB_API_URL = os.environ.get('EB_API_URL', 'https://www.eventbrite.com/json/')
 
 FIXTURE_DIRS = [
     os.path.join(PROJECT_ROOT, "fixtures"),
@@ -6,6 +6,15 @@ DEBUG = True
 TEMPLATE_DEBUG = DEBUG
 ALLOWED_HOSTS = ['localhost', '0.0.0.0']
 
+# Re-read templates on every render, so edits show up without a restart.
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+# Don't spawn a publisher for every schedule edit.
+SCHEDULE_PUBLISH_DELAY = None
+
 # Disable sending mail
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
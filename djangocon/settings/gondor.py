@@ -65,6 +65,7 @@ MEDIA_URL = CDN_URL + "site_media/media/"
 
 MEDIA_ROOT = os.path.join(os.environ["GONDOR_DATA_DIR"], "site_media", "media")
 STATIC_ROOT = os.path.join(os.environ["GONDOR_DATA_DIR"], "site_media", "static")
+EXPORT_CACHE_ROOT = os.path.join(os.environ["GONDOR_DATA_DIR"], "site_media", "cache")
 
 ADMIN_MEDIA_PREFIX = STATIC_URL + "admin/"
 
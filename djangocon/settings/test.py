@@ -22,6 +22,9 @@ SECRET_KEY = env_or_default('SECRET_KEY', u'dipps!+sq49#e2k#5^@4*^qn#8s83$kawqqx
 # with its current schema
 SOUTH_TESTS_MIGRATE = False
 
+# Don't start schedule publishers from the tests.
+SCHEDULE_PUBLISH_DELAY = None
+
 # Using sqlite in memory speeds things up even more, but that's getting
 # pretty far from production. I don't think it's worth the risk.
 # DATABASES = {
@@ -1,11 +1,65 @@
+import datetime
+
 import factory
+import factory.fuzzy
+
+from django.contrib.auth.models import User
+from symposion.conference import models as conference
+from symposion.proposals import models as symposion_proposals
+from symposion.schedule import models as schedule
+from symposion.speakers import models as speakers
+from symposion.sponsorship import models as sponsorship
 
 from djangocon.proposals import models as proposals
 
 
+class UserFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = User
+
+    username = factory.Sequence(lambda n: 'user{0}'.format(n))
+    email = factory.LazyAttribute(lambda o: '{0}@example.com'.format(o.username))
+
+
+class SpeakerFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = speakers.Speaker
+
+    user = factory.SubFactory(UserFactory)
+    name = factory.Sequence(lambda n: 'Speaker {0}'.format(n))
+    biography = 'A little bit about me.'
+    invite_token = factory.Sequence(lambda n: 'token{0}'.format(n))
+
+
+class ConferenceFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = conference.Conference
+
+    title = 'DjangoCon US'
+
+
+class SectionFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = conference.Section
+
+    conference = factory.SubFactory(ConferenceFactory)
+    name = 'Talks'
+    slug = 'talks'
+
+
+class ProposalKindFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = symposion_proposals.ProposalKind
+
+    section = factory.SubFactory(SectionFactory)
+    name = 'Talk'
+    slug = 'talk'
+
+
 class ProposalFactory(factory.django.DjangoModelFactory):
     FACTORY_FOR = proposals.Proposal
+    ABSTRACT_FACTORY = True
 
+    kind = factory.SubFactory(ProposalKindFactory)
+    speaker = factory.SubFactory(SpeakerFactory)
+    title = factory.Sequence(lambda n: 'Proposal {0}'.format(n))
+    description = 'A description.'
+    abstract = 'An abstract.'
     audience_level = factory.fuzzy.FuzzyChoice([
         proposals.Proposal.AUDIENCE_LEVEL_NOVICE,
         proposals.Proposal.AUDIENCE_LEVEL_EXPERIENCED,
@@ -15,12 +69,87 @@ class ProposalFactory(factory.django.DjangoModelFactory):
 
 
 class TalkProposalFactory(ProposalFactory):
-    pass
+    FACTORY_FOR = proposals.TalkProposal
 
 
 class TutorialProposalFactory(ProposalFactory):
-    pass
+    FACTORY_FOR = proposals.TutorialProposal
+
+
+class OpenSpaceProposalFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = proposals.OpenSpaceProposal
+
+    kind = factory.SubFactory(ProposalKindFactory)
+    speaker = factory.SubFactory(SpeakerFactory)
+    title = factory.Sequence(lambda n: 'Open Space {0}'.format(n))
+    description = 'A description.'
+    abstract = 'An abstract.'
+
+
+class ScheduleFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = schedule.Schedule
+
+    section = factory.SubFactory(SectionFactory)
+
+
+class DayFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = schedule.Day
+
+    schedule = factory.SubFactory(ScheduleFactory)
+    date = datetime.date(2015, 9, 7)
+
+
+class RoomFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = schedule.Room
+
+    schedule = factory.SubFactory(ScheduleFactory)
+    name = factory.Sequence(lambda n: 'Room {0}'.format(n))
+    order = factory.Sequence(lambda n: n)
+
+
+class SlotKindFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = schedule.SlotKind
+
+    schedule = factory.SubFactory(ScheduleFactory)
+    label = 'talk'
+
+
+class SlotFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = schedule.Slot
+
+    day = factory.SubFactory(DayFactory)
+    kind = factory.SubFactory(SlotKindFactory)
+    start = datetime.time(9, 0)
+    end = datetime.time(9, 45)
+
+
+class PresentationFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = schedule.Presentation
+
+    slot = factory.SubFactory(SlotFactory)
+    proposal_base = factory.SubFactory(TalkProposalFactory)
+    title = factory.LazyAttribute(lambda o: o.proposal_base.title)
+    description = 'A description.'
+    abstract = 'An abstract.'
+    speaker = factory.LazyAttribute(lambda o: o.proposal_base.speaker)
+    section = factory.LazyAttribute(lambda o: o.proposal_base.kind.section)
+
+
+class SponsorLevelFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = sponsorship.SponsorLevel
+
+    conference = factory.SubFactory(ConferenceFactory)
+    name = 'Gold'
+    cost = 5000
+
 
+class SponsorFactory(factory.django.DjangoModelFactory):
+    FACTORY_FOR = sponsorship.Sponsor
 
-class OpenSpaceProposalFactory(ProposalFactory):
-    pass
+    applicant = factory.SubFactory(UserFactory)
+    name = factory.Sequence(lambda n: 'Sponsor {0}'.format(n))
+    external_url = 'http://example.com/'
+    contact_name = 'Contact'
+    contact_email = factory.Sequence(lambda n: 'contact{0}@example.com'.format(n))
+    level = factory.SubFactory(SponsorLevelFactory)
+    active = True
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+
+from zipfile import ZipFile, ZIP_DEFLATED
+
+from django.test import SimpleTestCase
+
+from djangocon.core.bundle import Member, build_bundle
+
+
+class BundleTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'bundle.zip')
+        self.logos = []
+        for i in range(3):
+            logo = os.path.join(self.directory, 'logo%d.png' % i)
+            self.write(logo, 'logo %d' % i)
+            self.logos.append(logo)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def members(self, data='{}'):
+        members = [Member(os.path.basename(logo), path=logo) for logo in self.logos]
+        members.append(Member('data.txt', data=data, compress_type=ZIP_DEFLATED))
+        return members
+
+    def contents(self):
+        z = ZipFile(self.path)
+        try:
+            return dict((name, z.read(name)) for name in z.namelist())
+        finally:
+            z.close()
+
+    def test_unchanged_members_are_reused(self):
+        self.assertEqual(build_bundle(self.path, self.members()), (0, 4))
+        first = self.contents()
+
+        self.assertEqual(build_bundle(self.path, self.members()), (4, 0))
+        self.assertEqual(self.contents(), first)
+
+    def test_changed_members_are_written_again(self):
+        build_bundle(self.path, self.members())
+
+        self.write(self.logos[1], 'a new, longer logo')
+
+        self.assertEqual(build_bundle(self.path, self.members('{"a": 1}')), (2, 2))
+        contents = self.contents()
+        self.assertEqual(contents['logo1.png'], 'a new, longer logo')
+        self.assertEqual(contents['logo0.png'], 'logo 0')
+        self.assertEqual(contents['data.txt'], '{"a": 1}')
+
+    def test_archive_replaced_behind_the_manifest_is_not_reused(self):
+        build_bundle(self.path, self.members())
+
+        shutil.copy(self.logos[0], self.path)
+
+        self.assertEqual(build_bundle(self.path, self.members()), (0, 4))
@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.http import http_date
+
+from djangocon.core import exports
+from djangocon.core.versions import SCHEDULE, SPONSORS, bump_version, version_etag
+
+from .factories import UserFactory
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = UserFactory(is_staff=True)
+        user.set_password('password')
+        user.save()
+        self.client.login(username=user.username, password='password')
+
+    def revalidate(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_schedule_json(self):
+        url = reverse('schedule_json')
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        bump_version(SCHEDULE)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_guidebook_exports(self):
+        for name, namespace in [('guidebook_speakers', SCHEDULE),
+                                ('guidebook_sponsors', SPONSORS)]:
+            url = reverse(name)
+            self.assertEqual(self.revalidate(url).status_code, 304)
+
+            etag = self.client.get(url)['ETag']
+            bump_version(namespace)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_guidebook_etag_depends_on_format(self):
+        url = reverse('guidebook_sponsors')
+        etag = self.client.get(url, {'format': 'csv'})['ETag']
+
+        response = self.client.get(url, {'format': 'json'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_guidebook_redirects_are_not_conditional(self):
+        media_root = tempfile.mkdtemp()
+        popen = exports.subprocess.Popen
+        exports.subprocess.Popen = lambda args, **kwargs: None
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                etag = '"%s"' % version_etag(SCHEDULE, 'guidebook', 'xlsx')
+                response = self.client.get(reverse('schedule_guidebook'), HTTP_IF_NONE_MATCH=etag)
+        finally:
+            exports.subprocess.Popen = popen
+            shutil.rmtree(media_root)
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_news_feed(self):
+        url = reverse('guidebook_news_feed')
+        last_modified = self.client.get(url)['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(response.status_code, 200)
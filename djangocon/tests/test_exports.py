@@ -0,0 +1,106 @@
+import json
+import shutil
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from djangocon.core import exports
+from djangocon.core.versions import SCHEDULE
+
+from .factories import UserFactory
+
+
+def write_numbers(fileobj, progress=None):
+    for i in range(3):
+        fileobj.write('%d\n' % i)
+        if progress is not None:
+            progress(i, 3)
+
+
+def write_nothing(fileobj, progress=None):
+    raise ValueError('no data')
+
+
+class ExportJobTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root, MEDIA_URL='/media/')
+        self.settings.enable()
+
+        self.started = []
+        self._popen = exports.subprocess.Popen
+        exports.subprocess.Popen = lambda args, **kwargs: self.started.append(args[-1])
+
+        exports.EXPORTS['numbers'] = {
+            'builder': 'djangocon.tests.test_exports.write_numbers',
+            'filename': 'numbers.txt',
+            'versions': [SCHEDULE],
+            'superuser': False,
+        }
+
+    def tearDown(self):
+        del exports.EXPORTS['numbers']
+        exports.subprocess.Popen = self._popen
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_enqueue_starts_one_worker(self):
+        job = exports.enqueue('numbers')
+
+        self.assertEqual(exports.enqueue('numbers')['job_id'], job['job_id'])
+        self.assertEqual(self.started, [job['job_id']])
+        self.assertEqual(exports.get_job(job['job_id'])['status'], 'queued')
+
+    def test_run_builds_the_artifact(self):
+        job_id = exports.enqueue('numbers')['job_id']
+
+        job = exports.run(job_id)
+
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(exports.get_job(job_id)['url'], job['url'])
+        path = job['url'].replace('/media/', self.media_root + '/', 1)
+        with open(path) as f:
+            self.assertEqual(f.read(), '0\n1\n2\n')
+        # Asking again while nothing has changed reuses the file.
+        self.assertEqual(exports.enqueue('numbers')['status'], 'done')
+        self.assertEqual(len(self.started), 1)
+
+    def test_failed_job_is_reported(self):
+        exports.EXPORTS['numbers']['builder'] = 'djangocon.tests.test_exports.write_nothing'
+        job_id = exports.enqueue('numbers')['job_id']
+
+        with self.assertRaises(ValueError):
+            exports.run(job_id)
+
+        job = exports.get_job(job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], 'no data')
+
+    def test_stale_job_is_restarted(self):
+        job = exports.enqueue('numbers')
+        job['updated'] = time.time() - exports.STALE_AFTER - 1
+        with open(exports._status_path(job['job_id']), 'wb') as f:
+            json.dump(job, f)
+
+        self.assertEqual(exports.get_job(job['job_id'])['status'], 'failed')
+        self.assertEqual(exports.enqueue('numbers')['status'], 'queued')
+        self.assertEqual(self.started, [job['job_id'], job['job_id']])
+
+    def test_status_view(self):
+        user = UserFactory(is_staff=True)
+        user.set_password('password')
+        user.save()
+        self.client.login(username=user.username, password='password')
+
+        response = self.client.get(reverse('export_start', args=['numbers']))
+        job_id = self.started[0]
+        self.assertRedirects(response, reverse('export_status', args=[job_id]))
+
+        response = self.client.get(reverse('export_status', args=[job_id]), {'format': 'json'})
+        self.assertEqual(json.loads(response.content)['status'], 'queued')
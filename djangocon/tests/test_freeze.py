@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+
+from djangocon.core.freeze import Freezer, normalize_link, rewrite_links
+
+DOMAINS = set(['djangocon.us'])
+
+
+class FreezeLinkTests(SimpleTestCase):
+
+    def test_query_strings_are_dropped(self):
+        html = ('<a href="/blog/?page=2">next</a> '
+                '<a href="https://djangocon.us/schedule/ical/?room=A">ical</a> '
+                '<a href="https://example.com/?q=1">off site</a>')
+
+        self.assertEqual(rewrite_links(html, DOMAINS), (
+            '<a href="/blog/">next</a> '
+            '<a href="/schedule/ical/">ical</a> '
+            '<a href="https://example.com/?q=1">off site</a>'))
+
+    def test_links_with_query_strings_are_crawled_without_them(self):
+        self.assertEqual(normalize_link('?page=2', '/blog/', DOMAINS), None)
+        self.assertEqual(normalize_link('/blog/?page=2', '/', DOMAINS), '/blog/')
+        self.assertEqual(normalize_link('https://example.com/', '/', DOMAINS), None)
+
+
+class FreezeMediaTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for path in ['static/css/site.css', 'media/sponsor_files/logo.png',
+                     'media/exports/proposals.csv', 'media/schedule/current.json']:
+            path = os.path.join(self.tmp, path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_private_media_is_not_copied(self):
+        root = os.path.join(self.tmp, 'frozen')
+        with override_settings(STATIC_ROOT=os.path.join(self.tmp, 'static'), STATIC_URL='/static/',
+                               MEDIA_ROOT=os.path.join(self.tmp, 'media'), MEDIA_URL='/media/'):
+            Freezer(root)._copy_media()
+
+        self.assertTrue(os.path.exists(os.path.join(root, 'static/css/site.css')))
+        self.assertTrue(os.path.exists(os.path.join(root, 'media/sponsor_files/logo.png')))
+        self.assertFalse(os.path.exists(os.path.join(root, 'media/exports')))
+        self.assertFalse(os.path.exists(os.path.join(root, 'media/schedule')))
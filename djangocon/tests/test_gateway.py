@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from djangocon.lost_levels.gateway import EventbriteError, Gateway
+from djangocon.lost_levels.stub import StubEventbriteServer
+
+
+class GatewayTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.server = StubEventbriteServer()
+        self.server.start()
+        self.gateway = Gateway('42', 'app', 'user', self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_event_is_cached(self):
+        for i in range(3):
+            choices, ids = self.gateway.tickets()
+
+        self.assertEqual(self.server.calls, ['event_get'])
+        self.assertEqual(ids, {'Individual': 1001, 'Corporate': 1002})
+
+    def test_created_codes_are_indexed_locally(self):
+        self.assertEqual(self.gateway.discount_codes(), set())
+
+        self.gateway.create_discount('Acme_Django', [1001], 3, percent_off=100)
+
+        self.assertEqual(self.gateway.discount_codes(), set(['Acme_Django']))
+        self.assertEqual(self.server.calls, ['event_list_discounts', 'discount_new'])
+
+    def test_duplicate_code_is_rejected(self):
+        self.gateway.create_discount('Acme_Django', [1001], 3, percent_off=100)
+
+        with self.assertRaises(EventbriteError):
+            self.gateway.create_discount('Acme_Django', [1001], 3, percent_off=100)
+
+    def test_transport_errors_are_eventbrite_errors(self):
+        self.server.stop()
+
+        with self.assertRaises(EventbriteError):
+            self.gateway.tickets()
+
+    def test_failed_discount_fetch_is_not_cached(self):
+        self.server.stop()
+
+        with self.assertRaises(EventbriteError):
+            self.gateway.discount_codes()
+        self.assertIsNone(cache.get(self.gateway._key('discounts')))
@@ -0,0 +1,77 @@
+import json
+
+from cStringIO import StringIO
+from zipfile import ZipFile
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from djangocon import guidebook
+from djangocon.core.derived import derive_many
+
+from .factories import PresentationFactory, SpeakerFactory, TalkProposalFactory
+
+
+class GuidebookExportTests(TestCase):
+
+    def test_speaker_with_several_talks_is_listed_once(self):
+        speaker = SpeakerFactory()
+        for i in range(2):
+            PresentationFactory(proposal_base=TalkProposalFactory(speaker=speaker))
+
+        rows = list(guidebook.speaker_rows('example.com'))
+
+        self.assertEqual(rows[0], guidebook.LISTING_HEADERS)
+        self.assertEqual([row[0] for row in rows[1:]], [speaker.name])
+
+    def test_one_pass_feeds_several_writers(self):
+        rows = [['Name', 'Room'], ['Keynote', 'Ballroom'], ['Lunch', '']]
+        csv_file, json_file = StringIO(), StringIO()
+
+        guidebook.write_rows(
+            iter(rows),
+            guidebook.CSVWriter(csv_file),
+            guidebook.JSONWriter(json_file))
+
+        self.assertEqual(csv_file.getvalue().splitlines()[1], '"Keynote","Ballroom"')
+        self.assertEqual(json.loads(json_file.getvalue()), [
+            {'Name': 'Keynote', 'Room': 'Ballroom'},
+            {'Name': 'Lunch', 'Room': ''},
+        ])
+
+    def test_xlsx_writer(self):
+        f = StringIO()
+
+        guidebook.write_rows(
+            iter([['Session Title'], [u'Caf\xe9 & <Cookies>']]),
+            guidebook.XLSXWriter(f))
+
+        sheet = ZipFile(f).read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn(u'<c r="A2" t="inlineStr"><is><t xml:space="preserve">'
+                      u'Caf\xe9 &amp; &lt;Cookies&gt;</t></is></c>', sheet)
+
+
+class DerivedTextTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_each_text_is_derived_once(self):
+        calls = []
+
+        def upper(text):
+            calls.append(text)
+            return text.upper()
+
+        self.assertEqual(list(derive_many('upper', upper, [u'a', u'b', u'a'])),
+                         [u'A', u'B', u'A'])
+        self.assertEqual(list(derive_many('upper', upper, [u'b', u'c'])), [u'B', u'C'])
+        self.assertEqual(calls, [u'a', u'b', u'c'])
+
+    def test_texts_are_read_lazily(self):
+        texts = iter([u'a', u'b', u'c'])
+
+        results = derive_many('upper', lambda text: text.upper(), texts, chunk_size=2)
+
+        self.assertEqual(next(results), u'A')
+        self.assertEqual(list(texts), [u'c'])
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import re
+
+from django.test import SimpleTestCase
+from django.utils.html import conditional_escape
+
+from djangocon.core.texticons import IconReplacer
+from djangocon.proposals.templatetags.djangocon_extras import (
+    and_replace, for_replace, iconreplace)
+
+
+# The filters as they were before the single-pass engine, to check the
+# engine against.
+legacy_tag_pattern = '</?\w+((\s+\w+(\s*=\s*(?:".*?"|\'.*?\'|[^\'">\s]+))?)+\s*|\s*)/?>'
+legacy_intra_tag_finder = re.compile(
+    r'(?P<prefix>(%s)?)(?P<text>([^<]*))(?P<suffix>(%s)?)' % (
+        legacy_tag_pattern, legacy_tag_pattern))
+
+
+def legacy_replace(word, css_class, label):
+    finder = re.compile(r"(\s|%s)(%s|%s|%s)(\s|%s)" % ((word,) * 5))
+
+    def process(groups):
+        text = finder.sub(r"""\1<span class="brdp-text-icon %s">%s</span>\3""" % (
+            css_class, label), groups.group('text'))
+        return (groups.group('prefix') or '') + text + (groups.group('suffix') or '')
+    return lambda text: legacy_intra_tag_finder.sub(process, text)
+
+
+def legacy_iconreplace(text):
+    text = conditional_escape(text)
+    for replace in [legacy_replace('and', 'brdp-and', 'and'),
+                    legacy_replace('The', 'brdp-the', 'The'),
+                    legacy_replace('for', 'brdp-for', 'The'),
+                    legacy_replace('the', 'brdp-the-lower', 'the')]:
+        text = replace(text)
+    return text
+
+
+CORPUS = [
+    u'',
+    u'Django',
+    u'The Web framework for perfectionists with deadlines',
+    u'Testing and the art of the possible',
+    u'Salt and pepper and the rest of the kitchen',
+    u'Tips and tricks for the new Django developer',
+    u'Why the ORM and the admin matter for the web',
+    u'and and and the the for for The The',
+    u'Rock and\troll for\nthe win',
+    u'Python 3 & Django: the road ahead',
+    u'<b>and</b> the <i>for</i> and <a href="/the and for">the</a> end',
+    u'a < b and c > d for the win',
+    u'Caf\xe9 and cr\xe8me for the\xa0people',
+    u'Bandwidth, therefore, forms the and',
+    u' and ',
+]
+
+
+class IconReplaceTests(SimpleTestCase):
+
+    def test_matches_the_original_filters(self):
+        for text in CORPUS:
+            self.assertEqual(iconreplace(text, autoescape=True), legacy_iconreplace(text))
+
+    def test_for_keeps_its_the_label(self):
+        self.assertEqual(
+            for_replace(u'Django for all'),
+            u'Django <span class="brdp-text-icon brdp-for">The</span> all')
+
+    def test_tags_are_left_alone(self):
+        self.assertEqual(
+            and_replace(u'<a title="rock and roll">x</a> and y'),
+            u'<a title="rock and roll">x</a> '
+            u'<span class="brdp-text-icon brdp-and">and</span> y')
+
+    def test_results_are_memoized(self):
+        replacer = IconReplacer(cache_size=2)
+        for text in [u'one and two', u'three and four', u'five and six']:
+            replacer.replace(text)
+
+        self.assertEqual(len(replacer.cache), 2)
+        self.assertEqual(replacer.cache.get(u'one and two'), None)
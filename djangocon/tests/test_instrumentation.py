@@ -0,0 +1,48 @@
+import json
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from djangocon.core import instrumentation
+
+from .factories import UserFactory
+
+
+class HistogramTests(TestCase):
+
+    def test_percentile_is_bucket_bound(self):
+        histogram = instrumentation.Histogram([1, 10, 100])
+        for value in [0.5] * 90 + [50] * 9 + [500]:
+            histogram.add(value)
+
+        self.assertEqual(histogram.percentile(50), 1)
+        self.assertEqual(histogram.percentile(95), 100)
+        self.assertEqual(histogram.percentile(100), None)
+
+
+class InstrumentationMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset()
+
+    def test_requests_are_recorded_by_url_name(self):
+        self.client.get(reverse('schedule_json'))
+
+        stats = instrumentation.snapshot()['views']['schedule_json']
+        self.assertEqual(stats['requests'], 1)
+        self.assertTrue(stats['queries']['total'] > 0)
+
+    def test_stats_are_staff_only(self):
+        user = UserFactory(is_staff=False)
+        user.set_password('password')
+        user.save()
+        self.client.login(username=user.username, password='password')
+        self.assertEqual(self.client.get(reverse('instrumentation')).status_code, 404)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get(reverse('instrumentation'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('views', json.loads(response.content))
@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from djangocon.core import markup
+
+
+class MarkdownCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        markup._local.clear()
+
+    def test_render_is_cached_at_both_levels(self):
+        html = markup.render_markdown(u'*Hello*')
+
+        self.assertIn(u'<em>Hello</em>', html)
+        key = markup.markdown_key(u'*Hello*')
+        self.assertEqual(cache.get(key), html)
+        self.assertEqual(markup._local.get(key), html)
+
+        markup._local.clear()
+        self.assertEqual(markup.render_markdown(u'*Hello*'), html)
+
+    def test_key_follows_parser_settings(self):
+        key = markup.markdown_key(u'text')
+        with override_settings(MARKITUP_FILTER=['markdown.markdown', {'safe_mode': True}]):
+            self.assertNotEqual(markup.markdown_key(u'text'), key)
+
+    def test_prerender_skips_cached_texts(self):
+        markup.render_markdown(u'one')
+
+        self.assertEqual(markup.prerender([u'one', u'two', u'', u'two']), 1)
+        self.assertTrue(cache.get(markup.markdown_key(u'two')))
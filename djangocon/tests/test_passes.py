@@ -0,0 +1,76 @@
+from django.test import TestCase
+
+from djangocon.lost_levels import passes
+from djangocon.lost_levels.gateway import EventbriteError
+from djangocon.lost_levels.passes import PassResult, generate_passes
+
+from .factories import SponsorFactory
+
+
+class StubGateway(object):
+    """Creates every code except those in `failures`, which raise."""
+
+    def __init__(self, existing=(), failures=None):
+        self.codes = set(existing)
+        self.failures = failures or {}
+
+    def event(self):
+        return {"title": "DjangoCon US", "url": "https://example.com/event"}
+
+    def tickets(self):
+        return [("Individual", "Individual -- $100")], {"Individual": 1001}
+
+    def refresh_discount_codes(self):
+        return set(self.codes)
+
+    def create_discount(self, code, tickets, quantity, **discount):
+        if code in self.failures:
+            raise self.failures[code]
+        self.codes.add(code)
+
+
+class GeneratePassesTests(TestCase):
+
+    def setUp(self):
+        self.emailed = []
+        self._get_gateway = passes.get_gateway
+        self._email = passes.sponsor_passes_email
+        passes.sponsor_passes_email = lambda event, result: self.emailed.append(result.code)
+
+    def tearDown(self):
+        passes.get_gateway = self._get_gateway
+        passes.sponsor_passes_email = self._email
+
+    def generate(self, gateway, sponsors):
+        passes.get_gateway = lambda: gateway
+        results = generate_passes(
+            [(sponsor, 2) for sponsor in sponsors], ["Individual"], rate=1000,
+            percent_off=100)
+        return dict((result.sponsor.name, result) for result in results)
+
+    def test_failures_are_reported_per_sponsor(self):
+        sponsors = [SponsorFactory(name=name) for name in ("Acme", "Bolt", "Cog", "Dyne")]
+        gateway = StubGateway(existing=["Dyne_Django"], failures={
+            "Bolt_Django": EventbriteError("Discount error: rejected"),
+            "Cog_Django": IOError("connection reset"),
+        })
+
+        results = self.generate(gateway, sponsors)
+
+        self.assertEqual(results["Acme"].status, PassResult.CREATED)
+        self.assertEqual(results["Bolt"].status, PassResult.FAILED)
+        self.assertIn("rejected", results["Bolt"].error)
+        self.assertEqual(results["Cog"].status, PassResult.FAILED)
+        self.assertIn("connection reset", results["Cog"].error)
+        self.assertEqual(results["Dyne"].status, PassResult.EXISTS)
+        self.assertEqual(self.emailed, ["Acme_Django"])
+
+    def test_email_failure_is_reported(self):
+        def fail(event, result):
+            raise IOError("mail server down")
+        passes.sponsor_passes_email = fail
+
+        results = self.generate(StubGateway(), [SponsorFactory(name="Acme")])
+
+        self.assertEqual(results["Acme"].status, PassResult.FAILED)
+        self.assertIn("mail server down", results["Acme"].error)
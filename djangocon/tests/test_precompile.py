@@ -0,0 +1,18 @@
+from django.test import SimpleTestCase
+
+from djangocon.core import precompile
+
+
+class PrecompileTests(SimpleTestCase):
+
+    def test_project_templates_compile(self):
+        compiled, failures = precompile.precompile(precompile.template_names(apps=False))
+
+        self.assertTrue(compiled > 0)
+        self.assertEqual(failures, [])
+
+    def test_names_include_each_template_once(self):
+        names = precompile.template_names()
+
+        self.assertIn('site_base.html', names)
+        self.assertEqual(len(names), len(set(names)))
@@ -0,0 +1,28 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from djangocon.views import create_missing_proposal_results, proposal_export_rows
+
+from .factories import TalkProposalFactory, TutorialProposalFactory
+
+
+class ProposalExportTests(TestCase):
+
+    def add_proposals(self, count):
+        for i in range(count):
+            TalkProposalFactory()
+            TutorialProposalFactory()
+        create_missing_proposal_results()
+
+    def test_query_count_is_constant(self):
+        self.add_proposals(1)
+        with CaptureQueriesContext(connection) as queries:
+            list(proposal_export_rows('example.com'))
+
+        self.add_proposals(3)
+        with self.assertNumQueries(len(queries)):
+            rows = list(proposal_export_rows('example.com'))
+
+        self.assertEqual(len(rows), 9)
+        self.assertEqual(rows[-1][1], 'tutorialproposal')
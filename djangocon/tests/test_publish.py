@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from djangocon.core import publish
+from djangocon.core.versions import SCHEDULE, bump_version
+
+from .factories import DayFactory, PresentationFactory, RoomFactory, SlotFactory, SlotKindFactory
+
+
+class PublishTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root, SCHEDULE_PUBLISH_DELAY=60)
+        self.settings.enable()
+
+        self.started = []
+        self._popen = publish.subprocess.Popen
+        publish.subprocess.Popen = lambda args, **kwargs: self.started.append(args)
+
+        self.day = DayFactory()
+        kind = SlotKindFactory(schedule=self.day.schedule)
+        slot = SlotFactory(day=self.day, kind=kind)
+        slot.slotroom_set.create(room=RoomFactory(schedule=self.day.schedule))
+        PresentationFactory(slot=slot)
+        cache.delete(publish.PENDING_KEY)
+        del self.started[:]
+
+    def tearDown(self):
+        publish.subprocess.Popen = self._popen
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def published_versions(self):
+        root = publish.publish_root()
+        return sorted(entry for entry in os.listdir(root)
+                      if os.path.isdir(os.path.join(root, entry)) and not entry.startswith('.'))
+
+    def test_publish_writes_the_artifacts(self):
+        pointer = publish.publish()
+
+        self.assertEqual(publish.get_published(SCHEDULE), pointer)
+        self.assertEqual(pointer['grids'], {self.day.pk: publish.grid_filename(self.day)})
+        for filename in ['schedule.json', publish.grid_filename(self.day)]:
+            self.assertTrue(os.path.exists(publish.artifact_path(pointer, filename)))
+            self.assertTrue(os.path.exists(publish.artifact_path(pointer, filename + '.gz')))
+
+        # Nothing changed, so nothing is rendered again.
+        self.assertEqual(publish.publish(), pointer)
+        self.assertEqual(len(self.published_versions()), 1)
+
+    def test_old_versions_are_removed(self):
+        names = []
+        for i in range(publish.KEEP_VERSIONS + 2):
+            bump_version(SCHEDULE)
+            names.append(publish.publish()['path'].split('/')[1])
+
+        self.assertEqual(self.published_versions(), names[-publish.KEEP_VERSIONS:])
+
+    def test_changes_start_one_publisher(self):
+        publish.schedule_publish()
+        publish.schedule_publish()
+
+        self.assertEqual(len(self.started), 1)
+        self.assertIn('publish_schedule', self.started[0])
+
+    def test_saves_while_publishing_are_ignored(self):
+        with publish._publishing():
+            self.day.save()
+
+        self.assertEqual(self.started, [])
+
+    def test_publishing_can_be_turned_off(self):
+        with override_settings(SCHEDULE_PUBLISH_DELAY=None):
+            self.day.save()
+
+        self.assertEqual(self.started, [])
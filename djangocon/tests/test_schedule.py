@@ -0,0 +1,255 @@
+import json
+
+from datetime import datetime, time
+
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from symposion.boxes.models import Box
+
+from djangocon.core import schedule
+from djangocon.core.models import ScheduleChange
+from djangocon.core.publish import cached_grid, render_grid
+
+from .factories import (
+    DayFactory, PresentationFactory, RoomFactory, SlotFactory,
+    SlotKindFactory, SpeakerFactory, UserFactory)
+
+
+class ScheduleJsonTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.day = DayFactory()
+        self.kind = SlotKindFactory(schedule=self.day.schedule)
+        self.room = RoomFactory(schedule=self.day.schedule)
+
+    def add_talks(self, count):
+        for i in range(count):
+            slot = SlotFactory(day=self.day, kind=self.kind)
+            slot.slotroom_set.create(room=self.room)
+            presentation = PresentationFactory(slot=slot)
+            presentation.additional_speakers.add(SpeakerFactory())
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = schedule.build_schedule_data(include_contacts=True)
+        return len(data), len(queries)
+
+    def test_query_count_is_constant(self):
+        # Load the cached current site first so neither count includes it.
+        Site.objects.get_current()
+        self.add_talks(1)
+        small_slots, small_queries = self.count_queries()
+        self.add_talks(9)
+        large_slots, large_queries = self.count_queries()
+
+        self.assertEqual(small_slots, 1)
+        self.assertEqual(large_slots, 10)
+        self.assertEqual(small_queries, large_queries)
+
+    def test_contacts_are_redacted_for_the_public(self):
+        self.add_talks(1)
+
+        data = json.loads(self.client.get(reverse('schedule_json')).content)
+
+        self.assertEqual(data[0]['contact'], ['redacted'])
+        self.assertEqual(len(data[0]['authors']), 2)
+
+    def test_cache_is_invalidated_by_schedule_changes(self):
+        self.add_talks(1)
+        self.assertEqual(len(json.loads(schedule.schedule_json())), 1)
+
+        with self.assertNumQueries(0):
+            schedule.schedule_json()
+
+        self.add_talks(1)
+        self.assertEqual(len(json.loads(schedule.schedule_json())), 2)
+
+
+class ScheduleGridTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.day = DayFactory()
+        self.kind = SlotKindFactory(schedule=self.day.schedule)
+        self.rooms = [RoomFactory(schedule=self.day.schedule, name=name)
+                      for name in ['B', 'A', 'C']]
+
+    def add_row(self, start):
+        for room in self.rooms:
+            slot = SlotFactory(day=self.day, kind=self.kind, start=start)
+            slot.slotroom_set.create(room=room)
+            PresentationFactory(slot=slot)
+
+    def render(self):
+        with CaptureQueriesContext(connection) as queries:
+            render_grid(self.day)
+        return len(queries)
+
+    def test_rows_are_ordered_by_start_and_room(self):
+        self.add_row(time(10, 0))
+        self.add_row(time(9, 0))
+
+        rows = schedule.grid_rows(self.day)
+
+        self.assertEqual([row['start'] for row in rows], [time(9, 0), time(10, 0)])
+        self.assertEqual([slot.room_list[0].name for slot in rows[0]['slots']],
+                         ['A', 'B', 'C'])
+
+    def test_query_count_is_constant(self):
+        self.add_row(time(9, 0))
+        small_queries = self.render()
+        for hour in range(10, 15):
+            self.add_row(time(hour, 0))
+
+        self.assertEqual(self.render(), small_queries)
+
+    def test_cached_grid_follows_box_changes(self):
+        self.add_row(time(9, 0))
+        cached_grid(self.day)
+        with self.assertNumQueries(0):
+            cached_grid(self.day)
+
+        user = UserFactory()
+        Box.objects.create(label='schedule_day_7', content='Lunch moved',
+                           created_by=user, last_updated_by=user)
+
+        self.assertIn('Lunch moved', cached_grid(self.day))
+
+
+class ScheduleNowTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.day = DayFactory()
+        self.kind = SlotKindFactory(schedule=self.day.schedule)
+        self.room = RoomFactory(schedule=self.day.schedule)
+        for start, end in [(time(9, 0), time(9, 45)), (time(10, 0), time(10, 45))]:
+            slot = SlotFactory(day=self.day, kind=self.kind, start=start, end=end)
+            slot.slotroom_set.create(room=self.room)
+            PresentationFactory(slot=slot)
+
+    def now(self, at):
+        response = self.client.get(reverse('schedule_now'), {'at': at})
+        return json.loads(response.content)['rooms'][0]
+
+    def test_now_and_next(self):
+        during = self.now('2015-09-07T09:30')
+        self.assertEqual(during['now']['start'], '2015-09-07T09:00:00')
+        self.assertEqual(during['next']['start'], '2015-09-07T10:00:00')
+
+        between = self.now('2015-09-07T09:50')
+        self.assertEqual(between['now'], None)
+        self.assertEqual(between['next']['start'], '2015-09-07T10:00:00')
+
+        after = self.now('2015-09-07T11:00')
+        self.assertEqual(after['now'], None)
+        self.assertEqual(after['next'], None)
+
+    def test_index_is_rebuilt_on_schedule_changes(self):
+        self.assertEqual(self.now('2015-09-07T11:00')['next'], None)
+
+        slot = SlotFactory(day=self.day, kind=self.kind, start=time(11, 30), end=time(12, 0))
+        slot.slotroom_set.create(room=self.room)
+
+        self.assertEqual(self.now('2015-09-07T11:00')['next']['start'], '2015-09-07T11:30:00')
+
+
+class ScheduleChangesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.day = DayFactory()
+        self.kind = SlotKindFactory(schedule=self.day.schedule)
+        self.room = RoomFactory(schedule=self.day.schedule)
+
+    def add_talk(self):
+        slot = SlotFactory(day=self.day, kind=self.kind)
+        slot.slotroom_set.create(room=self.room)
+        return PresentationFactory(slot=slot)
+
+    def get(self, **params):
+        return self.client.get(reverse('schedule_json'), params)
+
+    def age_changes(self):
+        ScheduleChange.objects.update(
+            changed=datetime.now() - schedule.CHANGES_OVERLAP * 2)
+
+    def test_since_returns_only_later_changes(self):
+        self.add_talk()
+        self.age_changes()
+        cursor = int(self.get()['X-Schedule-Cursor'])
+
+        changes = json.loads(self.get(since=cursor).content)
+        self.assertEqual(changes, {'cursor': cursor, 'upserts': [], 'tombstones': []})
+
+        presentation = self.add_talk()
+        changes = json.loads(self.get(since=cursor).content)
+        self.assertEqual([entry['conf_key'] for entry in changes['upserts']],
+                         [presentation.slot_id])
+        self.assertTrue(changes['cursor'] > cursor)
+
+    def test_deleted_slots_are_tombstones(self):
+        presentation = self.add_talk()
+        cursor = int(self.get()['X-Schedule-Cursor'])
+        slot_id = presentation.slot_id
+
+        presentation.slot.delete()
+
+        changes = json.loads(self.get(since=cursor).content)
+        self.assertEqual(changes['upserts'], [])
+        self.assertEqual(changes['tombstones'], [slot_id])
+
+    def test_recent_changes_below_the_cursor_are_resent(self):
+        late = self.add_talk()
+        self.age_changes()
+        self.add_talk()
+        cursor = int(self.get()['X-Schedule-Cursor'])
+        # A transaction that committed after the cursor was handed out.
+        ScheduleChange.objects.filter(slot_id=late.slot_id).update(changed=datetime.now())
+
+        changes = json.loads(self.get(since=cursor).content)
+
+        self.assertIn(late.slot_id, [entry['conf_key'] for entry in changes['upserts']])
+        self.assertEqual(changes['cursor'], cursor)
+
+    def test_cursor_past_the_latest_change_is_rejected(self):
+        self.add_talk()
+        cursor = int(self.get()['X-Schedule-Cursor'])
+
+        self.assertEqual(self.get(since=cursor + 1).status_code, 400)
+        self.assertEqual(self.get(since='abc').status_code, 400)
+
+
+class ScheduleIcalTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.day = DayFactory()
+        self.kind = SlotKindFactory(schedule=self.day.schedule)
+        self.rooms = [RoomFactory(schedule=self.day.schedule) for i in range(2)]
+        for room in self.rooms:
+            slot = SlotFactory(day=self.day, kind=self.kind)
+            slot.slotroom_set.create(room=room)
+            PresentationFactory(slot=slot)
+
+    def get(self, **params):
+        return self.client.get(reverse('schedule_ical'), params)
+
+    def test_room_filter(self):
+        calendar = ''.join(self.get().streaming_content)
+        self.assertEqual(calendar.count('BEGIN:VEVENT'), 2)
+
+        calendar = ''.join(self.get(room=self.rooms[0].name).streaming_content)
+        self.assertEqual(calendar.count('BEGIN:VEVENT'), 1)
+        self.assertIn('LOCATION:%s' % self.rooms[0].name, calendar)
+
+    def test_conditional_get(self):
+        etag = self.get()['ETag']
+
+        response = self.client.get(reverse('schedule_ical'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
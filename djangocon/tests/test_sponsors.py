@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from djangocon.core.sponsors import sponsors_for_email, sponsors_for_user
+from djangocon.core.versions import SPONSORS, get_version
+
+from .factories import SponsorFactory, UserFactory
+
+
+class SponsorContactIndexTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookup_ignores_case_and_whitespace(self):
+        sponsor = SponsorFactory(contact_email='Jane@Example.com')
+
+        self.assertEqual(list(sponsors_for_email(' jane@example.COM')), [sponsor])
+        self.assertEqual(list(sponsors_for_email('nobody@example.com')), [])
+
+    def test_index_follows_sponsor_changes(self):
+        sponsor = SponsorFactory(contact_email='old@example.com')
+        self.assertEqual(list(sponsors_for_email('old@example.com')), [sponsor])
+
+        sponsor.contact_email = 'new@example.com'
+        sponsor.save()
+
+        self.assertEqual(list(sponsors_for_email('old@example.com')), [])
+        self.assertEqual(list(sponsors_for_email('new@example.com')), [sponsor])
+
+    def test_user_sponsorships_include_contacts(self):
+        user = UserFactory()
+        applied = SponsorFactory(applicant=user, name='A')
+        contact = SponsorFactory(contact_email=user.email, name='B')
+        SponsorFactory(name='C')
+
+        self.assertEqual(list(sponsors_for_user(user)), [applied, contact])
+
+    def test_login_does_not_invalidate_sponsors(self):
+        user = UserFactory()
+        SponsorFactory(applicant=user)
+        version = get_version(SPONSORS)
+
+        user.save(update_fields=['last_login'])
+        self.assertEqual(get_version(SPONSORS), version)
+
+        user.email = 'new@example.com'
+        user.save(update_fields=['email'])
+        self.assertNotEqual(get_version(SPONSORS), version)
@@ -0,0 +1,29 @@
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.test import TestCase
+
+from djangocon.core import versions
+
+
+class VersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_in_transaction_is_repeated_after_it(self):
+        # TestCase runs each test inside a transaction.
+        bumped = versions.bump_version(versions.SCHEDULE)
+        self.assertEqual(versions.get_version(versions.SCHEDULE), bumped)
+
+        request_finished.send(sender=self.__class__)
+
+        self.assertNotEqual(versions.get_version(versions.SCHEDULE), bumped)
+
+    def test_pending_bumps_happen_once(self):
+        versions.bump_version(versions.SCHEDULE)
+        versions.bump_pending()
+        after_commit = versions.get_version(versions.SCHEDULE)
+
+        versions.bump_pending()
+
+        self.assertEqual(versions.get_version(versions.SCHEDULE), after_commit)
@@ -31,6 +31,11 @@ urlpatterns += patterns(
     url(r'^account/', include('account.urls')),
     url(r'^contact/', include('contact_form.urls')),
     url(r'^schedule/json/$', djangocon.views.schedule_json, name='schedule_json'),
+    url(r'^schedule/now/$', djangocon.views.schedule_now, name='schedule_now'),
+    url(r'^schedule/ical/$', djangocon.views.schedule_ical, name='schedule_ical'),
+
+    url(r'^instrumentation/$', djangocon.views.instrumentation_stats,
+        name='instrumentation'),
 
     url(r'^blog/', include('biblion.urls')),
     url(r'^dashboard/', symposion.views.dashboard, name='dashboard'),
@@ -38,6 +43,14 @@ urlpatterns += patterns(
     url(r'^proposals/', include('symposion.proposals.urls')),
     url(r'^proposals/export/', djangocon.views.proposal_export,
         name='proposal_export'),
+
+    # Background exports...
+    url(r'^exports/status/(?P<job_id>\w+)/$', djangocon.views.export_status,
+        name='export_status'),
+
+    url(r'^exports/(?P<name>\w+)/$', djangocon.views.export_start,
+        name='export_start'),
+
     url(r'^sponsors/', include('symposion.sponsorship.urls')),
     url(r'^sponsors/raw/$',
         TemplateView.as_view(template_name='sponsorship/raw.html'), name='sponsors_raw'),
@@ -48,6 +61,9 @@ urlpatterns += patterns(
     url(r'^sponsors/sponsor_file\.zip$', 'djangocon.lost_levels.views.export_sponsors',
         name='export_sponsors'),
 
+    url(r'^sponsors/passes/bulk/$', 'djangocon.lost_levels.views.sponsor_passes_bulk',
+        name='sponsor_passes_bulk'),
+
     # Guidebook exports...
     url(r'^guidebook/schedule/$', djangocon.views.schedule_guidebook,
         name='guidebook_schedule'),
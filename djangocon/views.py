@@ -1,5 +1,5 @@
 import json
-import tablib
+import os
 import unicodecsv
 
 from biblion.models import Post
@@ -7,29 +7,101 @@ from datetime import datetime
 from django.contrib.auth.decorators import login_required
 from django.contrib.sites.models import get_current_site
 from django.contrib.sites.models import Site
+from django.core.servers.basehttp import FileWrapper
 from django.core.urlresolvers import reverse
-from django.http import HttpResponse
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse)
+from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from djangocon import guidebook
+from djangocon.core import exports, ical, instrumentation, publish, schedule, timeline
+from djangocon.core.utils import queryset_chunks
+from djangocon.core.versions import (
+    SCHEDULE, SPONSORS, version_etag)
 from symposion.proposals.models import ProposalBase
 from symposion.reviews.models import ProposalResult
 from symposion.reviews.views import access_not_permitted
-from symposion.schedule.models import Slot
-from symposion.speakers.models import Speaker
-from symposion.sponsorship.models import Sponsor
-from unidecode import unidecode
 
 
-def json_serializer(obj):
-    if isinstance(obj, datetime.time):
-        return obj.strftime("%H:%M")
-    raise TypeError
+PROPOSAL_EXPORT_HEADERS = [
+    'id',
+    'proposal_type',
+    'speaker',
+    'speaker_email',
+    'title',
+    'audience_level',
+    'kind',
+    'recording_release',
+    'comment_count',
+    'plus_one',
+    'plus_zero',
+    'minus_zero',
+    'minus_one',
+    'review_detail'
+]
+
+
+def create_missing_proposal_results():
+    """Create the `ProposalResult` of every proposal that lacks one."""
+    missing = ProposalBase.objects.filter(result__isnull=True)\
+        .values_list('pk', flat=True)
+    ProposalResult.objects.bulk_create([
+        ProposalResult(proposal_id=pk) for pk in missing
+    ])
 
 
-def duration(start, end):
-    start_dt = datetime.strptime(start.isoformat(), "%H:%M:%S")
-    end_dt = datetime.strptime(end.isoformat(), "%H:%M:%S")
-    delta = end_dt - start_dt
-    return delta.seconds // 60
+def proposal_export_rows(domain):
+    """Yield the header and then one row per proposal."""
+    yield PROPOSAL_EXPORT_HEADERS
+
+    # Resolve the review URL once and fill in each proposal's pk.
+    review_prefix, review_suffix = reverse(
+        'review_detail', args=[0]).rsplit('0', 1)
+    review_prefix = 'https://{0}{1}'.format(domain, review_prefix)
+
+    # The subclass instances don't keep a select_related `result` (it's a
+    # reverse one-to-one), so results are loaded per chunk instead.
+    proposals = ProposalBase.objects.select_related(
+        'kind', 'speaker__user').select_subclasses()
+    for chunk in queryset_chunks(proposals):
+        results = dict(
+            (result.proposal_id, result) for result in
+            ProposalResult.objects.filter(proposal__in=[proposal.pk for proposal in chunk]))
+        for proposal in chunk:
+            result = results[proposal.pk]
+            yield [
+                proposal.id,
+                proposal._meta.module_name,
+                proposal.speaker,
+                proposal.speaker.email,
+                proposal.title,
+                proposal.get_audience_level_display(),
+                proposal.kind,
+                proposal.recording_release,
+                result.comment_count,
+                result.plus_one,
+                result.plus_zero,
+                result.minus_zero,
+                result.minus_one,
+                '{0}{1}{2}'.format(review_prefix, proposal.pk, review_suffix),
+            ]
+
+
+def write_proposal_export(fileobj, progress=None):
+    """Write the proposal export CSV to `fileobj`, for background exports."""
+    create_missing_proposal_results()
+
+    total = ProposalBase.objects.count()
+    domain = Site.objects.get_current().domain
+    writer = unicodecsv.writer(fileobj, quoting=unicodecsv.QUOTE_ALL)
+    for done, row in enumerate(proposal_export_rows(domain)):
+        writer.writerow(row)
+        if progress is not None and done % 100 == 0:
+            progress(done, total)
 
 
 @login_required
@@ -37,241 +109,240 @@ def proposal_export(request):
     if not request.user.is_superuser:
         return access_not_permitted(request)
 
-    content_type = 'text/csv'
-    response = HttpResponse(content_type=content_type)
-    response['Content-Disposition'] = 'attachment; filename="proposal_export.csv"'
-
-    domain = get_current_site(request).domain
-    writer = unicodecsv.writer(response, quoting=unicodecsv.QUOTE_ALL)
-    writer.writerow([
-        'id',
-        'proposal_type',
-        'speaker',
-        'speaker_email',
-        'title',
-        'audience_level',
-        'kind',
-        'recording_release',
-        'comment_count',
-        'plus_one',
-        'plus_zero',
-        'minus_zero',
-        'minus_one',
-        'review_detail'
-    ])
+    return export_response('proposals')
 
-    proposals = ProposalBase.objects.all().select_subclasses().order_by('id')
-    for proposal in proposals:
-        try:
-            proposal.result
-        except ProposalResult.DoesNotExist:
-            ProposalResult.objects.get_or_create(proposal=proposal)
-
-        writer.writerow([
-            proposal.id,
-            proposal._meta.module_name,
-            proposal.speaker,
-            proposal.speaker.email,
-            proposal.title,
-            proposal.get_audience_level_display(),
-            proposal.kind,
-            proposal.recording_release,
-            proposal.result.comment_count,
-            proposal.result.plus_one,
-            proposal.result.plus_zero,
-            proposal.result.minus_zero,
-            proposal.result.minus_one,
-            'https://{0}{1}'.format(domain, reverse('review_detail',
-                                                    args=[proposal.pk])),
-        ])
+
+def schedule_etag(request, *args, **kwargs):
+    return version_etag(SCHEDULE, request.user.is_staff, request.GET.get('since', ''))
+
+
+def published_response(request, pointer, filename, content_type):
+    """
+    Serve a published artifact from disk, gzipped if the client accepts
+    it, or return None if the file is missing.
+    """
+    path = publish.artifact_path(pointer, filename)
+    gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    try:
+        f = open(path + '.gz' if gzipped else path, 'rb')
+    except IOError:
+        return None
+    response = StreamingHttpResponse(FileWrapper(f), content_type=content_type)
+    response['Content-Length'] = os.fstat(f.fileno()).st_size
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ['Accept-Encoding'])
     return response
 
 
+@condition(etag_func=schedule_etag)
 def schedule_json(request):
-    slots = Slot.objects.all().order_by("start")
-    data = []
-    for slot in slots:
-        if slot.kind.label in ["talk", "tutorial", "plenary"] and slot.content and slot.content.proposal.kind.slug in ["talk", "tutorial"]:
-            if hasattr(slot.content.proposal, "recording_release"):
-                slot_data = {
-                    "name": slot.content.title,
-                    "room": ", ".join(room["name"] for room in slot.rooms.values()),
-                    "start": datetime.combine(slot.day.date, slot.start).isoformat(),
-                    "end": datetime.combine(slot.day.date, slot.end).isoformat(),
-                    "duration": duration(slot.start, slot.end),
-                    "authors": [s.name for s in slot.content.speakers()],
-                    "released": slot.content.proposal.recording_release,
-                    "license": "",
-                    "contact": [s.email for s in slot.content.speakers()] if request.user.is_staff else ["redacted"],
-                    "abstract": slot.content.abstract.raw,
-                    "description": slot.content.description.raw,
-                    "conf_key": slot.pk,
-                    "conf_url": "https://%s%s" % (
-                        Site.objects.get_current().domain,
-                        reverse("schedule_presentation_detail", args=[slot.content.pk])
-                    ),
-
-                    "kind": slot.content.proposal.kind.slug,
-                    "tags": "",
-                }
-        elif slot.kind.label == "lightning":
-            slot_data = {
-                "name": slot.content_override.raw if slot.content_override else "Lightning Talks",
-                "room": ", ".join(room["name"] for room in slot.rooms.values()),
-                "start": datetime.combine(slot.day.date, slot.start).isoformat(),
-                "end": datetime.combine(slot.day.date, slot.end).isoformat(),
-                "duration": duration(slot.start, slot.end),
-                "authors": None,
-                "released": True,
-                "license": "",
-                "contact": None,
-                "abstract": "Lightning Talks",
-                "description": "Lightning Talks",
-                "conf_key": slot.pk,
-                "conf_url": None,
-                "kind": slot.kind.label,
-                "tags": "",
-            }
-        else:
-            continue
-        data.append(slot_data)
+    """
+    The whole schedule, or with ``?since=<cursor>`` only the entries that
+    changed after that cursor. The cursor for a full schedule is sent in
+    the ``X-Schedule-Cursor`` header.
+    """
+    include_contacts = request.user.is_staff
+    since = request.GET.get('since')
+    if since is not None:
+        try:
+            if not since.isdigit():
+                raise ValueError(since)
+            content = schedule.schedule_changes(int(since), include_contacts)
+        except ValueError:
+            return HttpResponseBadRequest('Invalid "since" cursor', content_type='text/plain')
+        return HttpResponse(content, content_type="application/json")
+
+    if not include_contacts:
+        pointer = publish.get_published(SCHEDULE)
+        if pointer is not None:
+            response = published_response(
+                request, pointer, 'schedule.json', 'application/json')
+            if response is not None:
+                response['X-Schedule-Cursor'] = pointer['cursor']
+                return response
+
+    cursor, content = schedule.schedule_feed(include_contacts)
+    response = HttpResponse(content, content_type="application/json")
+    response['X-Schedule-Cursor'] = cursor
+    return response
 
-    return HttpResponse(
-        json.dumps(data, default=json_serializer),
-        content_type="application/json"
-    )
 
+def ical_filters(request):
+    """Return the calendar filters in the query string, or None if invalid."""
+    filters = {'room': request.GET.get('room') or None}
+    for name in ('speaker', 'level'):
+        value = request.GET.get(name)
+        if value and not value.isdigit():
+            return None
+        filters[name] = int(value) if value else None
+    return filters
 
-@login_required
-def schedule_guidebook(request):
-    headers = (
-        'Session Title',
-        'Date',
-        'Time Start',
-        'Time End',
-        'Room/Location',
-        'Schedule Track (Optional)',
-        'Description (Optional)'
+
+def schedule_ical_etag(request, *args, **kwargs):
+    return version_etag(SCHEDULE, sorted((ical_filters(request) or {}).items()))
+
+
+@condition(etag_func=schedule_ical_etag)
+def schedule_ical(request):
+    """
+    The schedule as an iCalendar feed, optionally filtered by ``room``
+    name, ``speaker`` id and audience ``level``.
+    """
+    filters = ical_filters(request)
+    if filters is None:
+        return HttpResponseBadRequest('Invalid filter', content_type='text/plain')
+    response = StreamingHttpResponse(
+        ical.cached_calendar(**filters),
+        content_type='text/calendar; charset=utf-8'
     )
+    response['Content-Disposition'] = 'inline; filename="schedule.ics"'
+    return response
+
+
+NOW_TIME_FORMATS = ['%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M']
 
-    slots = Slot.objects.all().order_by('start')
-    data = []
-    for slot in slots:
-        # authors = slot.content.speakers() if hasattr(slot.content, 'speakers') else []
 
-        if slot.content_override:
-            name = slot.content_override.raw
+@cache_control(public=True, max_age=30)
+def schedule_now(request):
+    """
+    What's on now and next in each room, for venue displays.
+
+    Takes an optional ``at`` (an ISO datetime in the conference's time
+    zone, default now) and any number of ``room`` names.
+    """
+    at = request.GET.get('at')
+    if at:
+        for time_format in NOW_TIME_FORMATS:
+            try:
+                at = datetime.strptime(at, time_format)
+                break
+            except ValueError:
+                pass
         else:
-            name = slot.content.title if hasattr(slot.content, 'title') else ''
-
-        description = slot.content.description.raw if hasattr(slot.content, 'description') else ''
-        description = unidecode(description)
-        description = description.replace('\r', '')
-        description = description.replace('\n', '<br>')
-        room_location = ', '.join(room['name'] for room in slot.rooms.values())
-        track = slot.content.proposal.get_audience_level_display() if hasattr(slot.content, 'proposal') else ''
-
-        if track == 'Not Applicable':
-            track = 'N/A'
-
-        slot_data = [
-            name,
-            slot.day.date.isoformat(),
-            slot.start.isoformat(),
-            slot.end.isoformat(),
-            room_location,
-            track,
-            description,
-        ]
-
-        data.append(slot_data)
-
-    data = tablib.Dataset(*data, headers=headers)
-
-    response = HttpResponse(
-        data.xlsx,
-        content_type='application/vnd.ms-excel'
+            return HttpResponseBadRequest('Invalid "at" time', content_type='text/plain')
+    else:
+        at = datetime.now().replace(microsecond=0)
+
+    data = {
+        'at': at.isoformat(),
+        'rooms': timeline.get_index().lookup(at, request.GET.getlist('room')),
+    }
+    return HttpResponse(json.dumps(data), content_type='application/json')
+
+
+@login_required
+def instrumentation_stats(request):
+    """This process's request timings, per URL name."""
+    if not request.user.is_staff:
+        raise Http404()
+    return HttpResponse(json.dumps(instrumentation.snapshot(), indent=2),
+                        content_type='application/json')
+
+
+GUIDEBOOK_VERSIONS = {
+    'schedule': SCHEDULE,
+    'speakers': SCHEDULE,
+    'sponsors': SPONSORS,
+}
+
+# Guidebook exports too slow to build inside a request.
+GUIDEBOOK_JOBS = {
+    'schedule': 'guidebook_schedule',
+}
+
+
+def guidebook_etag(request, name, format):
+    return version_etag(GUIDEBOOK_VERSIONS[name], 'guidebook', format)
+
+
+@condition(etag_func=guidebook_etag)
+def guidebook_stream(request, name, format):
+    """
+    Stream the Guidebook export `name` in `format`. Only this response is
+    conditional; the redirects in `guidebook_response` never get a 304.
+    """
+    response = StreamingHttpResponse(
+        guidebook.stream_export(name, format, get_current_site(request).domain),
+        content_type=guidebook.WRITERS[format].content_type
     )
-    response['Content-Disposition'] = 'attachment; filename="guidebook_schedule.xls"'
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(
+        guidebook.export_filename(name, format))
     return response
 
 
+def guidebook_response(request, name):
+    """Stream the Guidebook export `name` in the format asked for."""
+    format = request.GET.get('format') or guidebook.EXPORTS[name][1]
+    if format not in guidebook.WRITERS:
+        raise Http404
+
+    # The published copy is served by the CDN if it's up to date, and
+    # the workbook is otherwise built by a background export.
+    if format == guidebook.EXPORTS[name][1]:
+        pointer = publish.get_published(GUIDEBOOK_VERSIONS[name])
+        if pointer is not None:
+            return redirect(publish.artifact_url(
+                pointer, guidebook.export_filename(name)))
+        if name in GUIDEBOOK_JOBS:
+            return export_response(GUIDEBOOK_JOBS[name])
+
+    return guidebook_stream(request, name, format)
+
+
 @login_required
-def guidebook_sponsor_export(request):
-    content_type = 'text/csv'
-    response = HttpResponse(content_type=content_type)
-    response['Content-Disposition'] = 'attachment; filename="guidebook_sponsors.csv"'
-
-    writer = unicodecsv.writer(response, quoting=unicodecsv.QUOTE_ALL)
-    writer.writerow([
-        'Name',
-        'Sub-Title (i.e. Location, Table/Booth, or Title/Sponsorship Level)',
-        'Description (Optional)',
-        'Location/Room',
-        'Image (Optional)'
-    ])
+def schedule_guidebook(request):
+    return guidebook_response(request, 'schedule')
 
-    sponsors = Sponsor.objects.active()
-    for sponsor in sponsors:
-        writer.writerow([
-            sponsor.name,
-            sponsor.level.name,
-            sponsor.listing_text,
-            '',
-            'https://{0}{1}'.format(
-                Site.objects.get_current().domain,
-                sponsor.website_logo.url
-            )
-        ])
 
-    return response
+@login_required
+def guidebook_sponsor_export(request):
+    return guidebook_response(request, 'sponsors')
 
 
 @login_required
 def guidebook_speaker_export(request):
-    content_type = 'text/csv'
-    response = HttpResponse(content_type=content_type)
-    response['Content-Disposition'] = 'attachment; filename="guidebook_speakers.csv"'
-
-    writer = unicodecsv.writer(response, quoting=unicodecsv.QUOTE_ALL)
-    writer.writerow([
-        'Name',
-        'Sub-Title (i.e. Location, Table/Booth, or Title/Sponsorship Level)',
-        'Description (Optional)',
-        'Location/Room',
-        'Image (Optional)'
-    ])
+    return guidebook_response(request, 'speakers')
 
-    speakers = Speaker.objects.filter(
-        presentations__isnull=False,
-        presentations__cancelled=False)
-    for speaker in speakers:
 
-        if hasattr(speaker.photo, 'url'):
-            photo_url = 'https://{0}{1}'.format(
-                Site.objects.get_current().domain,
-                speaker.photo.url
-            )
-        else:
-            photo_url = ''
+FEED_EPOCH = datetime(2009, 8, 1, 0, 0, 0)
 
-        writer.writerow([
-            speaker.name,
-            '',
-            unidecode(speaker.biography.rendered),
-            '',
-            photo_url,
-        ])
 
-    return response
+def news_feed_posts():
+    return Post.objects.published().exclude(title__endswith='Sponsor')\
+        .order_by('-published')
+
+
+def news_feed_updated(posts):
+    """
+    Return when the feed was last updated, from the most recently published
+    post, as an aware datetime.
+    """
+    updated = posts.values_list('updated', flat=True)[:1]
+    if updated and updated[0]:
+        feed_updated = updated[0]
+    else:
+        feed_updated = FEED_EPOCH
+    if timezone.is_naive(feed_updated):
+        feed_updated = timezone.make_aware(
+            feed_updated, timezone.get_default_timezone())
+    return feed_updated
+
 
+def news_feed_last_modified(request):
+    return news_feed_updated(news_feed_posts())
 
+
+@condition(last_modified_func=news_feed_last_modified)
 def guidebook_news_feed(request):
     """
     Sections are broken in the version of `biblion` that we are using so
     lifting this form `pinax-blog` which is the successor.
 
     https://github.com/pinax/pinax-blog/blob/master/pinax/blog/views.py#L146
+
+    The feed is only rendered when it has changed since the client's
+    `If-Modified-Since`; otherwise `condition` answers with a 304.
     """
     current_site = Site.objects.get_current()
 
@@ -283,13 +354,8 @@ def guidebook_news_feed(request):
     blog_url = 'http://%s%s' % (current_site.domain, reverse('blog'))
     # feed_url = 'http://%s%s' % (current_site.domain, reverse(url_name, kwargs=kwargs))
 
-    posts = Post.objects.published().exclude(title__endswith='Sponsor')\
-        .order_by('-published')
-
-    if posts:
-        feed_updated = posts[0].updated
-    else:
-        feed_updated = datetime(2009, 8, 1, 0, 0, 0)
+    posts = news_feed_posts()
+    feed_updated = news_feed_updated(posts)
 
     feed = render_to_string(feed_template, {
         # 'feed_id': feed_url,
@@ -303,3 +369,48 @@ def guidebook_news_feed(request):
     })
 
     return HttpResponse(feed, content_type=feed_mimetype)
+
+
+def export_response(name):
+    """
+    Redirect to the background export `name`: to its file if it's been
+    built, otherwise to the job's status page.
+    """
+    job = exports.enqueue(name)
+    if job['status'] == 'done':
+        return redirect(job['url'])
+    return redirect('export_status', job_id=job['job_id'])
+
+
+@login_required
+def export_start(request, name):
+    """Start (or reuse) a background export and redirect to it."""
+    if name not in exports.EXPORTS or not request.user.is_staff:
+        raise Http404()
+    if exports.EXPORTS[name]['superuser'] and not request.user.is_superuser:
+        return access_not_permitted(request)
+
+    return export_response(name)
+
+
+@login_required
+def export_status(request, job_id):
+    """
+    Report an export job's progress, and its file's URL once done: as
+    JSON for ``?format=json``, otherwise as a page that refreshes itself
+    until the job is over.
+    """
+    job = exports.get_job(job_id)
+    if job is None or not request.user.is_staff:
+        raise Http404()
+    if exports.EXPORTS[job['export']]['superuser'] and not request.user.is_superuser:
+        return access_not_permitted(request)
+
+    if request.GET.get('format') == 'json':
+        return HttpResponse(json.dumps(job), content_type='application/json')
+    return render(request, 'exports/status.html', {
+        'job': job,
+        'filename': exports.EXPORTS[job['export']]['filename'],
+        'progress': int(job['progress'] * 100),
+        'finished': job['status'] in ('done', 'failed'),
+    })
@@ -4,11 +4,13 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "djangocon.settings.local")
 from barrel import cooper
 from whitenoise.django import DjangoWhiteNoise
 from django.core.wsgi import get_wsgi_application
+from djangocon.core.precompile import warm_templates
 
 username = os.environ.get('BARREL_USER', None)
 password = os.environ.get('BARREL_PASS', None)
 
 application = get_wsgi_application()
+warm_templates()
 application = DjangoWhiteNoise(application)
 
 if username and password: